@@ -1,11 +1,34 @@
-from flask import Blueprint, request, jsonify
-from database import db, User, Role, Lesson, TeacherLesson, StudentLesson, Test, TestAttempt
-from utils import role_required, get_current_user, validate_email, validate_password
-from flask_jwt_extended import jwt_required
-from datetime import datetime
+import json
+from itertools import islice
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
+from database import db, User, Role, Lesson, TeacherLesson, StudentLesson, Test, BackgroundJob
+from utils import role_required, get_current_user, validate_email, validate_password, invalidate_user_cache
+from serializers import serialize_lessons, serialize_lesson, user_full
+from grade_stats import rebuild_lesson_stats, rebuild_test_summaries
+from search import user_rows_query, search_users, search_lessons
+from student_import import import_students
+from lesson_import import import_lessons
+from enrollment import replace_student_lessons, replace_lesson_students, replace_teacher_lessons, enroll_cohort
+from deletion import delete_user as delete_user_rows, delete_lesson as delete_lesson_rows
+from spreadsheet import upload_format, xlsx_supported, save_upload, remove_upload, iter_records, estimate_rows
+from missing_scores import backfill_missing_scores
+from jobs import register_job, submit_job, save_checkpoint, add_job_items, load_job_items, purge_job_secrets, JobError
+from student_cache import invalidate_student_views, invalidate_view, invalidate_all_student_views
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime, timedelta
 
 admin_bp = Blueprint('admin', __name__)
 
+# Arka plan işlerinde her checkpoint'e kadar işlenen satır sayısı (bkz. jobs.py)
+JOB_CHUNK_SIZE = 500
+
+# Toplu yükleme dosyalarının kolon sırası (ilk satır başlık)
+STUDENT_UPLOAD_COLUMNS = ('student_number', 'first_name', 'last_name', 'department')
+LESSON_UPLOAD_COLUMNS = ('name', 'code')
+
+# Satır sonuçları background_job_items'ta tutulan iş türleri
+UPLOAD_JOB_TYPES = ('bulk_upload_students', 'bulk_upload_lessons')
+
 def turkish_to_ascii(text):
     """Türkçe karakterleri ASCII'ye çevir"""
     turkish_chars = {
@@ -159,14 +182,165 @@ def create_user():
         }
     }), 201
 
+USER_ROLES = ('admin', 'teacher', 'student', 'department_head')
+USER_PAGE_SIZE = 50
+USER_PAGE_LIMIT = 1000
+USER_EXPORT_BATCH = 1000
+
+def _user_list_query(args):
+    """Kullanıcı listesi sorgusu (kolonlar + rol adı, id sırasında): (query, error)"""
+    query = user_rows_query()
+    
+    role = args.get('role')
+    if role:
+        if role not in USER_ROLES:
+            return None, f"role must be one of: {', '.join(USER_ROLES)}"
+        query = query.filter(Role.name == role)
+    
+    if args.get('department'):
+        query = query.filter(User.department == args['department'])
+    
+    if args.get('email'):
+        query = query.filter(User.email.startswith(args['email'].strip(), autoescape=True))
+    
+    if args.get('student_number'):
+        query = query.filter(User.student_number.startswith(args['student_number'].strip(), autoescape=True))
+    
+    if args.get('q'):
+        query = query.filter(User.full_name.icontains(args['q'].strip(), autoescape=True))
+    
+    return query.order_by(User.id), None
+
+def _stream_users(query):
+    """Kullanıcıları NDJSON olarak akıtır; bellek kullanıcı sayısından bağımsızdır
+    
+    yield_per PostgreSQL'de sunucu taraflı cursor (stream_results) kullanır,
+    satırlar USER_EXPORT_BATCH'lik gruplar halinde okunur.
+    """
+    def generate():
+        for row in query.yield_per(USER_EXPORT_BATCH):
+            yield json.dumps(user_full(row, row.role_name), ensure_ascii=False) + '\n'
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': 'attachment; filename=users.ndjson'}
+    )
+
 @admin_bp.route('/users', methods=['GET'])
 @jwt_required()
 @role_required('admin')
 def get_users():
-    """Tüm kullanıcıları listele"""
-    users = User.query.all()
+    """Kullanıcıları listele (filtreli, keyset sayfalı veya NDJSON akışı)
+    
+    Filtreler: role, department, email (önek), student_number (önek), q (ad içinde arama).
+    En fazla limit (varsayılan USER_PAGE_SIZE, en çok USER_PAGE_LIMIT) kullanıcı ve
+    sonraki sayfa için next_cursor döner (son sayfada null); sonraki sayfa
+    ?after=<next_cursor> ile alınır. Tüm eşleşenler için format=ndjson kullanılır:
+    satırlar sunucu taraflı cursor ile akıtılır.
+    """
+    query, error = _user_list_query(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    if request.args.get('format') == 'ndjson':
+        return _stream_users(query)
+    
+    try:
+        after = int(request.args['after']) if request.args.get('after') else None
+        limit = int(request.args['limit']) if request.args.get('limit') else USER_PAGE_SIZE
+    except ValueError:
+        return jsonify({'error': 'after and limit must be integers'}), 400
+    
+    if not 1 <= limit <= USER_PAGE_LIMIT:
+        return jsonify({'error': f'limit must be between 1 and {USER_PAGE_LIMIT}'}), 400
+    
+    if after is not None:
+        query = query.filter(User.id > after)
+    
+    # Sonraki sayfa var mı anlamak için bir fazla satır okunur
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1].id
+    
+    return jsonify({
+        'users': [user_full(row, row.role_name) for row in rows],
+        'next_cursor': next_cursor
+    }), 200
+
+def _search_args():
+    """Arama parametrelerini okur: (q, page, per_page, error)"""
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 20))
+    except ValueError:
+        return None, None, None, 'page and per_page must be integers'
+    
+    if page < 1 or not 1 <= per_page <= 100:
+        return None, None, None, 'page must be >= 1 and per_page between 1 and 100'
+    
+    return request.args.get('q', '').strip(), page, per_page, None
+
+@admin_bp.route('/search/users', methods=['GET'])
+@jwt_required()
+@role_required('admin')
+def search_users_route():
+    """Kullanıcı ara (ad, email, öğrenci numarası), sıralı ve sayfalı
+    
+    role ile role göre, department ile bölüme göre, not_in_lesson ile derse
+    kayıtlı/atanmış olmayanlara göre filtrelenir.
+    """
+    q, page, per_page, error = _search_args()
+    if error:
+        return jsonify({'error': error}), 400
+    
+    role = request.args.get('role')
+    if role and role not in USER_ROLES:
+        return jsonify({'error': f"role must be one of: {', '.join(USER_ROLES)}"}), 400
+    
+    excluded_lesson_id = request.args.get('not_in_lesson', type=int)
+    
+    users, pagination = search_users(q, role, excluded_lesson_id, page, per_page, request.args.get('department'))
+    
+    return jsonify({
+        'users': users,
+        'pagination': pagination
+    }), 200
+
+@admin_bp.route('/search/lessons', methods=['GET'])
+@jwt_required()
+@role_required('admin')
+def search_lessons_route():
+    """Ders ara (kod, ad), sıralı ve sayfalı"""
+    q, page, per_page, error = _search_args()
+    if error:
+        return jsonify({'error': error}), 400
+    
+    lessons, pagination = search_lessons(q, page, per_page)
+    
+    return jsonify({
+        'lessons': lessons,
+        'pagination': pagination
+    }), 200
+
+@admin_bp.route('/lessons/<int:lesson_id>/unassigned-students', methods=['GET'])
+@jwt_required()
+@role_required('admin')
+def get_unassigned_students(lesson_id):
+    """Derse kayıtlı olmayan öğrencileri ara (sayfalı, anti-join; department ile bölüme göre)"""
+    Lesson.query.get_or_404(lesson_id)
+    
+    q, page, per_page, error = _search_args()
+    if error:
+        return jsonify({'error': error}), 400
+    
+    students, pagination = search_users(q, 'student', lesson_id, page, per_page, request.args.get('department'))
+    
     return jsonify({
-        'users': [user.to_dict() for user in users]
+        'students': students,
+        'pagination': pagination
     }), 200
 
 @admin_bp.route('/users/<int:user_id>', methods=['GET'])
@@ -222,50 +396,20 @@ def update_user(user_id):
     if department is not None:
         user.department = department
     
-    # Öğretim üyesi için ders ataması
+    # Öğretim üyesi için ders ataması (sadece değişen atamalar yazılır)
     if user.role.name == 'teacher' and lesson_ids is not None:
-        # Önce yeni derslerde çakışma var mı kontrol et
-        for lesson_id in lesson_ids:
-            lesson = Lesson.query.get(lesson_id)
-            if lesson:
-                # Bu derse zaten başka bir öğretmen atanmış mı kontrol et
-                existing_assignment = TeacherLesson.query.filter_by(lesson_id=lesson_id).first()
-                if existing_assignment and existing_assignment.teacher_id != user_id:
-                    existing_teacher = User.query.get(existing_assignment.teacher_id)
-                    if existing_teacher:
-                        return jsonify({
-                            'error': f'{lesson.name} dersini {existing_teacher.full_name} veriyor. Bir derse sadece bir öğretim görevlisi atanabilir.'
-                        }), 400
-        
-        # Önce mevcut dersleri kaldır
-        TeacherLesson.query.filter_by(teacher_id=user_id).delete()
-        
-        # Yeni dersleri ekle
-        for lesson_id in lesson_ids:
-            lesson = Lesson.query.get(lesson_id)
-            if lesson:
-                teacher_lesson = TeacherLesson(
-                    teacher_id=user_id,
-                    lesson_id=lesson_id
-                )
-                db.session.add(teacher_lesson)
+        _, error = replace_teacher_lessons(user_id, lesson_ids)
+        if error:
+            return jsonify({'error': error}), 400
     
     # Öğrenci için ders ataması
     if user.role.name == 'student' and lesson_ids is not None:
-        # Önce mevcut dersleri kaldır
-        StudentLesson.query.filter_by(student_id=user_id).delete()
-        
-        # Yeni dersleri ekle
-        for lesson_id in lesson_ids:
-            lesson = Lesson.query.get(lesson_id)
-            if lesson:
-                student_lesson = StudentLesson(
-                    student_id=user_id,
-                    lesson_id=lesson_id
-                )
-                db.session.add(student_lesson)
+        replace_student_lessons(user_id, lesson_ids)
     
     db.session.commit()
+    invalidate_user_cache(user_id)
+    invalidate_student_views(user_id)
+    invalidate_view('lessons')  # ders listelerindeki öğretmen/öğrenci bilgisi
     
     return jsonify({
         'message': 'User updated successfully',
@@ -281,8 +425,18 @@ def delete_user(user_id):
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
-    db.session.delete(user)
+    # Öğretmenin sınavları öğrenci sonuçlarını taşır, birlikte silinmez
+    if db.session.query(Test.id).filter(Test.teacher_id == user_id).first():
+        return jsonify({'error': 'Bu kullanıcının oluşturduğu sınavlar var, önce sınavları silin'}), 400
+    
+    # Silinen öğrencinin notları ders istatistiklerinden, denemeleri test özetlerinden çıkarılır
+    graded_lesson_ids, attempted_test_ids = delete_user_rows(user_id)
+    rebuild_lesson_stats(graded_lesson_ids)
+    rebuild_test_summaries(attempted_test_ids)
     db.session.commit()
+    invalidate_user_cache(user_id)
+    invalidate_student_views(user_id)
+    invalidate_view('lessons')  # ders listelerindeki öğretmen/öğrenci bilgisi
     
     return jsonify({'message': 'User deleted successfully'}), 200
 
@@ -347,7 +501,7 @@ def create_lesson():
     
     return jsonify({
         'message': 'Lesson created successfully',
-        'lesson': lesson.to_dict()
+        'lesson': serialize_lesson(lesson, 'detail')
     }), 201
 
 @admin_bp.route('/lessons', methods=['GET'])
@@ -355,46 +509,40 @@ def create_lesson():
 @role_required('admin')
 def get_lessons():
     """Tüm dersleri listele"""
-    lessons = Lesson.query.all()
+    lessons = Lesson.query.order_by(Lesson.id).all()
     return jsonify({
-        'lessons': [lesson.to_dict() for lesson in lessons]
+        'lessons': serialize_lessons(lessons, 'roster')
     }), 200
 
 @admin_bp.route('/lessons/<int:lesson_id>', methods=['GET'])
 @jwt_required()
 @role_required('admin')
 def get_lesson_detail(lesson_id):
-    """Ders detaylarını getir (öğretmenler, kayıtlı öğrenciler, atanmamış öğrenciler)"""
-    lesson = Lesson.query.get_or_404(lesson_id)
+    """Ders detaylarını getir (öğretmenler, kayıtlı öğrenciler)
     
-    teacher_lessons = TeacherLesson.query.filter_by(lesson_id=lesson_id).all()
-    teachers = [tl.teacher.to_dict() for tl in teacher_lessons]
-    
-    student_lessons = StudentLesson.query.filter_by(lesson_id=lesson_id).all()
-    enrolled_students = [sl.student.to_dict() for sl in student_lessons]
+    Derse eklenebilecek öğrenciler/öğretmenler burada listelenmez; sayfalı
+    arama ile alınır: /lessons/<id>/unassigned-students ve /search/users.
+    """
+    lesson = Lesson.query.get_or_404(lesson_id)
     
-    student_role = Role.query.filter_by(name='student').first()
-    if student_role:
-        all_students = User.query.filter_by(role_id=student_role.id).all()
-        enrolled_student_ids = [sl.student_id for sl in student_lessons]
-        unassigned_students = [s.to_dict() for s in all_students if s.id not in enrolled_student_ids]
-    else:
-        unassigned_students = []
+    teachers = [
+        user_full(row, row.role_name)
+        for row in user_rows_query().join(
+            TeacherLesson, TeacherLesson.teacher_id == User.id
+        ).filter(TeacherLesson.lesson_id == lesson_id).order_by(TeacherLesson.id)
+    ]
     
-    teacher_role = Role.query.filter_by(name='teacher').first()
-    if teacher_role:
-        all_teachers = User.query.filter_by(role_id=teacher_role.id).all()
-        assigned_teacher_ids = [tl.teacher_id for tl in teacher_lessons]
-        unassigned_teachers = [t.to_dict() for t in all_teachers if t.id not in assigned_teacher_ids]
-    else:
-        unassigned_teachers = []
+    enrolled_students = [
+        user_full(row, row.role_name)
+        for row in user_rows_query().join(
+            StudentLesson, StudentLesson.student_id == User.id
+        ).filter(StudentLesson.lesson_id == lesson_id).order_by(StudentLesson.id)
+    ]
     
     return jsonify({
-        'lesson': lesson.to_dict(),
+        'lesson': serialize_lesson(lesson, 'detail'),
         'teachers': teachers,
-        'enrolled_students': enrolled_students,
-        'unassigned_students': unassigned_students,
-        'unassigned_teachers': unassigned_teachers
+        'enrolled_students': enrolled_students
     }), 200
 
 @admin_bp.route('/lessons/<int:lesson_id>', methods=['PUT'])
@@ -431,9 +579,10 @@ def update_lesson(lesson_id):
         except (ValueError, TypeError):
             return jsonify({'error': 'Geçersiz öğretmen seçimi'}), 400
         
+        existing_assignment = TeacherLesson.query.filter_by(lesson_id=lesson_id).first()
+        
         if teacher_id_int > 0:  # 0 değilse yeni öğretmen atama kontrolü yap
             # Bu derse zaten başka bir öğretmen atanmış mı kontrol et
-            existing_assignment = TeacherLesson.query.filter_by(lesson_id=lesson_id).first()
             if existing_assignment and existing_assignment.teacher_id != teacher_id_int:
                 existing_teacher = User.query.get(existing_assignment.teacher_id)
                 if existing_teacher:
@@ -441,10 +590,14 @@ def update_lesson(lesson_id):
                         'error': f'Bu dersi {existing_teacher.full_name} veriyor. Bir derse sadece bir öğretim görevlisi atanabilir.'
                     }), 400
         
-        # Önce mevcut öğretmeni kaldır
-        TeacherLesson.query.filter_by(lesson_id=lesson_id).delete()
+        # Öğretmen değişmediyse atama (ve created_at) korunur
+        unchanged = existing_assignment is not None and existing_assignment.teacher_id == teacher_id_int
         
-        if teacher_id_int > 0:  # 0 ise öğretmen kaldır
+        if not unchanged:
+            # Önce mevcut öğretmeni kaldır
+            TeacherLesson.query.filter_by(lesson_id=lesson_id).delete()
+        
+        if teacher_id_int > 0 and not unchanged:  # 0 ise öğretmen kaldır
             teacher = User.query.get(teacher_id_int)
             if not teacher or teacher.role.name != 'teacher':
                 return jsonify({'error': 'Seçilen öğretmen bulunamadı veya geçersiz'}), 400
@@ -455,26 +608,16 @@ def update_lesson(lesson_id):
             )
             db.session.add(teacher_lesson)
     
-    # Öğrencileri ata
+    # Öğrencileri ata (sadece eklenen/çıkarılan kayıtlar yazılır)
     if student_ids is not None:
-        # Önce mevcut öğrencileri kaldır
-        StudentLesson.query.filter_by(lesson_id=lesson_id).delete()
-        
-        # Yeni öğrencileri ekle
-        for student_id in student_ids:
-            student = User.query.get(student_id)
-            if student and student.role.name == 'student':
-                student_lesson = StudentLesson(
-                    student_id=student_id,
-                    lesson_id=lesson_id
-                )
-                db.session.add(student_lesson)
+        replace_lesson_students(lesson_id, student_ids)
     
     db.session.commit()
+    invalidate_all_student_views()
     
     return jsonify({
         'message': 'Lesson updated successfully',
-        'lesson': lesson.to_dict()
+        'lesson': serialize_lesson(lesson, 'roster')
     }), 200
 
 @admin_bp.route('/lessons/<int:lesson_id>', methods=['DELETE'])
@@ -486,8 +629,9 @@ def delete_lesson(lesson_id):
     if not lesson:
         return jsonify({'error': 'Lesson not found'}), 404
     
-    db.session.delete(lesson)
+    delete_lesson_rows(lesson_id)
     db.session.commit()
+    invalidate_all_student_views()
     
     return jsonify({'message': 'Lesson deleted successfully'}), 200
 
@@ -539,6 +683,7 @@ def assign_teacher():
     
     db.session.add(assignment)
     db.session.commit()
+    invalidate_view('lessons')
     
     return jsonify({
         'message': 'Teacher assigned successfully',
@@ -584,12 +729,61 @@ def assign_student():
     
     db.session.add(assignment)
     db.session.commit()
+    invalidate_student_views(student_id)
+    invalidate_view('lessons')
     
     return jsonify({
         'message': 'Student assigned successfully',
         'assignment': assignment.to_dict()
     }), 201
 
+@admin_bp.route('/enrollments/bulk', methods=['POST'])
+@jwt_required()
+@role_required('admin')
+def bulk_enroll_students():
+    """Bölüm(ler)deki ve/veya numarası verilen öğrencileri ders kodlarına toplu kaydet
+    
+    Gövde: {"lesson_codes": [...], "departments": [...] veya "department": "...", "student_numbers": [...]}
+    Zaten kayıtlı olan öğrenciler atlanır; eklenen/atlanan sayıları döndürülür.
+    """
+    data = request.get_json()
+    
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+    
+    lesson_codes = data.get('lesson_codes') or []
+    departments = data.get('departments') or ([data['department']] if data.get('department') else [])
+    student_numbers = data.get('student_numbers') or []
+    
+    if not isinstance(lesson_codes, list) or not lesson_codes:
+        return jsonify({'error': 'lesson_codes listesi gerekli'}), 400
+    
+    if not isinstance(departments, list) or not isinstance(student_numbers, list):
+        return jsonify({'error': 'departments ve student_numbers liste olmalı'}), 400
+    
+    if not departments and not student_numbers:
+        return jsonify({'error': 'Bölüm veya öğrenci numarası listesi gerekli'}), 400
+    
+    normalized_departments = []
+    for department in departments:
+        normalized = normalize_department(str(department))
+        if not normalized:
+            return jsonify({
+                'error': f'Geçersiz bölüm: "{department}". Kabul edilen: Bilgisayar Mühendisliği, Yazılım Mühendisliği, Psikoloji, Diş Hekimliği, Eczacılık'
+            }), 400
+        normalized_departments.append(normalized)
+    
+    result = enroll_cohort(lesson_codes, normalized_departments, student_numbers)
+    db.session.commit()
+    
+    if result['enrolled_count']:
+        invalidate_all_student_views()
+    
+    return jsonify({
+        'message': f"{result['enrolled_count']} ders kaydı eklendi",
+        **result
+    }), 200
+
 def normalize_department(dept_name):
     """Bölüm adını normalize et (büyük/küçük harf ve Türkçe karakter uyumlu)"""
     # Kabul edilen bölümler
@@ -616,28 +810,37 @@ def normalize_department(dept_name):
     # Eşleşme yoksa orijinali döndür (ama uyarı için None döndürebiliriz)
     return None
 
-@admin_bp.route('/users/bulk-upload', methods=['POST'])
-@jwt_required()
-@role_required('admin')
-def bulk_upload_students():
-    """Excel'den toplu öğrenci yükleme"""
-    data = request.get_json()
-    students_data = data.get('students', [])
-    
-    if not students_data:
-        return jsonify({'error': 'Öğrenci verisi bulunamadı'}), 400
-    
-    results = {
+def _empty_results():
+    return {
         'created': [],
         'updated': [],
         'errors': []
     }
-    
-    student_role = Role.query.filter_by(name='student').first()
-    if not student_role:
-        return jsonify({'error': 'Student role not found'}), 500
-    
-    for idx, student in enumerate(students_data, start=2):  # Excel'de 2. satırdan başlar (1. satır başlık)
+
+def _empty_counts():
+    return {
+        'created_count': 0,
+        'updated_count': 0,
+        'error_count': 0
+    }
+
+def _upload_summary(message, counts):
+    """Toplu yükleme sonucu (işin result alanı); satır listeleri get_job'da background_job_items'tan eklenir"""
+    return {
+        'message': message,
+        'summary': dict(counts)
+    }
+
+def _job_response(message, job):
+    return jsonify({
+        'message': message,
+        'job': job.to_dict(include_result=False)
+    }), 202
+
+def _validate_student_rows(rows, results):
+    """(satır numarası, satır) çiftlerini bellekte doğrular, hataları results'a ekler ve geçerli adayları döndürür"""
+    candidates = []
+    for idx, student in rows:
         try:
             student_number = str(student.get('student_number', '')).strip()
             first_name = str(student.get('first_name', '')).strip()
@@ -684,19 +887,7 @@ def bulk_upload_students():
             last_name_normalized = normalize_name(last_name)
             full_name = f"{first_name_normalized} {last_name_normalized}"
             
-            # Öğrenci numarasına göre kontrol et
-            existing_user = User.query.filter_by(student_number=student_number).first()
-            
-            if existing_user:
-                # Zaten var, hata olarak raporla
-                results['errors'].append({
-                    'row': idx,
-                    'error': f'Bu öğrenci numarası ({student_number}) zaten kayıtlı: {existing_user.full_name}',
-                    'data': student
-                })
-                continue
-            
-            # Email zaten kullanımda mı kontrol et
+            # Öğrenci email'i numaradan üretilir (veritabanına gitmez)
             email, password, error = generate_email_and_password(full_name, 'student', student_number)
             if error:
                 results['errors'].append({
@@ -706,28 +897,9 @@ def bulk_upload_students():
                 })
                 continue
             
-            if User.query.filter_by(email=email).first():
-                results['errors'].append({
-                    'row': idx,
-                    'error': f'Bu email ({email}) zaten kullanımda',
-                    'data': student
-                })
-                continue
-            
-            # Yeni öğrenci oluştur
-            new_user = User(
-                email=email,
-                full_name=full_name,
-                role_id=student_role.id,
-                department=normalized_department,
-                student_number=student_number
-            )
-            new_user.set_password(password)
-            db.session.add(new_user)
-            db.session.commit()
-            
-            results['created'].append({
+            candidates.append({
                 'row': idx,
+                'data': student,
                 'student_number': student_number,
                 'full_name': full_name,
                 'email': email,
@@ -736,182 +908,218 @@ def bulk_upload_students():
             })
         
         except Exception as e:
-            db.session.rollback()
             results['errors'].append({
                 'row': idx,
                 'error': str(e),
                 'data': student
             })
     
-    return jsonify({
-        'message': 'Toplu yükleme tamamlandı',
-        'summary': {
-            'created_count': len(results['created']),
-            'updated_count': len(results['updated']),
-            'error_count': len(results['errors'])
-        },
-        'results': results
-    }), 200
+    return candidates
+
+def _upload_records(payload, key, columns):
+    """İşin satırları: (satır numarası, satır) çiftleri
+    
+    Dosya yüklemesinde satırlar diskteki dosyadan akış halinde okunur (bkz.
+    spreadsheet.py); JSON ile gönderilen satırlar Excel'deki gibi 2'den numaralanır.
+    """
+    if 'file' in payload:
+        return iter_records(payload['file'], payload['format'], columns)
+    return enumerate(payload[key], start=2)
+
+def _resume_upload(job, key, columns):
+    """Checkpoint'ten sonraki satırları JOB_CHUNK_SIZE'lık gruplara bölen iterator ve sayaçlar
+    
+    Iterator (grup, işlenen satır sayısı) üretir; her grup işlenince
+    _save_chunk ile kaydedilmelidir.
+    """
+    checkpoint = job.checkpoint or {'next_index': 0, 'counts': _empty_counts()}
+    counts = checkpoint['counts']
+    
+    if job.checkpoint is None and 'file' in job.payload:
+        save_checkpoint(job, checkpoint, total=estimate_rows(job.payload['file'], job.payload['format']))
+    
+    def chunks():
+        records = islice(_upload_records(job.payload, key, columns), checkpoint['next_index'], None)
+        done = checkpoint['next_index']
+        while True:
+            try:
+                chunk = list(islice(records, JOB_CHUNK_SIZE))
+            except UnicodeDecodeError:
+                # Tekrar denemek sonucu değiştirmez
+                raise JobError('Dosyanın karakter kodlaması okunamadı, dosyayı "CSV UTF-8" olarak kaydedip tekrar yükleyin')
+            if not chunk:
+                return
+            done += len(chunk)
+            yield chunk, done
+    
+    return chunks(), counts
+
+def _save_chunk(job, results, counts, done):
+    """Grubun satır sonuçlarını işe ekler, sayaçları günceller ve checkpoint ile commit eder"""
+    add_job_items(job, results)
+    counts['created_count'] += len(results['created'])
+    counts['updated_count'] += len(results['updated'])
+    counts['error_count'] += len(results['errors'])
+    save_checkpoint(job, {'next_index': done, 'counts': counts}, done=done)
+
+def _discard_upload(job):
+    """Yükleme işinin dosyasını siler (iş tamamlandığında veya başarısız olduğunda)"""
+    if 'file' in job.payload:
+        remove_upload(job.payload['file'])
+
+def _finish_upload(job, message, counts):
+    """Yüklenen dosyayı siler ve işin sonucunu döndürür"""
+    _discard_upload(job)
+    return _upload_summary(message, counts)
+
+def _queue_upload(job_type, key, message):
+    """Toplu yükleme isteğini kuyruğa alır: multipart dosya (CSV/XLSX) veya JSON satır listesi"""
+    upload = request.files.get('file')
+    if upload:
+        file_format = upload_format(upload.filename)
+        if not file_format:
+            if upload.filename.lower().endswith('.xls'):
+                return jsonify({'error': "Eski Excel (.xls) dosyaları okunamıyor, dosyayı Excel'de .xlsx veya .csv olarak kaydedip tekrar yükleyin"}), 400
+            return jsonify({'error': 'Desteklenmeyen dosya türü (sadece .csv veya .xlsx)'}), 400
+        if file_format == 'xlsx' and not xlsx_supported():
+            return jsonify({'error': "XLSX desteği için sunucuda 'openpyxl' paketi gerekli, dosyayı CSV olarak yükleyin"}), 400
+        
+        path = save_upload(upload, current_app.config['UPLOAD_DIR'], file_format)
+        payload = {'file': path, 'format': file_format, 'filename': upload.filename}
+        total = 0
+    else:
+        data = request.get_json(silent=True) or {}
+        rows = data.get(key, [])
+        if not rows:
+            return jsonify({'error': 'Dosya veya satır verisi bulunamadı'}), 400
+        payload = {key: rows}
+        total = len(rows)
+    
+    job = submit_job(job_type, payload, total=total, created_by=int(get_jwt_identity()))
+    return _job_response(message, job)
+
+@register_job('bulk_upload_students', on_failed=_discard_upload)
+def run_student_upload(job):
+    """Öğrencileri JOB_CHUNK_SIZE'lık gruplar halinde yazar; her grup checkpoint ile commit edilir"""
+    student_role = Role.query.filter_by(name='student').first()
+    if not student_role:
+        raise JobError('Student role not found')
+    
+    chunks, counts = _resume_upload(job, 'students', STUDENT_UPLOAD_COLUMNS)
+    for chunk, done in chunks:
+        results = _empty_results()
+        candidates = _validate_student_rows(chunk, results)
+        import_students(candidates, student_role.id, results)
+        _save_chunk(job, results, counts, done)
+    
+    return _finish_upload(job, 'Toplu yükleme tamamlandı', counts)
+
+@admin_bp.route('/users/bulk-upload', methods=['POST'])
+@jwt_required()
+@role_required('admin')
+def bulk_upload_students():
+    """Toplu öğrenci yükleme: CSV/XLSX dosyası (multipart 'file') veya JSON satırları, arka plan işi olarak kuyruğa alınır
+    
+    Kolonlar: öğrenci numarası, ad, soyad, bölüm (ilk satır başlık).
+    """
+    return _queue_upload('bulk_upload_students', 'students', 'Toplu yükleme kuyruğa alındı')
+
+@register_job('bulk_upload_lessons', on_failed=_discard_upload)
+def run_lesson_upload(job):
+    """Dersleri JOB_CHUNK_SIZE'lık gruplar halinde yazar; her grup checkpoint ile commit edilir"""
+    chunks, counts = _resume_upload(job, 'lessons', LESSON_UPLOAD_COLUMNS)
+    for chunk, done in chunks:
+        results = _empty_results()
+        import_lessons(chunk, results)
+        _save_chunk(job, results, counts, done)
+    
+    if counts['created_count'] or counts['updated_count']:
+        invalidate_all_student_views()
+    
+    return _finish_upload(job, 'Toplu ders yükleme tamamlandı', counts)
 
 @admin_bp.route('/lessons/bulk-upload', methods=['POST'])
 @jwt_required()
 @role_required('admin')
 def bulk_upload_lessons():
-    """Excel'den toplu ders yükleme"""
-    data = request.get_json()
-    lessons_data = data.get('lessons', [])
-    
-    if not lessons_data:
-        return jsonify({'error': 'Ders verisi bulunamadı'}), 400
+    """Toplu ders yükleme: CSV/XLSX dosyası (multipart 'file') veya JSON satırları, arka plan işi olarak kuyruğa alınır
     
-    results = {
-        'created': [],
-        'updated': [],
-        'errors': []
+    Kolonlar: ders adı, ders kodu (ilk satır başlık).
+    """
+    return _queue_upload('bulk_upload_lessons', 'lessons', 'Toplu ders yükleme kuyruğa alındı')
+
+# Eksik not tamamlama tek transaction'dır ve arada checkpoint (claimed_at) yenileyemez
+MISSING_SCORES_CLAIM_TIMEOUT = timedelta(hours=1)
+
+@register_job('update_missing_scores', claim_timeout=MISSING_SCORES_CLAIM_TIMEOUT)
+def run_missing_scores(job):
+    """Son çalıştırmadan bu yana biten sınavlara girmeyen öğrenciler için 0 notu ekler
+    
+    Tamamlama tek transaction'dır (bkz. missing_scores.py): iş yarıda kalırsa
+    tekrar denemede aynı aralık baştan işlenir, checkpoint gerekmez. Çalışırken
+    claimed_at yenilenmediği için JOB_CLAIM_TIMEOUT yerine daha uzun bir süre kullanılır.
+    """
+    result = backfill_missing_scores()
+    
+    if result['updated_count']:
+        invalidate_all_student_views()
+    
+    updated_count = result['updated_count']
+    return {
+        'message': f'Toplam {updated_count} öğrenci için otomatik 0 notu eklendi',
+        'updated_count': updated_count,
+        'updated_students': result['updated_students'],
+        'since': result['since'],
+        'until': result['until']
     }
+
+@admin_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+@role_required('admin')
+def get_job(job_id):
+    """Arka plan işinin durumunu, ilerlemesini ve (bittiyse) sonucunu getir
+    
+    Toplu yüklemelerde satır sonuçları result['results'] altında döner. Oluşturulan
+    öğrencilerin şifreleri DELETE /jobs/<id>/secrets ile onaylanana veya
+    jobs.JOB_SECRET_TTL dolana kadar her okumada döner.
+    """
+    job = db.session.get(BackgroundJob, job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    data = job.to_dict()
+    if job.status == 'succeeded' and job.job_type in UPLOAD_JOB_TYPES:
+        data['result'] = {
+            **job.result,
+            'results': {**_empty_results(), **load_job_items(job)}
+        }
     
-    for idx, lesson in enumerate(lessons_data, start=2):  # Excel'de 2. satırdan başlar
-        try:
-            name = str(lesson.get('name', '')).strip()
-            code = str(lesson.get('code', '')).strip()
-            
-            # Validasyon
-            if not name:
-                results['errors'].append({
-                    'row': idx,
-                    'error': 'Ders adı boş olamaz',
-                    'data': lesson
-                })
-                continue
-            
-            if not code:
-                results['errors'].append({
-                    'row': idx,
-                    'error': 'Ders kodu boş olamaz',
-                    'data': lesson
-                })
-                continue
-            
-            # Ders koduna göre kontrol et
-            existing_lesson = Lesson.query.filter_by(code=code).first()
-            
-            if existing_lesson:
-                # Güncelle
-                existing_lesson.name = name
-                db.session.commit()
-                
-                results['updated'].append({
-                    'row': idx,
-                    'code': code,
-                    'name': name
-                })
-            else:
-                # Yeni oluştur
-                new_lesson = Lesson(
-                    code=code,
-                    name=name
-                )
-                db.session.add(new_lesson)
-                db.session.commit()
-                
-                results['created'].append({
-                    'row': idx,
-                    'code': code,
-                    'name': name
-                })
-        
-        except Exception as e:
-            db.session.rollback()
-            results['errors'].append({
-                'row': idx,
-                'error': str(e),
-                'data': lesson
-            })
+    return jsonify({
+        'job': data
+    }), 200
+
+@admin_bp.route('/jobs/<int:job_id>/secrets', methods=['DELETE'])
+@jwt_required()
+@role_required('admin')
+def delete_job_secrets(job_id):
+    """Toplu yükleme sonucundaki şifreleri sil (sonuçlar görüldükten/indirildikten sonra çağrılır)"""
+    job = db.session.get(BackgroundJob, job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    purged = purge_job_secrets(job.id)
+    db.session.commit()
     
     return jsonify({
-        'message': 'Toplu ders yükleme tamamlandı',
-        'summary': {
-            'created_count': len(results['created']),
-            'updated_count': len(results['updated']),
-            'error_count': len(results['errors'])
-        },
-        'results': results
+        'message': 'Job secrets deleted',
+        'purged': purged
     }), 200
 
 @admin_bp.route('/update-missing-scores', methods=['POST'])
 @jwt_required()
 @role_required('admin')
 def update_missing_exam_scores():
-    """Süresi dolmuş sınavlara girmeyen öğrenciler için otomatik 0 notu ekle"""
-    try:
-        # Süresi dolmuş sınavları bul
-        now = datetime.now()
-        expired_tests = Test.query.filter(Test.end_time < now).all()
-        
-        updated_count = 0
-        updated_students = []
-        
-        for test in expired_tests:
-            # Bu derse kayıtlı öğrencileri bul
-            student_lessons = StudentLesson.query.filter_by(lesson_id=test.lesson_id).all()
-            
-            for sl in student_lessons:
-                student_id = sl.student_id
-                
-                # Öğrenci bu sınava girmiş mi kontrol et
-                attempt = TestAttempt.query.filter_by(
-                    student_id=student_id,
-                    test_id=test.id
-                ).first()
-                
-                # Girmediyse veya tamamlamadıysa 0 ver
-                if not attempt:
-                    # Yeni TestAttempt oluştur (0 puan)
-                    new_attempt = TestAttempt(
-                        student_id=student_id,
-                        test_id=test.id,
-                        started_at=test.end_time,
-                        submitted_at=test.end_time,
-                        score=0,
-                        status='submitted'
-                    )
-                    db.session.add(new_attempt)
-                    updated_count += 1
-                    
-                    student = User.query.get(student_id)
-                    updated_students.append({
-                        'student_name': student.full_name,
-                        'lesson_name': test.lesson.name,
-                        'test_type': test.test_type.upper(),
-                        'score': 0,
-                        'reason': 'Sınava girmedi'
-                    })
-                
-                elif attempt.status != 'submitted':
-                    # Başlamış ama tamamlamamış
-                    attempt.status = 'submitted'
-                    attempt.score = 0
-                    attempt.submitted_at = test.end_time
-                    updated_count += 1
-                    
-                    student = User.query.get(student_id)
-                    updated_students.append({
-                        'student_name': student.full_name,
-                        'lesson_name': test.lesson.name,
-                        'test_type': test.test_type.upper(),
-                        'score': 0,
-                        'reason': 'Sınavı tamamlamadı'
-                    })
-        
-        db.session.commit()
-        
-        return jsonify({
-            'message': f'Toplam {updated_count} öğrenci için otomatik 0 notu eklendi',
-            'updated_count': updated_count,
-            'updated_students': updated_students
-        }), 200
-    
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': str(e)}), 500
+    """Süresi dolmuş sınavlara girmeyen öğrenciler için otomatik 0 notu ekle (arka plan işi)"""
+    job = submit_job('update_missing_scores', {}, created_by=int(get_jwt_identity()))
+    return _job_response('Eksik not tamamlama kuyruğa alındı', job)
 
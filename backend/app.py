@@ -39,17 +39,70 @@ def create_app():
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = int(os.getenv('JWT_ACCESS_EXPIRES', 3600))
     app.config['JWT_REFRESH_TOKEN_EXPIRES'] = int(os.getenv('JWT_REFRESH_EXPIRES', 604800))
     
+    # Yetkilendirme: 'claims' token'daki role güvenir (claim'siz token reddedilir), 'database' her istekte
+    # kullanıcıyı okur. 'claims' modunda rol önbelleği worker başınadır: rolü değişen veya silinen kullanıcı
+    # diğer worker'larda en fazla AUTH_CACHE_TTL saniye eski rolüyle istek yapabilir
+    app.config['AUTH_MODE'] = os.getenv('AUTH_MODE', 'claims')
+    app.config['AUTH_CACHE_TTL'] = int(os.getenv('AUTH_CACHE_TTL', 60))
+    
+    # Asenkron puanlama (opsiyonel): /submit 202 + makbuz döndürür, puanlamayı worker'lar yapar.
+    # Worker'lar iş worker'ları gibi sunucu giriş noktasında (python app.py) başlatılır;
+    # gunicorn ile ayrı süreç: python grading_queue.py
+    app.config['ASYNC_GRADING'] = os.getenv('ASYNC_GRADING', 'false').lower() in ('1', 'true', 'yes')
+    app.config['GRADING_WORKERS'] = int(os.getenv('GRADING_WORKERS', 2))
+    app.config['GRADING_BATCH_SIZE'] = int(os.getenv('GRADING_BATCH_SIZE', 50))
+    app.config['GRADING_POLL_INTERVAL'] = float(os.getenv('GRADING_POLL_INTERVAL', 1.0))
+    
+    # Öğrenci paneli cevap önbelleği: 'memory' (süreç içi LRU) veya redis://... (worker'lar arası paylaşılan).
+    # 'memory' ile geçersiz kılma sadece yazmayı yapan worker'da olur; diğer worker'lar TTL boyunca eski
+    # cevap verir. Bu yüzden TTL varsayılanı memory için 10 sn, Redis için 300 sn. Birden fazla worker'da
+    # (WEB_CONCURRENCY > 1) Redis kullanılmalı, bkz. student_cache.py
+    app.config['STUDENT_CACHE_URL'] = os.getenv('STUDENT_CACHE_URL', 'memory')
+    app.config['STUDENT_CACHE_TTL'] = int(os.environ['STUDENT_CACHE_TTL']) if os.getenv('STUDENT_CACHE_TTL') else None
+    app.config['STUDENT_CACHE_SIZE'] = int(os.getenv('STUDENT_CACHE_SIZE', 10000))
+    
+    # Şifre hash'leme: 'bcrypt' veya werkzeug yöntemi ('scrypt', 'pbkdf2:sha256'); eski hash'ler girişte yenilenir
+    app.config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD', 'bcrypt')
+    app.config['PASSWORD_BCRYPT_ROUNDS'] = int(os.getenv('PASSWORD_BCRYPT_ROUNDS', 12))
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', 0)) or None
+    
+    # Arka plan işleri (toplu yükleme, eksik not tamamlama): worker'lar create_app'te değil sunucu
+    # giriş noktasında (python app.py) başlatılır; JOB_WORKERS=0 veya gunicorn ile ayrı süreç: python jobs.py
+    app.config['JOB_WORKERS'] = int(os.getenv('JOB_WORKERS', 1))
+    app.config['JOB_POLL_INTERVAL'] = float(os.getenv('JOB_POLL_INTERVAL', 1.0))
+    
+    # Toplu yükleme dosyaları (CSV/XLSX) iş bitene kadar burada tutulur; ayrı süreçteki worker'larla paylaşılmalı
+    app.config['UPLOAD_DIR'] = os.getenv('UPLOAD_DIR') or os.path.join(app.instance_path, 'uploads')
+    
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
     
+    from utils import user_role_cache
+    user_role_cache.ttl = app.config['AUTH_CACHE_TTL']
+    
+    from passwords import configure_passwords
+    configure_passwords(
+        app.config['PASSWORD_HASH_METHOD'],
+        bcrypt_rounds=app.config['PASSWORD_BCRYPT_ROUNDS'],
+        workers=app.config['PASSWORD_HASH_WORKERS']
+    )
+    
+    from student_cache import configure_student_cache
+    configure_student_cache(
+        app.config['STUDENT_CACHE_URL'],
+        ttl=app.config['STUDENT_CACHE_TTL'],
+        maxsize=app.config['STUDENT_CACHE_SIZE'],
+        workers=int(os.getenv('WEB_CONCURRENCY', 1))
+    )
+    
     # CORS için (frontend ile iletişim)
     @app.after_request
     def after_request(response):
         response.headers.add('Access-Control-Allow-Origin', '*')
         response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-        response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+        response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,PATCH,POST,DELETE,OPTIONS')
         return response
     
     # Blueprint'leri kaydet
@@ -73,6 +126,19 @@ if __name__ == '__main__':
     # Veritabanını başlat
     init_database(app)
     
+    # İş ve puanlama worker'ları tablolar oluşturulduktan sonra ve sadece reloader'ın
+    # çalıştırdığı süreçte başlatılır (reloader'ın üst süreci istek karşılamaz)
+    serving = os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+    
+    if serving and app.config['JOB_WORKERS'] > 0:
+        from jobs import start_job_workers
+        app.extensions['job_workers'] = start_job_workers(app)
+    
+    # GRADING_WORKERS=0 ile web sürecinde worker başlatılmaz (ayrı süreç: python grading_queue.py)
+    if serving and app.config['ASYNC_GRADING'] and app.config['GRADING_WORKERS'] > 0:
+        from grading_queue import start_grading_workers
+        app.extensions['grading_workers'] = start_grading_workers(app)
+    
     port = int(os.getenv('SERVER_PORT', 5000))
     app.run(debug=True, host='0.0.0.0', port=port)
 
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from database import db, User
+from passwords import needs_rehash
 from utils import validate_email, validate_password, role_required
 from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
 
@@ -24,6 +25,15 @@ def login():
     if not user or not user.check_password(password):
         return jsonify({'error': 'Invalid email or password'}), 401
     
+    # Hash eski algoritma/maliyetle üretildiyse doğru şifre elimizdeyken yenile
+    if needs_rehash(user.password_hash):
+        try:
+            user.set_password(password)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Şifre hash'i yenilenemedi: {e}")
+    
     access_token = create_access_token(identity=str(user.id), additional_claims={'role': user.role.name})
     refresh_token = create_refresh_token(identity=str(user.id))
     
@@ -0,0 +1,88 @@
+"""
+Cevap otomatik kaydetme (autosave)
+
+Öğrenci sınav sırasında cevap değiştirdikçe istemci değişiklikleri birkaç
+saniye biriktirip PATCH /tests/<id>/answers ile sadece değişen cevapları
+gönderir. Her istek tek bir UPDATE ile hemen yazılır: cevaplar süreç
+belleğinde bekletilmez, böylece gönderim hangi worker'a giderse gitsin
+kaydedilmiş cevapları veritabanında bulur.
+
+Autosave denemenin satırını paylaşımlı (FOR SHARE), gönderim ise özel
+(FOR UPDATE) kilitle okur; gönderimden sonra gelen bir autosave yazmaz ve
+hata döndürür.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import update, case
+from database import db, Test, TestAttempt, Answer, SubmissionReceipt
+from cache import TTLCache, MISSING
+
+class AutosaveWindow:
+    """Autosave isteğinde denemeyi ve süresini bulmak için önbelleğe alınan özet
+    
+    Önbellekteki durum eskimiş olabilir (ör. gönderim başka bir worker'da yapıldı);
+    yazmadan önce durum save_answers içinde veritabanından tekrar okunur.
+    """
+    
+    __slots__ = ('attempt_id', 'status', 'deadline')
+    
+    def __init__(self, attempt_id, status, deadline):
+        self.attempt_id = attempt_id
+        self.status = status
+        self.deadline = deadline
+    
+    def is_open(self, now=None):
+        return self.status == 'started' and (now or datetime.now()) <= self.deadline
+
+# (test_id, student_id) -> AutosaveWindow; gönderimde forget_autosave_window ile silinir
+_windows = TTLCache(ttl=60, maxsize=50000)
+
+def get_autosave_window(test_id, student_id):
+    """Öğrencinin bu testteki denemesini önbellekten (yoksa tek sorguyla) döndürür, deneme yoksa None"""
+    key = (test_id, student_id)
+    window = _windows.get(key)
+    if window is not MISSING:
+        return window
+    
+    row = db.session.query(
+        TestAttempt.id, TestAttempt.status, TestAttempt.started_at, Test.duration, Test.end_time
+    ).join(Test, TestAttempt.test_id == Test.id).filter(
+        TestAttempt.test_id == test_id,
+        TestAttempt.student_id == student_id
+    ).first()
+    
+    if not row:
+        return None
+    
+    attempt_id, status, started_at, duration, end_time = row
+    deadline = min(end_time, started_at + timedelta(seconds=duration))
+    window = AutosaveWindow(attempt_id, status, deadline)
+    _windows.set(key, window)
+    return window
+
+def forget_autosave_window(test_id, student_id):
+    """Deneme gönderildiğinde veya süresi dolduğunda çağrılmalı"""
+    _windows.invalidate((test_id, student_id))
+
+def save_answers(attempt_id, changes):
+    """Değişen cevapları ({question_id: selected_answer}) tek UPDATE ile yazar: (yazılan cevap sayısı, hata)
+    
+    Denemeye ait olmayan sorular sayılmaz. Deneme gönderilmişse (veya gönderimi
+    kuyruktaysa) hiçbir şey yazılmaz. Commit çağırana aittir.
+    """
+    # Eşzamanlı gönderim bu kilidin bırakılmasını bekler (bkz. utils.submit_exam)
+    status = db.session.query(TestAttempt.status).filter(
+        TestAttempt.id == attempt_id
+    ).with_for_update(read=True).scalar()
+    
+    if status == 'expired':
+        return 0, "Sınav süresi doldu"
+    if status != 'started' or db.session.query(SubmissionReceipt.id).filter_by(attempt_id=attempt_id).first():
+        return 0, "Sınav zaten gönderildi"
+    
+    result = db.session.execute(
+        update(Answer.__table__).where(
+            Answer.attempt_id == attempt_id,
+            Answer.question_id.in_(list(changes))
+        ).values(selected_answer=case(changes, value=Answer.question_id))
+    )
+    return result.rowcount, None
@@ -0,0 +1,135 @@
+"""
+Süreç içi (in-process) önbellek yardımcıları
+Not: Her gunicorn worker'ı kendi önbelleğini tutar, bu yüzden kayıtlar kısa bir TTL ile sınırlandırılır.
+Worker'lar arasında paylaşılması gereken önbellekler için create_cache ile Redis seçilebilir.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# Önbellekte None da saklanabildiği için "kayıt yok" durumunu ayırt etmek için kullanılır
+MISSING = object()
+
+class TTLCache:
+    """Thread-safe, süre (TTL) ve boyut sınırlı basit önbellek"""
+    
+    def __init__(self, ttl=60, maxsize=10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key, default=MISSING):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            
+            return value
+    
+    def set(self, key, value):
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.maxsize:
+                self._evict()
+            self._data[key] = (value, time.monotonic() + self.ttl)
+    
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+    
+    def _evict(self):
+        """Süresi dolanları, yer açılmazsa en eski kaydı siler (kilit altında çağrılır)"""
+        now = time.monotonic()
+        expired = [key for key, (_, expires_at) in self._data.items() if expires_at < now]
+        for key in expired:
+            del self._data[key]
+        
+        if len(self._data) >= self.maxsize:
+            del self._data[next(iter(self._data))]
+
+class LRUCache:
+    """Thread-safe, boyut (LRU) ve süre (TTL) sınırlı önbellek; TTLCache ile aynı arayüz"""
+    
+    def __init__(self, ttl=300, maxsize=10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, default=MISSING):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            
+            self._data.move_to_end(key)
+            return value
+    
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+class RedisCache:
+    """Worker'lar arasında paylaşılan önbellek (opsiyonel, 'redis' paketi gerekir)
+    
+    Anahtarlar string olmalı, değerler JSON'a çevrilebilir olmalıdır.
+    """
+    
+    def __init__(self, url, ttl=300, prefix='sinav:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("Redis önbelleği için 'redis' paketi gerekli: pip install redis")
+        
+        self.ttl = ttl
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+    
+    def get(self, key, default=MISSING):
+        value = self._client.get(self.prefix + key)
+        return default if value is None else json.loads(value)
+    
+    def set(self, key, value):
+        self._client.set(self.prefix + key, json.dumps(value), ex=max(1, int(self.ttl)))
+    
+    def invalidate(self, key):
+        self._client.delete(self.prefix + key)
+    
+    def clear(self):
+        keys = list(self._client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self._client.delete(*keys)
+
+def create_cache(url='memory', ttl=300, maxsize=10000, prefix='sinav:'):
+    """Ayara göre önbellek oluşturur: 'memory' (süreç içi LRU) veya 'redis://...'"""
+    if not url or url == 'memory':
+        return LRUCache(ttl=ttl, maxsize=maxsize)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisCache(url, ttl=ttl, prefix=prefix)
+    raise ValueError(f"Unknown cache backend: {url}")
@@ -1,7 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from sqlalchemy import CheckConstraint
-from werkzeug.security import generate_password_hash, check_password_hash
+from passwords import hash_password, verify_password
 
 db = SQLAlchemy()
 
@@ -34,17 +34,22 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    taught_lessons = db.relationship('TeacherLesson', backref='teacher', lazy=True, cascade='all, delete-orphan')
-    enrolled_lessons = db.relationship('StudentLesson', backref='student', lazy=True, cascade='all, delete-orphan')
+    taught_lessons = db.relationship('TeacherLesson', backref='teacher', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    enrolled_lessons = db.relationship('StudentLesson', backref='student', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     created_tests = db.relationship('Test', backref='teacher', lazy=True)
-    test_attempts = db.relationship('TestAttempt', backref='student', lazy=True)
-    grades = db.relationship('Grade', backref='student', lazy=True, cascade='all, delete-orphan')
+    test_attempts = db.relationship('TestAttempt', backref='student', lazy=True, passive_deletes=True)
+    grades = db.relationship('Grade', backref='student', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    
+    # Admin kullanıcı listesi rol filtresi + id üzerinden keyset sayfalama yapar
+    __table_args__ = (
+        db.Index('ix_users_role_id', 'role_id', 'id'),
+    )
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
     
     def to_dict(self):
         return {
@@ -68,53 +73,23 @@ class Lesson(db.Model):
     final_weight = db.Column(db.Numeric(5, 2), default=60.00, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    teachers = db.relationship('TeacherLesson', backref='lesson', lazy=True, cascade='all, delete-orphan')
-    students = db.relationship('StudentLesson', backref='lesson', lazy=True, cascade='all, delete-orphan')
-    tests = db.relationship('Test', backref='lesson', lazy=True, cascade='all, delete-orphan')
-    grades = db.relationship('Grade', backref='lesson', lazy=True, cascade='all, delete-orphan')
+    teachers = db.relationship('TeacherLesson', backref='lesson', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    students = db.relationship('StudentLesson', backref='lesson', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    tests = db.relationship('Test', backref='lesson', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    grades = db.relationship('Grade', backref='lesson', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    grade_stats = db.relationship('LessonGradeStats', backref='lesson', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     
-    def to_dict(self):
-        # Öğretmeni bul
-        teacher = None
-        if self.teachers:
-            teacher_lesson = self.teachers[0]
-            teacher_user = User.query.get(teacher_lesson.teacher_id)
-            if teacher_user:
-                teacher = {
-                    'id': teacher_user.id,
-                    'full_name': teacher_user.full_name,
-                    'email': teacher_user.email
-                }
-        
-        # Öğrencileri bul
-        students = []
-        for student_lesson in self.students:
-            student_user = User.query.get(student_lesson.student_id)
-            if student_user:
-                students.append({
-                    'id': student_user.id,
-                    'full_name': student_user.full_name,
-                    'email': student_user.email,
-                    'student_number': student_user.student_number
-                })
-        
-        return {
-            'id': self.id,
-            'code': self.code,
-            'name': self.name,
-            'vize_weight': float(self.vize_weight) if self.vize_weight else 40.00,
-            'final_weight': float(self.final_weight) if self.final_weight else 60.00,
-            'teacher': teacher,
-            'students': students,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+    def to_dict(self, projection='roster'):
+        # Öğretmen ve öğrenciler toplu yüklenir, bkz. serializers.py
+        from serializers import serialize_lesson
+        return serialize_lesson(self, projection)
 
 class TeacherLesson(db.Model):
     __tablename__ = 'teacher_lesson'
     
     id = db.Column(db.Integer, primary_key=True)
-    teacher_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    lesson_id = db.Column(db.Integer, db.ForeignKey('lessons.id'), nullable=False)
+    teacher_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    lesson_id = db.Column(db.Integer, db.ForeignKey('lessons.id', ondelete='CASCADE'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     __table_args__ = (
@@ -135,8 +110,8 @@ class StudentLesson(db.Model):
     __tablename__ = 'student_lesson'
     
     id = db.Column(db.Integer, primary_key=True)
-    student_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    lesson_id = db.Column(db.Integer, db.ForeignKey('lessons.id'), nullable=False)
+    student_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    lesson_id = db.Column(db.Integer, db.ForeignKey('lessons.id', ondelete='CASCADE'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     __table_args__ = (
@@ -157,7 +132,7 @@ class Test(db.Model):
     __tablename__ = 'tests'
     
     id = db.Column(db.Integer, primary_key=True)
-    lesson_id = db.Column(db.Integer, db.ForeignKey('lessons.id'), nullable=False)
+    lesson_id = db.Column(db.Integer, db.ForeignKey('lessons.id', ondelete='CASCADE'), nullable=False)
     teacher_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     test_type = db.Column(db.String(20), nullable=False)
     start_time = db.Column(db.DateTime, nullable=False)
@@ -166,10 +141,14 @@ class Test(db.Model):
     min_questions = db.Column(db.Integer, default=5, nullable=False)
     vize_weight = db.Column(db.Numeric(5, 2), default=40.00)
     final_weight = db.Column(db.Numeric(5, 2), default=60.00)
+    # Soru havuzuna her yazımda artırılır; worker'lardaki sınav kağıdı önbellekleri bununla doğrulanır (bkz. exam_papers.py)
+    questions_version = db.Column(db.Integer, default=0, server_default='0', nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    questions = db.relationship('Question', backref='test', lazy=True, cascade='all, delete-orphan', order_by='Question.id')
-    attempts = db.relationship('TestAttempt', backref='test', lazy=True, cascade='all, delete-orphan')
+    questions = db.relationship('Question', backref='test', lazy=True, cascade='all, delete-orphan', passive_deletes=True, order_by='Question.id')
+    attempts = db.relationship('TestAttempt', backref='test', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    score_summary = db.relationship('TestScoreSummary', backref='test', lazy=True, uselist=False, cascade='all, delete-orphan', passive_deletes=True)
+    score_buckets = db.relationship('TestScoreBucket', backref='test', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     
     __table_args__ = (
         CheckConstraint("test_type IN ('vize', 'final', 'quiz')", name='check_test_type'),
@@ -178,29 +157,16 @@ class Test(db.Model):
         CheckConstraint('duration > 0', name='check_duration_positive'),
     )
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'lesson_id': self.lesson_id,
-            'teacher_id': self.teacher_id,
-            'test_type': self.test_type,
-            'start_time': self.start_time.isoformat() if self.start_time else None,
-            'end_time': self.end_time.isoformat() if self.end_time else None,
-            'duration': self.duration,
-            'min_questions': self.min_questions,
-            'vize_weight': float(self.vize_weight) if self.vize_weight else None,
-            'final_weight': float(self.final_weight) if self.final_weight else None,
-            'lesson': self.lesson.to_dict() if self.lesson else None,
-            'teacher': self.teacher.to_dict() if self.teacher else None,
-            'question_count': len(self.questions),
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+    def to_dict(self, projection='detail'):
+        # İlişkiler toplu yüklenir, bkz. serializers.py
+        from serializers import serialize_test
+        return serialize_test(self, projection)
 
 class Question(db.Model):
     __tablename__ = 'questions'
     
     id = db.Column(db.Integer, primary_key=True)
-    test_id = db.Column(db.Integer, db.ForeignKey('tests.id'), nullable=False)
+    test_id = db.Column(db.Integer, db.ForeignKey('tests.id', ondelete='CASCADE'), nullable=False)
     question_text = db.Column(db.Text, nullable=False)
     option_a = db.Column(db.Text, nullable=False)
     option_b = db.Column(db.Text, nullable=False)
@@ -210,10 +176,12 @@ class Question(db.Model):
     points = db.Column(db.Integer, default=10)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    answers = db.relationship('Answer', backref='question', lazy=True, cascade='all, delete-orphan')
+    answers = db.relationship('Answer', backref='question', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     
     __table_args__ = (
         CheckConstraint("correct_answer IN ('a', 'b', 'c', 'd')", name='check_correct_answer'),
+        # Sınav kağıdı test başına id sırasıyla yüklenir, bkz. exam_papers.py
+        db.Index('ix_questions_test_id', 'test_id', 'id'),
     )
     
     def to_dict(self, include_correct=False):
@@ -236,41 +204,67 @@ class TestAttempt(db.Model):
     __tablename__ = 'test_attempts'
     
     id = db.Column(db.Integer, primary_key=True)
-    test_id = db.Column(db.Integer, db.ForeignKey('tests.id'), nullable=False)
-    student_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    test_id = db.Column(db.Integer, db.ForeignKey('tests.id', ondelete='CASCADE'), nullable=False)
+    student_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     started_at = db.Column(db.DateTime, nullable=False)
     submitted_at = db.Column(db.DateTime, nullable=True)
     status = db.Column(db.String(20), default='started')
     score = db.Column(db.Numeric(10, 2), default=0.00)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    answers = db.relationship('Answer', backref='attempt', lazy=True, cascade='all, delete-orphan')
+    answers = db.relationship('Answer', backref='attempt', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    submission = db.relationship('SubmissionReceipt', backref='attempt', lazy=True, uselist=False, cascade='all, delete-orphan', passive_deletes=True)
     
     __table_args__ = (
         db.UniqueConstraint('test_id', 'student_id', name='unique_test_student'),
         CheckConstraint("status IN ('started', 'submitted', 'expired')", name='check_status'),
     )
     
+    def to_dict(self, projection='detail'):
+        # İlişkiler toplu yüklenir, bkz. serializers.py
+        from serializers import serialize_attempt
+        return serialize_attempt(self, projection)
+
+class SubmissionReceipt(db.Model):
+    """Asenkron puanlama kuyruğu: gönderilen ham cevaplar puanlanana kadar burada bekler"""
+    __tablename__ = 'submission_queue'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    attempt_id = db.Column(db.Integer, db.ForeignKey('test_attempts.id', ondelete='CASCADE'), nullable=False, unique=True)
+    answers = db.Column(db.JSON, nullable=False)
+    status = db.Column(db.String(20), default='queued', nullable=False)
+    received_at = db.Column(db.DateTime, nullable=False)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    graded_at = db.Column(db.DateTime, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        CheckConstraint("status IN ('queued', 'grading', 'graded', 'failed')", name='check_submission_status'),
+        db.Index('ix_submission_queue_status', 'status', 'id'),
+    )
+    
     def to_dict(self):
+        score = None
+        if self.status == 'graded' and self.attempt:
+            score = float(self.attempt.score) if self.attempt.score else 0.00
+        
         return {
-            'id': self.id,
-            'test_id': self.test_id,
-            'student_id': self.student_id,
-            'started_at': self.started_at.isoformat() if self.started_at else None,
-            'submitted_at': self.submitted_at.isoformat() if self.submitted_at else None,
+            'receipt_id': self.id,
+            'attempt_id': self.attempt_id,
             'status': self.status,
-            'score': float(self.score) if self.score else 0.00,
-            'test': self.test.to_dict() if self.test else None,
-            'student': self.student.to_dict() if self.student else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'received_at': self.received_at.isoformat() if self.received_at else None,
+            'graded_at': self.graded_at.isoformat() if self.graded_at else None,
+            'score': score,
+            'error': self.error
         }
 
 class Answer(db.Model):
     __tablename__ = 'answers'
     
     id = db.Column(db.Integer, primary_key=True)
-    attempt_id = db.Column(db.Integer, db.ForeignKey('test_attempts.id'), nullable=False)
-    question_id = db.Column(db.Integer, db.ForeignKey('questions.id'), nullable=False)
+    attempt_id = db.Column(db.Integer, db.ForeignKey('test_attempts.id', ondelete='CASCADE'), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey('questions.id', ondelete='CASCADE'), nullable=False)
     selected_answer = db.Column(db.String(1))
     is_correct = db.Column(db.Boolean, default=False)
     points_earned = db.Column(db.Numeric(10, 2), default=0.00)
@@ -297,8 +291,8 @@ class Grade(db.Model):
     __tablename__ = 'grades'
     
     id = db.Column(db.Integer, primary_key=True)
-    student_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    lesson_id = db.Column(db.Integer, db.ForeignKey('lessons.id'), nullable=False)
+    student_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    lesson_id = db.Column(db.Integer, db.ForeignKey('lessons.id', ondelete='CASCADE'), nullable=False)
     vize_score = db.Column(db.Numeric(10, 2), nullable=True)
     final_score = db.Column(db.Numeric(10, 2), nullable=True)
     quiz_score = db.Column(db.Numeric(10, 2), nullable=True)
@@ -324,3 +318,141 @@ class Grade(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+
+class LessonGradeStats(db.Model):
+    """Ders başına not istatistikleri (her not kolonu için ayrı satır)
+    
+    update_grade tarafından artımlı olarak güncellenir, bkz. grade_stats.py
+    """
+    __tablename__ = 'lesson_grade_stats'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    lesson_id = db.Column(db.Integer, db.ForeignKey('lessons.id', ondelete='CASCADE'), nullable=False)
+    score_column = db.Column(db.String(20), nullable=False)
+    count = db.Column(db.Integer, default=0, nullable=False)
+    total = db.Column(db.Numeric(16, 2), default=0, nullable=False)
+    total_sq = db.Column(db.Numeric(24, 4), default=0, nullable=False)
+    min_score = db.Column(db.Numeric(10, 2), nullable=True)
+    max_score = db.Column(db.Numeric(10, 2), nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('lesson_id', 'score_column', name='unique_lesson_score_column'),
+        CheckConstraint(
+            "score_column IN ('vize_score', 'final_score', 'quiz_score', 'total_score')",
+            name='check_score_column'
+        ),
+    )
+    
+    def to_dict(self):
+        # Ortalama ve standart sapma count/total/total_sq'dan hesaplanır, bkz. grade_stats.py
+        from grade_stats import summarize_stats
+        return summarize_stats(self)
+
+class TestScoreSummary(db.Model):
+    """Test başına puan özeti: gönderim sayısı, toplam, kareler toplamı, min, max
+    
+    Gönderimde artımlı olarak güncellenir, bkz. grade_stats.py
+    """
+    __tablename__ = 'test_score_summaries'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    test_id = db.Column(db.Integer, db.ForeignKey('tests.id', ondelete='CASCADE'), nullable=False, unique=True)
+    submitted_count = db.Column(db.Integer, default=0, nullable=False)
+    total = db.Column(db.Numeric(16, 2), default=0, nullable=False)
+    total_sq = db.Column(db.Numeric(24, 4), default=0, nullable=False)
+    min_score = db.Column(db.Numeric(10, 2), nullable=True)
+    max_score = db.Column(db.Numeric(10, 2), nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class TestScoreBucket(db.Model):
+    """Test puan dağılımı (histogram): her 10 puanlık aralık için gönderim sayısı"""
+    __tablename__ = 'test_score_buckets'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    test_id = db.Column(db.Integer, db.ForeignKey('tests.id', ondelete='CASCADE'), nullable=False)
+    bucket = db.Column(db.Integer, nullable=False)
+    count = db.Column(db.Integer, default=0, nullable=False)
+    
+    __table_args__ = (
+        db.UniqueConstraint('test_id', 'bucket', name='unique_test_bucket'),
+    )
+
+class BackgroundJob(db.Model):
+    """Uzun süren admin işlemleri (toplu yükleme, eksik not tamamlama) için iş kuyruğu
+    
+    İşler arka plan worker'larında gruplar halinde çalışır; her grubun sonunda
+    checkpoint işin yaptığı yazımlarla aynı transaction'da kaydedilir, yeniden
+    başlatılan iş kaldığı yerden devam eder. Bkz. jobs.py
+    """
+    __tablename__ = 'background_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), default='queued', nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+    checkpoint = db.Column(db.JSON, nullable=True)
+    result = db.Column(db.JSON, nullable=True)
+    progress_done = db.Column(db.Integer, default=0, nullable=False)
+    progress_total = db.Column(db.Integer, default=0, nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    error = db.Column(db.Text, nullable=True)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    __table_args__ = (
+        CheckConstraint("status IN ('queued', 'running', 'succeeded', 'failed')", name='check_job_status'),
+        db.Index('ix_background_jobs_status', 'status', 'id'),
+    )
+    
+    def to_dict(self, include_result=True):
+        data = {
+            'id': self.id,
+            'job_type': self.job_type,
+            'status': self.status,
+            'progress': {
+                'done': self.progress_done,
+                'total': self.progress_total,
+                'percent': round(100.0 * self.progress_done / self.progress_total, 1) if self.progress_total else None
+            },
+            'attempts': self.attempts,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+        if include_result:
+            data['result'] = self.result
+        return data
+
+class BackgroundJobItem(db.Model):
+    """Arka plan işinin satır sonuçları (oluşturulan, güncellenen, hatalı satırlar)
+    
+    Her grubun satırları checkpoint ile aynı commit'te eklenir; checkpoint sadece
+    kaldığı satırı ve sayaçları tutar. Üretilen şifreler sadece secret kolonunda,
+    sonuçlar onaylanana veya JOB_SECRET_TTL dolana kadar tutulur (bkz. jobs.purge_job_secrets).
+    """
+    __tablename__ = 'background_job_items'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('background_jobs.id', ondelete='CASCADE'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # 'created', 'updated', 'errors'
+    row = db.Column(db.Integer, nullable=True)
+    data = db.Column(db.JSON, nullable=False)
+    secret = db.Column(db.String(255), nullable=True)
+    
+    __table_args__ = (
+        db.Index('ix_background_job_items_job', 'job_id', 'row'),
+    )
+
+class MaintenanceMark(db.Model):
+    """Periyodik bakım işlerinin kaldığı yer (high-water mark)
+    
+    Ör. eksik not tamamlama, bitiş zamanı bu değerden sonra olan sınavları işler; bkz. missing_scores.py
+    """
+    __tablename__ = 'maintenance_marks'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    marked_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,77 @@
+"""
+Küme tabanlı silme (test, soru havuzu, ders, kullanıcı)
+
+ORM cascade'leri silmeden önce her alt satırı belleğe yükler ve satır satır
+DELETE gönderir. Burada her tablo için tek bir DELETE ... WHERE ... IN (SELECT ...)
+kullanılır; 200 soru ve 5.000 cevaplı bir testin silinmesi birkaç komuttur.
+
+Şemadaki yabancı anahtarlar ON DELETE CASCADE olarak tanımlıdır (bkz. database.py);
+yine de alt tablolar açıkça silinir, böylece kısıtları eski (cascade'siz)
+şemayla oluşturulmuş veritabanlarında ve SQLite'ta da aynı sonuç alınır.
+Commit çağırana aittir.
+"""
+from sqlalchemy import delete, update, select
+from database import (
+    db, User, Lesson, TeacherLesson, StudentLesson, Test, Question, TestAttempt, SubmissionReceipt,
+    Answer, Grade, LessonGradeStats, TestScoreSummary, TestScoreBucket, BackgroundJob
+)
+
+def _delete(model, *criteria):
+    return db.session.execute(
+        delete(model).where(*criteria),
+        execution_options={'synchronize_session': False}
+    ).rowcount
+
+def delete_question_pool(test_id):
+    """Testin tüm sorularını ve bu sorulara verilmiş cevapları siler, silinen soru sayısını döndürür"""
+    questions = select(Question.id).where(Question.test_id == test_id)
+    _delete(Answer, Answer.question_id.in_(questions))
+    return _delete(Question, Question.test_id == test_id)
+
+def _delete_attempts(attempts):
+    """Denemeleri (select(TestAttempt.id) ...) cevapları ve kuyruk kayıtlarıyla birlikte siler"""
+    _delete(Answer, Answer.attempt_id.in_(attempts))
+    _delete(SubmissionReceipt, SubmissionReceipt.attempt_id.in_(attempts))
+    _delete(TestAttempt, TestAttempt.id.in_(attempts))
+
+def delete_tests(tests):
+    """Testleri (select(Test.id) ...) soruları, denemeleri ve özetleriyle birlikte siler"""
+    _delete_attempts(select(TestAttempt.id).where(TestAttempt.test_id.in_(tests)))
+    _delete(Question, Question.test_id.in_(tests))
+    _delete(TestScoreBucket, TestScoreBucket.test_id.in_(tests))
+    _delete(TestScoreSummary, TestScoreSummary.test_id.in_(tests))
+    return _delete(Test, Test.id.in_(tests))
+
+def delete_test(test_id):
+    return delete_tests(select(Test.id).where(Test.id == test_id))
+
+def delete_lesson(lesson_id):
+    """Dersi testleri, kayıtları, notları ve istatistikleriyle birlikte siler"""
+    delete_tests(select(Test.id).where(Test.lesson_id == lesson_id))
+    _delete(StudentLesson, StudentLesson.lesson_id == lesson_id)
+    _delete(TeacherLesson, TeacherLesson.lesson_id == lesson_id)
+    _delete(Grade, Grade.lesson_id == lesson_id)
+    _delete(LessonGradeStats, LessonGradeStats.lesson_id == lesson_id)
+    return _delete(Lesson, Lesson.id == lesson_id)
+
+def delete_user(user_id):
+    """Kullanıcıyı denemeleri, ders kayıtları/atamaları ve notlarıyla birlikte siler
+    
+    Etkilenen (ders id'leri, test id'leri) döndürülür; ders istatistikleri ve
+    test özetleri çağıran tarafından yeniden hesaplanmalıdır. Kullanıcının
+    oluşturduğu testler silinmez (bkz. admin.delete_user).
+    """
+    lesson_ids = {lesson_id for lesson_id, in db.session.query(Grade.lesson_id).filter(Grade.student_id == user_id)}
+    test_ids = {test_id for test_id, in db.session.query(TestAttempt.test_id).filter(TestAttempt.student_id == user_id).distinct()}
+    
+    _delete_attempts(select(TestAttempt.id).where(TestAttempt.student_id == user_id))
+    _delete(StudentLesson, StudentLesson.student_id == user_id)
+    _delete(TeacherLesson, TeacherLesson.teacher_id == user_id)
+    _delete(Grade, Grade.student_id == user_id)
+    db.session.execute(
+        update(BackgroundJob).where(BackgroundJob.created_by == user_id).values(created_by=None),
+        execution_options={'synchronize_session': False}
+    )
+    _delete(User, User.id == user_id)
+    
+    return lesson_ids, test_ids
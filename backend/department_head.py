@@ -1,6 +1,12 @@
 from flask import Blueprint, request, jsonify
-from database import db, Lesson, Test, Grade, StudentLesson, TeacherLesson, User, TestAttempt, Role
+from database import db, Lesson, Test, Grade, StudentLesson, User, Role
 from utils import role_required
+from serializers import serialize_lessons, serialize_lesson, serialize_tests, user_full, load_lesson_teacher_lists
+from grade_stats import load_lesson_stats, load_test_summaries, combine_test_summaries
+from reports import (
+    lesson_department_averages, department_lesson_matrix, lesson_overview, teacher_overview,
+    teacher_lesson_loads, LESSON_SORTS, TEACHER_SORTS, SORT_ORDERS
+)
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import func
 
@@ -11,27 +17,17 @@ dept_head_bp = Blueprint('department_head', __name__)
 @role_required('department_head')
 def get_all_lessons():
     """Tüm dersleri listele"""
-    lessons = Lesson.query.all()
+    lessons = Lesson.query.order_by(Lesson.id).all()
+    lesson_stats = load_lesson_stats(lesson.id for lesson in lessons)
+    teacher_lists = load_lesson_teacher_lists(lesson.id for lesson in lessons)
     
     lessons_data = []
-    for lesson in lessons:
-        lesson_dict = lesson.to_dict()
+    for lesson, lesson_dict in zip(lessons, serialize_lessons(lessons, 'roster')):
+        lesson_dict['student_count'] = len(lesson_dict['students'])
         
-        student_count = StudentLesson.query.filter_by(lesson_id=lesson.id).count()
-        lesson_dict['student_count'] = student_count
+        lesson_dict['teachers'] = [user_full(user, role_name) for user, role_name in teacher_lists[lesson.id]]
         
-        teachers = TeacherLesson.query.filter_by(lesson_id=lesson.id).all()
-        lesson_dict['teachers'] = [tl.teacher.to_dict() for tl in teachers]
-        
-        grades = Grade.query.filter_by(lesson_id=lesson.id).all()
-        if grades:
-            total_scores = [float(g.total_score) for g in grades if g.total_score is not None]
-            if total_scores:
-                lesson_dict['average_score'] = sum(total_scores) / len(total_scores)
-            else:
-                lesson_dict['average_score'] = None
-        else:
-            lesson_dict['average_score'] = None
+        lesson_dict['average_score'] = lesson_stats[lesson.id]['total_score']['average']
         
         lessons_data.append(lesson_dict)
     
@@ -46,18 +42,19 @@ def get_lesson_detail(lesson_id):
     """Ders detaylarını getir (öğrenciler, ortalamalar, öğretmenler, bölüm bazında ortalamalar)"""
     lesson = Lesson.query.get_or_404(lesson_id)
     
-    student_lessons = StudentLesson.query.filter_by(lesson_id=lesson_id).all()
+    # Öğrenciler rol adlarıyla tek sorguda, notları da student_id'ye göre tek sorguda yüklenir
+    students = db.session.query(User, Role.name).join(
+        StudentLesson, StudentLesson.student_id == User.id
+    ).outerjoin(
+        Role, User.role_id == Role.id
+    ).filter(StudentLesson.lesson_id == lesson_id).order_by(StudentLesson.id).all()
+    grades = {grade.student_id: grade for grade in Grade.query.filter_by(lesson_id=lesson_id)}
     
     students_data = []
-    for sl in student_lessons:
-        student = sl.student
-        student_dict = student.to_dict()
-        
-        grade = Grade.query.filter_by(
-            student_id=student.id,
-            lesson_id=lesson_id
-        ).first()
+    for student, role_name in students:
+        student_dict = user_full(student, role_name)
         
+        grade = grades.get(student.id)
         if grade:
             student_dict['grade'] = {
                 'vize_score': float(grade.vize_score) if grade.vize_score else None,
@@ -72,82 +69,41 @@ def get_lesson_detail(lesson_id):
     
     total_students = len(students_data)
     
-    teachers = TeacherLesson.query.filter_by(lesson_id=lesson_id).all()
-    teachers_data = [tl.teacher.to_dict() for tl in teachers]
+    teachers_data = [
+        user_full(teacher, role_name)
+        for teacher, role_name in load_lesson_teacher_lists([lesson_id])[lesson_id]
+    ]
     
     tests = Test.query.filter_by(lesson_id=lesson_id).all()
     
-    vize_scores = []
-    final_scores = []
-    quiz_scores = []
-    total_scores = []
-    
-    for grade in Grade.query.filter_by(lesson_id=lesson_id).all():
-        if grade.vize_score is not None:
-            vize_scores.append(float(grade.vize_score))
-        if grade.final_score is not None:
-            final_scores.append(float(grade.final_score))
-        if grade.total_score is not None:
-            total_scores.append(float(grade.total_score))
-    
-    quiz_tests = [t for t in tests if t.test_type == 'quiz']
-    for quiz_test in quiz_tests:
-        quiz_attempts = TestAttempt.query.filter_by(test_id=quiz_test.id).all()
-        for attempt in quiz_attempts:
-            if attempt.score is not None:
-                quiz_scores.append(float(attempt.score))
+    stats = load_lesson_stats([lesson_id])[lesson_id]
+    summaries = load_test_summaries([t.id for t in tests])
+    
+    # Quiz ortalaması dersin tüm quizlerindeki gönderimlerin ortalamasıdır
+    quiz_summaries = [summaries[t.id] for t in tests if t.test_type == 'quiz']
     
     averages = {
-        'vize_average': sum(vize_scores) / len(vize_scores) if vize_scores else None,
-        'final_average': sum(final_scores) / len(final_scores) if final_scores else None,
-        'quiz_average': sum(quiz_scores) / len(quiz_scores) if quiz_scores else None,
-        'total_average': sum(total_scores) / len(total_scores) if total_scores else None
+        'vize_average': stats['vize_score']['average'],
+        'final_average': stats['final_score']['average'],
+        'quiz_average': combine_test_summaries(quiz_summaries),
+        'total_average': stats['total_score']['average']
     }
     
-    department_averages = {}
+    department_averages = lesson_department_averages(lesson_id)
     
-    student_role = Role.query.filter_by(name='student').first()
-    if student_role:
-        departments = db.session.query(User.department).filter(
-            User.role_id == student_role.id,
-            User.department.isnot(None)
-        ).distinct().all()
-        
-        for dept_tuple in departments:
-            dept_name = dept_tuple[0]
-            if not dept_name:
-                continue
-            
-            dept_students = db.session.query(User).join(StudentLesson).filter(
-                User.department == dept_name,
-                StudentLesson.lesson_id == lesson_id,
-                User.role_id == student_role.id
-            ).all()
-            
-            if dept_students:
-                dept_grades = []
-                for student in dept_students:
-                    grade = Grade.query.filter_by(
-                        student_id=student.id,
-                        lesson_id=lesson_id
-                    ).first()
-                    if grade and grade.total_score is not None:
-                        dept_grades.append(float(grade.total_score))
-                
-                if dept_grades:
-                    department_averages[dept_name] = {
-                        'student_count': len(dept_students),
-                        'average_score': sum(dept_grades) / len(dept_grades)
-                    }
+    tests_data = serialize_tests(tests, 'summary')
+    for test_data in tests_data:
+        test_data['score_summary'] = summaries[test_data['id']]
     
     return jsonify({
-        'lesson': lesson.to_dict(),
+        'lesson': serialize_lesson(lesson, 'detail'),
         'total_students': total_students,
         'students': students_data,
         'teachers': teachers_data,
         'averages': averages,
+        'grade_stats': stats,
         'department_averages': department_averages,
-        'tests': [t.to_dict() for t in tests]
+        'tests': tests_data
     }), 200
 
 @dept_head_bp.route('/lessons/<int:lesson_id>/averages', methods=['GET'])
@@ -157,82 +113,92 @@ def get_lesson_averages(lesson_id):
     """Dersin bölüm bazında ortalamalarını getir"""
     lesson = Lesson.query.get_or_404(lesson_id)
     
-    department_averages = {}
-    
-    student_role = Role.query.filter_by(name='student').first()
-    if student_role:
-        departments = db.session.query(User.department).filter(
-            User.role_id == student_role.id,
-            User.department.isnot(None)
-        ).distinct().all()
-        
-        for dept_tuple in departments:
-            dept_name = dept_tuple[0]
-            if not dept_name:
-                continue
-            
-            dept_students = db.session.query(User).join(StudentLesson).filter(
-                User.department == dept_name,
-                StudentLesson.lesson_id == lesson_id,
-                User.role_id == student_role.id
-            ).all()
-            
-            if dept_students:
-                dept_grades = []
-                for student in dept_students:
-                    grade = Grade.query.filter_by(
-                        student_id=student.id,
-                        lesson_id=lesson_id
-                    ).first()
-                    if grade and grade.total_score is not None:
-                        dept_grades.append(float(grade.total_score))
-                
-                if dept_grades:
-                    department_averages[dept_name] = {
-                        'student_count': len(dept_students),
-                        'average_score': sum(dept_grades) / len(dept_grades),
-                        'min_score': min(dept_grades),
-                        'max_score': max(dept_grades)
-                    }
+    department_averages = lesson_department_averages(lesson_id)
     
     return jsonify({
-        'lesson': lesson.to_dict(),
+        'lesson': serialize_lesson(lesson, 'summary'),
         'department_averages': department_averages
     }), 200
 
+@dept_head_bp.route('/department-averages', methods=['GET'])
+@jwt_required()
+@role_required('department_head')
+def get_department_lesson_matrix():
+    """Tüm dersler için bölüm x ders ortalama matrisini getir"""
+    return jsonify(department_lesson_matrix()), 200
+
 @dept_head_bp.route('/teachers', methods=['GET'])
 @jwt_required()
 @role_required('department_head')
 def get_all_teachers():
     """Tüm öğretim görevlilerini ve verdikleri dersleri listele"""
-    teacher_role = Role.query.filter_by(name='teacher').first()
-    if not teacher_role:
-        return jsonify({'teachers': []}), 200
+    teachers = User.query.join(Role, User.role_id == Role.id).filter(
+        Role.name == 'teacher'
+    ).order_by(User.id).all()
     
-    teachers = User.query.filter_by(role_id=teacher_role.id).all()
+    # Dersler ve öğrenci sayıları tek sorguda (bkz. reports.py)
+    loads = teacher_lesson_loads(teacher.id for teacher in teachers)
     
     teachers_data = []
     for teacher in teachers:
-        teacher_dict = teacher.to_dict()
-        
-        # Öğretmenin verdiği dersler
-        teacher_lessons = TeacherLesson.query.filter_by(teacher_id=teacher.id).all()
-        lessons_list = []
-        for tl in teacher_lessons:
-            lesson = tl.lesson
-            # Ders öğrenci sayısı
-            student_count = StudentLesson.query.filter_by(lesson_id=lesson.id).count()
-            lessons_list.append({
-                'id': lesson.id,
-                'name': lesson.name,
-                'student_count': student_count
-            })
-        
-        teacher_dict['lessons'] = lessons_list
-        teacher_dict['lesson_count'] = len(lessons_list)
+        teacher_dict = user_full(teacher, 'teacher')
+        teacher_dict['lessons'] = loads[teacher.id]
+        teacher_dict['lesson_count'] = len(teacher_dict['lessons'])
         teachers_data.append(teacher_dict)
     
     return jsonify({
         'teachers': teachers_data
     }), 200
 
+def _overview_args(sorts, default_sort):
+    """Sayfalama/sıralama parametrelerini okur: (args, error)"""
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 50))
+    except ValueError:
+        return None, 'page and per_page must be integers'
+    
+    if page < 1 or not 1 <= per_page <= 500:
+        return None, 'page must be >= 1 and per_page between 1 and 500'
+    
+    sort = request.args.get('sort', default_sort)
+    if sort not in sorts:
+        return None, f"sort must be one of: {', '.join(sorts)}"
+    
+    order = request.args.get('order', 'asc').lower()
+    if order not in SORT_ORDERS:
+        return None, 'order must be asc or desc'
+    
+    return {'page': page, 'per_page': per_page, 'sort': sort, 'order': order}, None
+
+@dept_head_bp.route('/overview/lessons', methods=['GET'])
+@jwt_required()
+@role_required('department_head')
+def get_lessons_overview():
+    """Fakülte özeti: derslerin kayıt sayısı, not ortalaması ve öğretim görevlisi (sayfalı, sıralanabilir)"""
+    args, error = _overview_args(LESSON_SORTS, 'name')
+    if error:
+        return jsonify({'error': error}), 400
+    
+    lessons, pagination = lesson_overview(**args)
+    
+    return jsonify({
+        'lessons': lessons,
+        'pagination': pagination
+    }), 200
+
+@dept_head_bp.route('/overview/teachers', methods=['GET'])
+@jwt_required()
+@role_required('department_head')
+def get_teachers_overview():
+    """Fakülte özeti: öğretim görevlilerinin ders ve öğrenci yükü (sayfalı, sıralanabilir)"""
+    args, error = _overview_args(TEACHER_SORTS, 'full_name')
+    if error:
+        return jsonify({'error': error}), 400
+    
+    teachers, pagination = teacher_overview(**args)
+    
+    return jsonify({
+        'teachers': teachers,
+        'pagination': pagination
+    }), 200
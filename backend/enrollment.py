@@ -0,0 +1,156 @@
+"""
+Ders kayıtları (öğrenci-ders) ve öğretmen atamaları (öğretmen-ders)
+
+Admin ekranlarından gelen listeler mevcut kayıtlarla karşılaştırılır: gönderilen
+id'ler tek bir IN sorgusuyla doğrulanır, mevcut küme tek sorguda okunur ve
+sadece gereken satırlar toplu olarak silinir/eklenir. Değişmeyen kayıtlar
+(ve created_at bilgileri) korunur. Commit çağırana aittir.
+
+Dönem başında bölümlerin derslere toplu kaydı enroll_cohort ile tek bir
+INSERT ... SELECT ... ON CONFLICT DO NOTHING komutuyla yapılır.
+"""
+from datetime import datetime
+from sqlalchemy import delete, select, literal, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from database import db, User, Role, Lesson, TeacherLesson, StudentLesson
+
+def _int_ids(values):
+    """Gönderilen id'leri int kümesine çevirir, geçersizleri atlar"""
+    ids = set()
+    for value in values or []:
+        try:
+            ids.add(int(value))
+        except (ValueError, TypeError):
+            continue
+    return ids
+
+def existing_lesson_ids(lesson_ids):
+    """Var olan ders id'leri (tek sorgu)"""
+    lesson_ids = _int_ids(lesson_ids)
+    if not lesson_ids:
+        return set()
+    return {lesson_id for lesson_id, in db.session.query(Lesson.id).filter(Lesson.id.in_(lesson_ids))}
+
+def existing_user_ids(user_ids, role):
+    """Verilen role sahip kullanıcıların id'leri (tek sorgu)"""
+    user_ids = _int_ids(user_ids)
+    if not user_ids:
+        return set()
+    return {
+        user_id for user_id, in db.session.query(User.id).join(
+            Role, User.role_id == Role.id
+        ).filter(User.id.in_(user_ids), Role.name == role)
+    }
+
+def _replace(model, owner_column, owner_id, member_column, desired):
+    """owner_id'nin üye kümesini desired yapar: (eklenen id'ler, silinen id'ler)"""
+    owner = getattr(model, owner_column)
+    member = getattr(model, member_column)
+    
+    current = {member_id for member_id, in db.session.query(member).filter(owner == owner_id)}
+    added = desired - current
+    removed = current - desired
+    
+    if removed:
+        db.session.execute(
+            delete(model).where(owner == owner_id, member.in_(removed)),
+            execution_options={'synchronize_session': False}
+        )
+    if added:
+        now = datetime.utcnow()
+        db.session.execute(model.__table__.insert(), [
+            {owner_column: owner_id, member_column: member_id, 'created_at': now}
+            for member_id in sorted(added)
+        ])
+    
+    return added, removed
+
+def replace_student_lessons(student_id, lesson_ids):
+    """Öğrencinin derslerini verilen listeyle değiştirir (olmayan dersler atlanır)"""
+    return _replace(StudentLesson, 'student_id', student_id, 'lesson_id', existing_lesson_ids(lesson_ids))
+
+def replace_lesson_students(lesson_id, student_ids):
+    """Dersin öğrencilerini verilen listeyle değiştirir (öğrenci olmayan id'ler atlanır)"""
+    return _replace(StudentLesson, 'lesson_id', lesson_id, 'student_id', existing_user_ids(student_ids, 'student'))
+
+def teacher_conflict(lesson_ids, teacher_id):
+    """Derslerden başka bir öğretmene atanmış olan ilki: (ders adı, öğretmen adı) veya None"""
+    if not lesson_ids:
+        return None
+    return db.session.query(Lesson.name, User.full_name).join(
+        TeacherLesson, TeacherLesson.lesson_id == Lesson.id
+    ).join(
+        User, TeacherLesson.teacher_id == User.id
+    ).filter(
+        Lesson.id.in_(lesson_ids),
+        TeacherLesson.teacher_id != teacher_id
+    ).order_by(Lesson.id).first()
+
+def replace_teacher_lessons(teacher_id, lesson_ids):
+    """Öğretmenin derslerini değiştirir: ((eklenen, silinen), hata)
+    
+    Bir derse sadece bir öğretmen atanabilir; derslerden biri başka bir öğretmene
+    atanmışsa hiçbir değişiklik yapılmaz ve hata mesajı döner.
+    """
+    desired = existing_lesson_ids(lesson_ids)
+    
+    conflict = teacher_conflict(desired, teacher_id)
+    if conflict:
+        lesson_name, teacher_name = conflict
+        return None, f'{lesson_name} dersini {teacher_name} veriyor. Bir derse sadece bir öğretim görevlisi atanabilir.'
+    
+    return _replace(TeacherLesson, 'teacher_id', teacher_id, 'lesson_id', desired), None
+
+def _dialect_insert(table):
+    dialect = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+    return dialect.insert(table)
+
+def enroll_cohort(lesson_codes, departments=None, student_numbers=None):
+    """Bölüm(ler)deki ve/veya numarası verilen öğrencileri derslere toplu kaydeder
+    
+    Kayıtlar tek bir INSERT ... SELECT ... ON CONFLICT DO NOTHING ile yazılır
+    (unique_student_lesson); zaten kayıtlı olanlar atlanır. Sayıları döndürür.
+    """
+    lesson_codes = {str(code).strip() for code in lesson_codes or [] if str(code).strip()}
+    departments = set(departments or [])
+    student_numbers = {str(number).strip() for number in student_numbers or [] if str(number).strip()}
+    
+    lessons = dict(db.session.query(Lesson.code, Lesson.id).filter(Lesson.code.in_(lesson_codes))) if lesson_codes else {}
+    
+    cohort = []
+    if departments:
+        cohort.append(User.department.in_(departments))
+    if student_numbers:
+        cohort.append(User.student_number.in_(student_numbers))
+    
+    students = db.session.query(User.id, User.student_number).join(
+        Role, User.role_id == Role.id
+    ).filter(Role.name == 'student', or_(*cohort)).subquery() if cohort else None
+    
+    found_numbers = set()
+    student_count = 0
+    if students is not None:
+        rows = db.session.query(students.c.student_number).all()
+        student_count = len(rows)
+        found_numbers = {number for number, in rows}
+    
+    enrolled_count = 0
+    if lessons and student_count:
+        pairs = select(
+            students.c.id, Lesson.id, literal(datetime.utcnow())
+        ).select_from(students).join(
+            Lesson, Lesson.id.in_(lessons.values())
+        )
+        statement = _dialect_insert(StudentLesson.__table__).from_select(
+            ['student_id', 'lesson_id', 'created_at'], pairs
+        ).on_conflict_do_nothing(index_elements=['student_id', 'lesson_id'])
+        enrolled_count = db.session.execute(statement).rowcount
+    
+    return {
+        'lesson_count': len(lessons),
+        'student_count': student_count,
+        'enrolled_count': enrolled_count,
+        'already_enrolled_count': len(lessons) * student_count - enrolled_count,
+        'unknown_lesson_codes': sorted(lesson_codes - set(lessons)),
+        'unknown_student_numbers': sorted(student_numbers - found_numbers)
+    }
@@ -0,0 +1,107 @@
+"""
+Sınav kağıdı (soru havuzu) önbelleği
+
+Sınav açıldığında tüm öğrenciler aynı anda /start çağırır. Soru havuzu her
+öğrenci için veritabanından okunmak yerine test başına bir kez yüklenip
+değişmez bir yapıya dönüştürülür; öğrenciye soru seçmek sadece indeks
+örneklemesidir.
+
+Önbellek her worker'da ayrıdır. Bu yüzden kağıt, testin questions_version
+değeriyle birlikte saklanır ve her kullanımda birincil anahtardan tek kolon
+okunarak karşılaştırılır. Soru havuzuna yazan her işlem (ekleme, silme,
+düzenleme, puan güncelleme) commit'ten önce touch_question_pool çağırmalıdır.
+Böylece başka bir worker'da yapılan değişiklikten sonra hiçbir worker eski
+kağıdı kullanmaz. invalidate_exam_paper yerel kopyayı hemen bırakır.
+"""
+import random
+import threading
+from datetime import datetime
+from sqlalchemy import update
+from database import db, Test, Question
+from cache import TTLCache, MISSING
+
+class ExamPaper:
+    """Bir testin soru havuzunun değişmez, kompakt hali"""
+    
+    __slots__ = ('test_id', 'question_ids', 'payloads', 'version', 'built_at')
+    
+    def __init__(self, test_id, questions, version=None):
+        self.test_id = test_id
+        self.version = version
+        self.question_ids = tuple(q.id for q in questions)
+        # Doğru cevap içermeyen, önceden serileştirilmiş soru sözlükleri
+        self.payloads = tuple(q.to_dict(include_correct=False) for q in questions)
+        self.built_at = datetime.now()
+    
+    def __len__(self):
+        return len(self.question_ids)
+    
+    def draw(self, count, rng=random):
+        """Havuzdan rastgele count soru seçer: (question_ids, questions_data)"""
+        count = min(count, len(self.question_ids))
+        indexes = rng.sample(range(len(self.question_ids)), count)
+        return (
+            [self.question_ids[i] for i in indexes],
+            [dict(self.payloads[i]) for i in indexes]
+        )
+
+_papers = TTLCache(ttl=300, maxsize=1000)
+
+# Sadece kağıdı oluşturulmakta olan testlerin kilitleri tutulur
+_build_locks = {}
+_build_locks_guard = threading.Lock()
+
+def _build_lock(test_id):
+    with _build_locks_guard:
+        return _build_locks.setdefault(test_id, threading.Lock())
+
+def _release_build_lock(test_id):
+    with _build_locks_guard:
+        _build_locks.pop(test_id, None)
+
+def pool_version(test_id):
+    """Soru havuzunun veritabanındaki sürümü (tests.questions_version)"""
+    return db.session.query(Test.questions_version).filter(Test.id == test_id).scalar()
+
+def touch_question_pool(test_id):
+    """Soru havuzunun sürümünü artırır; havuza yazan işlemlerde commit'ten önce çağrılmalı"""
+    db.session.execute(
+        update(Test).where(Test.id == test_id).values(questions_version=Test.questions_version + 1),
+        execution_options={'synchronize_session': False}
+    )
+
+def _cached_paper(test_id, version):
+    paper = _papers.get(test_id)
+    if paper is not MISSING and paper.version == version:
+        return paper
+    return None
+
+def get_exam_paper(test_id):
+    """Testin güncel sınav kağıdını döndürür; yoksa veya havuz değiştiyse tek sorguda oluşturur
+    
+    Aynı anda gelen istekler için havuz yalnızca bir kez yüklenir, diğerleri bekler.
+    Sürüm sorulardan önce okunur: arada yapılan bir yazım kağıdı eski sürümle
+    etiketler ve sonraki istek kağıdı yeniden oluşturur (tersi eski kağıdı yeni sanardı).
+    """
+    version = pool_version(test_id)
+    paper = _cached_paper(test_id, version)
+    if paper:
+        return paper
+    
+    try:
+        with _build_lock(test_id):
+            paper = _cached_paper(test_id, version)
+            if not paper:
+                questions = Question.query.filter_by(test_id=test_id).order_by(Question.id).all()
+                paper = ExamPaper(test_id, questions, version)
+                _papers.set(test_id, paper)
+    finally:
+        # Bekleyen istekler kilidi zaten almış olur; sonra gelenler kağıdı önbellekte bulur
+        _release_build_lock(test_id)
+    
+    return paper
+
+def invalidate_exam_paper(test_id):
+    """Soru havuzu değiştiğinde çağrılmalı (yerel kopya ve kilidi bırakılır)"""
+    _papers.invalidate(test_id)
+    _release_build_lock(test_id)
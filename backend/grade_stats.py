@@ -0,0 +1,358 @@
+"""
+Ders not istatistikleri
+
+Sınıf ortalaması gibi değerler her istekte dersin tüm notları okunarak
+hesaplanmak yerine lesson_grade_stats tablosundan okunur. Tabloda her ders ve
+not kolonu (vize/final/quiz/toplam) için count, toplam, kareler toplamı, min
+ve max tutulur; ortalama ve standart sapma bunlardan hesaplanır.
+
+update_grade her not değişikliğinde apply_grade_change ile farkı uygular
+(UPDATE ... SET count = count + 1 gibi, eşzamanlı yazımlarda güvenli).
+Notlar toplu silindiğinde veya tablo ilk kez oluşturulduğunda
+rebuild_lesson_stats tablodaki değerleri notlardan yeniden hesaplar.
+
+Test başına puan özetleri (test_score_summaries + test_score_buckets) aynı
+şekilde gönderimde (record_submission) artımlı güncellenir;
+rebuild_test_summaries denemelerden yeniden hesaplar. Başlatılan deneme sayısı
+tutulmaz: sınav başlangıcında herkesin aynı satırı güncellemesi istekleri
+sıraya sokardı. Bu sayı okunurken test_attempts'tan (test_id, student_id)
+indeksiyle sayılır.
+"""
+import math
+from decimal import Decimal
+from sqlalchemy import update, select, case, func, or_
+from sqlalchemy.exc import IntegrityError
+from database import db, Grade, LessonGradeStats, Test, TestAttempt, TestScoreSummary, TestScoreBucket
+
+SCORE_COLUMNS = ('vize_score', 'final_score', 'quiz_score', 'total_score')
+
+_CENTS = Decimal('0.01')
+
+def _as_decimal(value):
+    """Notu kolondaki hassasiyete (2 basamak) yuvarlar"""
+    if value is None:
+        return None
+    return Decimal(str(value)).quantize(_CENTS)
+
+def grade_scores(grade):
+    """Not kaydının kolon değerleri ({kolon: Decimal/None}), kayıt yoksa hepsi None"""
+    return {
+        column: _as_decimal(getattr(grade, column)) if grade else None
+        for column in SCORE_COLUMNS
+    }
+
+def _ensure_rows(lesson_id, columns):
+    """Dersin verilen kolonları için istatistik satırlarını (yoksa) oluşturur"""
+    existing = {
+        column for (column,) in db.session.query(LessonGradeStats.score_column).filter(
+            LessonGradeStats.lesson_id == lesson_id,
+            LessonGradeStats.score_column.in_(columns)
+        )
+    }
+    missing = [column for column in columns if column not in existing]
+    if not missing:
+        return
+    
+    try:
+        with db.session.begin_nested():
+            db.session.execute(LessonGradeStats.__table__.insert(), [
+                {'lesson_id': lesson_id, 'score_column': column, 'count': 0, 'total': 0, 'total_sq': 0}
+                for column in missing
+            ])
+    except IntegrityError:
+        # Eşzamanlı başka bir istek satırı oluşturdu
+        pass
+
+def apply_grade_change(lesson_id, old_scores, new_scores):
+    """Bir not kaydındaki değişikliği dersin istatistiklerine uygular (commit etmez)
+    
+    old_scores/new_scores: grade_scores() çıktısı. Sadece değişen kolonlar güncellenir.
+    Çıkarılan değer kolonun min/max'ı ise bunlar notlardan yeniden hesaplanır.
+    """
+    changes = {}
+    for column in SCORE_COLUMNS:
+        old = _as_decimal(old_scores.get(column))
+        new = _as_decimal(new_scores.get(column))
+        if old != new:
+            changes[column] = (old, new)
+    
+    if not changes:
+        return
+    
+    _ensure_rows(lesson_id, list(changes))
+    
+    stats = LessonGradeStats
+    for column, (old, new) in changes.items():
+        row_filter = (stats.lesson_id == lesson_id, stats.score_column == column)
+        
+        values = {
+            'count': stats.count + (int(new is not None) - int(old is not None)),
+            'total': stats.total + ((new or 0) - (old or 0)),
+            'total_sq': stats.total_sq + ((new or 0) ** 2 - (old or 0) ** 2)
+        }
+        if new is not None:
+            values['min_score'] = case(
+                (or_(stats.min_score.is_(None), stats.min_score > new), new),
+                else_=stats.min_score
+            )
+            values['max_score'] = case(
+                (or_(stats.max_score.is_(None), stats.max_score < new), new),
+                else_=stats.max_score
+            )
+        
+        db.session.execute(update(stats).where(*row_filter).values(**values))
+        
+        if old is not None:
+            score = getattr(Grade, column)
+            db.session.execute(
+                update(stats).where(
+                    *row_filter,
+                    or_(stats.min_score == old, stats.max_score == old)
+                ).values(
+                    min_score=select(func.min(score)).where(Grade.lesson_id == lesson_id).scalar_subquery(),
+                    max_score=select(func.max(score)).where(Grade.lesson_id == lesson_id).scalar_subquery()
+                )
+            )
+
+def rebuild_lesson_stats(lesson_ids=None):
+    """İstatistikleri notlardan yeniden hesaplar (lesson_ids=None ise tüm dersler), commit etmez"""
+    if lesson_ids is not None:
+        lesson_ids = set(lesson_ids)
+        if not lesson_ids:
+            return
+    
+    delete_query = LessonGradeStats.query
+    if lesson_ids is not None:
+        delete_query = delete_query.filter(LessonGradeStats.lesson_id.in_(lesson_ids))
+    delete_query.delete(synchronize_session=False)
+    
+    rows = []
+    for column in SCORE_COLUMNS:
+        score = getattr(Grade, column)
+        query = db.session.query(
+            Grade.lesson_id,
+            func.count(score),
+            func.sum(score),
+            func.sum(score * score),
+            func.min(score),
+            func.max(score)
+        ).filter(score.isnot(None))
+        if lesson_ids is not None:
+            query = query.filter(Grade.lesson_id.in_(lesson_ids))
+        
+        for lesson_id, count, total, total_sq, min_score, max_score in query.group_by(Grade.lesson_id):
+            rows.append({
+                'lesson_id': lesson_id,
+                'score_column': column,
+                'count': count,
+                'total': total or 0,
+                'total_sq': total_sq or 0,
+                'min_score': min_score,
+                'max_score': max_score
+            })
+    
+    if rows:
+        db.session.execute(LessonGradeStats.__table__.insert(), rows)
+
+def summarize_stats(stats):
+    """İstatistik satırının özeti: count, average, stddev, min, max"""
+    count = stats.count if stats else 0
+    if not count:
+        return {'count': 0, 'average': None, 'stddev': None, 'min': None, 'max': None}
+    
+    average = float(stats.total) / count
+    variance = max(0.0, float(stats.total_sq) / count - average * average)
+    return {
+        'count': count,
+        'average': average,
+        'stddev': math.sqrt(variance),
+        'min': float(stats.min_score) if stats.min_score is not None else None,
+        'max': float(stats.max_score) if stats.max_score is not None else None
+    }
+
+def load_lesson_stats(lesson_ids):
+    """Derslerin istatistiklerini tek sorguda yükler: {lesson_id: {kolon: özet}}
+    
+    Notu olmayan kolonlar için de count=0 özeti döndürülür.
+    """
+    lesson_ids = set(lesson_ids)
+    result = {
+        lesson_id: {column: summarize_stats(None) for column in SCORE_COLUMNS}
+        for lesson_id in lesson_ids
+    }
+    if not lesson_ids:
+        return result
+    
+    for stats in LessonGradeStats.query.filter(LessonGradeStats.lesson_id.in_(lesson_ids)):
+        result[stats.lesson_id][stats.score_column] = summarize_stats(stats)
+    
+    return result
+
+# Test puan özetleri
+HISTOGRAM_BUCKETS = 10
+BUCKET_WIDTH = 10
+
+def score_bucket(score):
+    """Puanın histogram aralığı: 0-10 -> 0, ..., 90 ve üstü -> 9"""
+    return min(max(int(float(score) // BUCKET_WIDTH), 0), HISTOGRAM_BUCKETS - 1)
+
+def ensure_test_summary(test_id):
+    """Testin özet ve histogram satırlarını (yoksa) oluşturur"""
+    if db.session.query(TestScoreSummary.id).filter_by(test_id=test_id).first():
+        return
+    
+    try:
+        with db.session.begin_nested():
+            db.session.execute(TestScoreSummary.__table__.insert(), [
+                {'test_id': test_id, 'submitted_count': 0, 'total': 0, 'total_sq': 0}
+            ])
+            db.session.execute(TestScoreBucket.__table__.insert(), [
+                {'test_id': test_id, 'bucket': bucket, 'count': 0}
+                for bucket in range(HISTOGRAM_BUCKETS)
+            ])
+    except IntegrityError:
+        # Eşzamanlı başka bir istek satırları oluşturdu
+        pass
+
+def _update_summary(test_id, statement):
+    """Özet satırını günceller; satır yoksa oluşturup tekrar dener"""
+    if db.session.execute(statement).rowcount == 0:
+        ensure_test_summary(test_id)
+        db.session.execute(statement)
+
+def record_submission(test_id, score):
+    """Deneme puanlandığında çağrılır: özet ve histogram tek satır güncellemesi ile (commit etmez)"""
+    score = _as_decimal(score or 0)
+    summary = TestScoreSummary
+    
+    _update_summary(test_id, update(summary).where(summary.test_id == test_id).values(
+        submitted_count=summary.submitted_count + 1,
+        total=summary.total + score,
+        total_sq=summary.total_sq + score * score,
+        min_score=case(
+            (or_(summary.min_score.is_(None), summary.min_score > score), score),
+            else_=summary.min_score
+        ),
+        max_score=case(
+            (or_(summary.max_score.is_(None), summary.max_score < score), score),
+            else_=summary.max_score
+        )
+    ))
+    _update_summary(test_id, update(TestScoreBucket).where(
+        TestScoreBucket.test_id == test_id,
+        TestScoreBucket.bucket == score_bucket(score)
+    ).values(count=TestScoreBucket.count + 1))
+
+def rebuild_test_summaries(test_ids=None):
+    """Testlerin (verilmezse tüm testlerin) özetlerini denemelerden yeniden hesaplar, commit etmez"""
+    if test_ids is None:
+        test_ids = [test_id for test_id, in db.session.query(Test.id)]
+    test_ids = set(test_ids)
+    if not test_ids:
+        return
+    
+    TestScoreBucket.query.filter(TestScoreBucket.test_id.in_(test_ids)).delete(synchronize_session=False)
+    TestScoreSummary.query.filter(TestScoreSummary.test_id.in_(test_ids)).delete(synchronize_session=False)
+    
+    submitted = TestAttempt.status == 'submitted'
+    score = func.coalesce(TestAttempt.score, 0)
+    rows = {
+        test_id: {
+            'test_id': test_id, 'submitted_count': 0, 'total': 0,
+            'total_sq': 0, 'min_score': None, 'max_score': None
+        }
+        for test_id in test_ids
+    }
+    
+    submitted_stats = db.session.query(
+        TestAttempt.test_id,
+        func.count(TestAttempt.id),
+        func.sum(score),
+        func.sum(score * score),
+        func.min(score),
+        func.max(score)
+    ).filter(TestAttempt.test_id.in_(test_ids), submitted).group_by(TestAttempt.test_id)
+    for test_id, count, total, total_sq, min_score, max_score in submitted_stats:
+        rows[test_id].update({
+            'submitted_count': count,
+            'total': total or 0,
+            'total_sq': total_sq or 0,
+            'min_score': min_score,
+            'max_score': max_score
+        })
+    
+    buckets = {(test_id, bucket): 0 for test_id in test_ids for bucket in range(HISTOGRAM_BUCKETS)}
+    for test_id, attempt_score in db.session.query(TestAttempt.test_id, score).filter(
+        TestAttempt.test_id.in_(test_ids), submitted
+    ):
+        buckets[(test_id, score_bucket(attempt_score))] += 1
+    
+    db.session.execute(TestScoreSummary.__table__.insert(), list(rows.values()))
+    db.session.execute(TestScoreBucket.__table__.insert(), [
+        {'test_id': test_id, 'bucket': bucket, 'count': count}
+        for (test_id, bucket), count in buckets.items()
+    ])
+
+def summarize_test(summary, bucket_counts, attempt_count=0):
+    """Test özetinin API şekli: deneme/gönderim sayıları, ortalama, standart sapma, min, max ve histogram"""
+    submitted = summary.submitted_count if summary else 0
+    data = {
+        'attempt_count': attempt_count,
+        'submitted_count': submitted,
+        'average': None,
+        'stddev': None,
+        'min': None,
+        'max': None
+    }
+    if submitted:
+        average = float(summary.total) / submitted
+        data.update({
+            'average': average,
+            'stddev': math.sqrt(max(0.0, float(summary.total_sq) / submitted - average * average)),
+            'min': float(summary.min_score) if summary.min_score is not None else None,
+            'max': float(summary.max_score) if summary.max_score is not None else None
+        })
+    
+    data['histogram'] = [
+        {
+            'from': bucket * BUCKET_WIDTH,
+            'to': (bucket + 1) * BUCKET_WIDTH,
+            'count': bucket_counts.get(bucket, 0)
+        }
+        for bucket in range(HISTOGRAM_BUCKETS)
+    ]
+    return data
+
+def load_test_summaries(test_ids):
+    """Testlerin puan özetlerini üç sorguda yükler: {test_id: özet}"""
+    test_ids = set(test_ids)
+    if not test_ids:
+        return {}
+    
+    summaries = {
+        summary.test_id: summary
+        for summary in TestScoreSummary.query.filter(TestScoreSummary.test_id.in_(test_ids))
+    }
+    bucket_counts = {test_id: {} for test_id in test_ids}
+    for bucket in TestScoreBucket.query.filter(TestScoreBucket.test_id.in_(test_ids)):
+        bucket_counts[bucket.test_id][bucket.bucket] = bucket.count
+    
+    # unique_test_student (test_id, student_id) indeksinden sayılır
+    attempt_counts = dict(db.session.query(
+        TestAttempt.test_id, func.count()
+    ).filter(TestAttempt.test_id.in_(test_ids)).group_by(TestAttempt.test_id))
+    
+    return {
+        test_id: summarize_test(summaries.get(test_id), bucket_counts[test_id], attempt_counts.get(test_id, 0))
+        for test_id in test_ids
+    }
+
+def combine_test_summaries(summaries):
+    """Birden fazla testin özetini (ör. dersin tüm quizleri) tek ortalamada birleştirir
+    
+    Ortalama, tüm gönderimlerin ortalamasıdır (test ortalamalarının ortalaması değil).
+    """
+    submitted = sum(s['submitted_count'] for s in summaries)
+    if not submitted:
+        return None
+    return sum(s['average'] * s['submitted_count'] for s in summaries if s['submitted_count']) / submitted
@@ -0,0 +1,198 @@
+"""
+Asenkron puanlama kuyruğu
+
+Sınav bitiş saatinde tüm öğrenciler aynı anda gönderim yapar. ASYNC_GRADING
+açıkken /submit endpoint'i ham cevapları submission_queue tablosuna yazıp
+202 ile bir makbuz (receipt) döndürür; puanlamayı arka plandaki worker'lar
+gruplar halinde yapar. Kuyruk tablosu broker görevi görür: PostgreSQL'de
+satırlar FOR UPDATE SKIP LOCKED ile alınır, böylece birden fazla süreç
+(gunicorn worker'ları veya ayrı bir worker süreci) aynı gönderimi iki kez
+puanlamaz.
+
+Ayrı süreç olarak çalıştırmak için: python grading_queue.py
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import or_, and_
+from sqlalchemy.exc import IntegrityError
+from database import db, TestAttempt, SubmissionReceipt
+from utils import check_exam_expired, finalize_attempt
+from autosave import forget_autosave_window
+from student_cache import invalidate_student_views, invalidate_view
+
+# 'grading' durumunda bu süreden uzun kalan kayıtlar (çöken worker) tekrar kuyruğa alınır
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+# 'failed' kayıtlar (ör. geçici veritabanı hatası) bu aralıkla tekrar puanlanır; alındıktan
+# FAILED_RETRY_WINDOW sonra hâlâ başarısız olan kayıt kesinleşir ve deneme eksik not
+# tamamlamada 0 ile kapatılır (bkz. missing_scores.py)
+FAILED_RETRY_DELAY = timedelta(minutes=1)
+FAILED_RETRY_WINDOW = timedelta(hours=1)
+
+# Aynı süreçteki thread'lerin aynı kayıtları almasını engeller (SQLite SKIP LOCKED desteklemez)
+_claim_lock = threading.Lock()
+
+def enqueue_submission(attempt, answers_data):
+    """Gönderimi kuyruğa yazar: (receipt, error)
+    
+    Süre kontrolü gönderimin alındığı anda yapılır. Aynı deneme için tekrar
+    gönderim yapılırsa mevcut makbuz döndürülür.
+    """
+    # Devam eden autosave yazımları beklenir; makbuzdan sonra gelenler reddedilir (bkz. autosave.py)
+    db.session.refresh(attempt, with_for_update=True)
+    
+    if attempt.status == 'submitted':
+        return None, "Sınav zaten gönderildi"
+    
+    if attempt.submission:
+        return attempt.submission, None
+    
+    is_expired, error = check_exam_expired(attempt)
+    if is_expired:
+        attempt.status = 'expired'
+        attempt.submitted_at = datetime.now()
+        db.session.commit()
+        invalidate_student_views(attempt.student_id)
+        return None, error
+    
+    receipt = SubmissionReceipt(
+        attempt_id=attempt.id,
+        answers=answers_data,
+        status='queued',
+        received_at=datetime.now()
+    )
+    
+    try:
+        db.session.add(receipt)
+        db.session.commit()
+        forget_autosave_window(attempt.test_id, attempt.student_id)
+    except IntegrityError:
+        # Eşzamanlı ikinci gönderim: ilk makbuzu döndür
+        db.session.rollback()
+        receipt = SubmissionReceipt.query.filter_by(attempt_id=attempt.id).first()
+    
+    return receipt, None
+
+def pending_receipts(now=None):
+    """Henüz sonuçlanmamış makbuzlar için koşul: kuyrukta, puanlanıyor veya tekrar denenecek"""
+    now = now or datetime.now()
+    return or_(
+        SubmissionReceipt.status.in_(('queued', 'grading')),
+        and_(
+            SubmissionReceipt.status == 'failed',
+            SubmissionReceipt.received_at > now - FAILED_RETRY_WINDOW
+        )
+    )
+
+def _claim_batch(batch_size):
+    """Kuyruktan en fazla batch_size kaydı 'grading' olarak işaretleyip döndürür"""
+    now = datetime.now()
+    
+    with _claim_lock:
+        receipts = SubmissionReceipt.query.filter(
+            or_(
+                SubmissionReceipt.status == 'queued',
+                and_(
+                    SubmissionReceipt.status == 'grading',
+                    SubmissionReceipt.claimed_at < now - CLAIM_TIMEOUT
+                ),
+                and_(
+                    SubmissionReceipt.status == 'failed',
+                    SubmissionReceipt.claimed_at < now - FAILED_RETRY_DELAY,
+                    SubmissionReceipt.received_at > now - FAILED_RETRY_WINDOW
+                )
+            )
+        ).order_by(SubmissionReceipt.id).limit(batch_size).with_for_update(skip_locked=True).all()
+        
+        for receipt in receipts:
+            receipt.status = 'grading'
+            receipt.claimed_at = now
+        
+        db.session.commit()
+    
+    return receipts
+
+def process_batch(batch_size=50):
+    """Bir grup gönderimi puanlar ve tek transaction'da yazar, işlenen kayıt sayısını döndürür
+    
+    Her gönderim kendi savepoint'inde puanlanır; hatalı olan 'failed' olarak
+    işaretlenir (FAILED_RETRY_DELAY sonra tekrar denenir), gruptaki diğerlerini etkilemez.
+    """
+    receipts = _claim_batch(batch_size)
+    if not receipts:
+        return 0
+    
+    attempts = {
+        attempt.id: attempt
+        for attempt in TestAttempt.query.filter(
+            TestAttempt.id.in_([r.attempt_id for r in receipts])
+        ).all()
+    }
+    
+    for receipt in receipts:
+        attempt = attempts.get(receipt.attempt_id)
+        try:
+            with db.session.begin_nested():
+                if attempt.status != 'submitted':
+                    finalize_attempt(attempt, receipt.answers, submitted_at=receipt.received_at)
+            receipt.status = 'graded'
+            receipt.graded_at = datetime.now()
+            receipt.error = None
+        except Exception as e:
+            receipt.status = 'failed'
+            receipt.error = str(e)
+    
+    db.session.commit()
+    
+    for attempt in attempts.values():
+        invalidate_student_views(attempt.student_id)
+    invalidate_view('lessons')  # sınıf ortalamaları değişti
+    
+    return len(receipts)
+
+def _worker_loop(app, batch_size, poll_interval, stop_event):
+    while not stop_event.is_set():
+        processed = 0
+        with app.app_context():
+            try:
+                processed = process_batch(batch_size)
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ Puanlama worker hatası: {e}")
+            finally:
+                db.session.remove()
+        
+        # Kuyruk boşsa bekle, doluysa hemen sıradaki gruba geç
+        if not processed:
+            stop_event.wait(poll_interval)
+
+def start_grading_workers(app, count=None, batch_size=None, poll_interval=None):
+    """Puanlama worker thread'lerini başlatır, durdurmak için kullanılacak Event'i döndürür"""
+    count = count if count is not None else app.config.get('GRADING_WORKERS', 2)
+    batch_size = batch_size or app.config.get('GRADING_BATCH_SIZE', 50)
+    poll_interval = poll_interval or app.config.get('GRADING_POLL_INTERVAL', 1.0)
+    
+    stop_event = threading.Event()
+    for i in range(count):
+        thread = threading.Thread(
+            target=_worker_loop,
+            args=(app, batch_size, poll_interval, stop_event),
+            name=f'grading-worker-{i}',
+            daemon=True
+        )
+        thread.start()
+    
+    return stop_event
+
+if __name__ == '__main__':
+    from app import create_app
+    
+    app = create_app()
+    stop_event = start_grading_workers(app, count=max(1, app.config.get('GRADING_WORKERS', 2)))
+    print("✅ Puanlama worker'ları çalışıyor (Ctrl+C ile durdurun)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stop_event.set()
@@ -1,4 +1,6 @@
-from database import db, Role, User
+from database import db, Role, User, Grade, LessonGradeStats, TestAttempt, TestScoreSummary
+from grade_stats import rebuild_lesson_stats, rebuild_test_summaries
+from search import ensure_search_indexes
 from sqlalchemy import text
 
 def init_database(app):
@@ -32,6 +34,27 @@ def init_database(app):
             db.session.commit()
             print(f"✓ Default admin created: {admin_email} / admin123")
         
+        # Ders not istatistikleri tablosu yeni oluşturulduysa mevcut notlardan doldur
+        if Grade.query.first() and not LessonGradeStats.query.first():
+            rebuild_lesson_stats()
+            db.session.commit()
+            print("✓ Lesson grade statistics rebuilt")
+        
+        # Test puan özetleri tablosu yeni oluşturulduysa mevcut denemelerden doldur
+        if TestAttempt.query.first() and not TestScoreSummary.query.first():
+            rebuild_test_summaries()
+            db.session.commit()
+            print("✓ Test score summaries rebuilt")
+        
+        # Arama indeksleri (PostgreSQL pg_trgm); eklenti kurulamazsa arama indekssiz çalışır
+        try:
+            if ensure_search_indexes():
+                db.session.commit()
+                print("✓ Search indexes created")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Warning: Could not create search indexes: {e}")
+        
         # Trigger'ları oluştur (init.sql'deki trigger'lar)
         try:
             # Trigger: updated_at otomatik güncelleme
@@ -128,7 +151,7 @@ def init_database(app):
             
             db.session.commit()
             print("Database initialized successfully with all tables, constraints, and triggers!")
-            
+        
         except Exception as e:
             print(f"Warning: Could not create triggers: {e}")
             print("Tables and roles created, but triggers may need to be created manually.")
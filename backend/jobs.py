@@ -0,0 +1,290 @@
+"""
+Arka plan iş kuyruğu (uzun süren admin işlemleri)
+
+Toplu öğrenci/ders yükleme ve eksik not tamamlama HTTP isteği içinde
+çalışırsa gunicorn zaman aşımı işi yarıda keser, her tekrar deneme işi baştan
+yapar. Bu endpoint'ler işi background_jobs tablosuna yazıp 202 ile iş
+bilgisini döndürür; ilerleme GET /api/admin/jobs/<id> ile izlenir.
+
+İş türleri register_job ile kaydedilir (bkz. admin.py). İşleyici (handler)
+işi gruplar halinde yapar ve her grubun sonunda save_checkpoint çağırır:
+checkpoint ve ilerleme grubun yazımlarıyla aynı commit'te kaydedilir. Worker
+çökerse JOB_CLAIM_TIMEOUT sonunda iş başka bir worker tarafından alınır ve
+işleyici job.checkpoint'ten devam eder. Checkpoint küçük tutulur (kaldığı yer
+ve sayaçlar); satır bazındaki sonuçlar add_job_items ile background_job_items
+tablosuna eklenir.
+
+Tablo kuyruk görevi görür: PostgreSQL'de işler FOR UPDATE SKIP LOCKED ile
+alınır (bkz. grading_queue.py). Ayrı süreç olarak çalıştırmak için: python jobs.py
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import or_, and_, update
+from sqlalchemy.orm.attributes import flag_modified
+from database import db, BackgroundJob, BackgroundJobItem
+
+# 'running' durumunda bu süre boyunca checkpoint kaydetmeyen işler (çöken worker) tekrar alınır
+JOB_CLAIM_TIMEOUT = timedelta(minutes=5)
+
+# Bir iş en fazla bu kadar kez başlatılır
+MAX_JOB_ATTEMPTS = 3
+
+# Üretilen şifreler (background_job_items.secret) iş bittikten en fazla bu süre sonra silinir
+JOB_SECRET_TTL = timedelta(hours=1)
+
+# Worker'lar boştayken süresi dolan şifreleri en fazla bu aralıkla temizler
+JOB_SECRET_SWEEP_INTERVAL = 60
+
+# job_type -> handler(job); handler işin sonucunu (JSON) döndürür
+_handlers = {}
+
+# job_type -> on_failed(job); iş kalıcı olarak başarısız olunca çağrılır (ör. geçici dosyaları silmek için)
+_failure_handlers = {}
+
+# job_type -> JOB_CLAIM_TIMEOUT yerine kullanılacak süre (checkpoint kaydedemeyen tek transaction'lık işler için)
+_claim_timeouts = {}
+
+_claim_lock = threading.Lock()
+
+class JobError(Exception):
+    """İşleyicinin tekrar denenmeden başarısız sayılmasını istediği hatalar"""
+
+def register_job(job_type, on_failed=None, claim_timeout=None):
+    """İş türü için işleyici kaydeden dekoratör
+    
+    on_failed verilirse iş 'failed' olarak işaretlendikten sonra işle çağrılır.
+    claim_timeout, arada checkpoint kaydedemeyen (tek transaction) işlerin
+    çalışırken başka bir worker tarafından tekrar alınmaması için verilir.
+    """
+    def decorator(handler):
+        _handlers[job_type] = handler
+        if on_failed is not None:
+            _failure_handlers[job_type] = on_failed
+        if claim_timeout is not None:
+            _claim_timeouts[job_type] = claim_timeout
+        return handler
+    return decorator
+
+def submit_job(job_type, payload, total=0, created_by=None):
+    """İşi kuyruğa yazar ve commit eder, işi döndürür"""
+    if job_type not in _handlers:
+        raise ValueError(f"Unknown job type: {job_type}")
+    
+    job = BackgroundJob(
+        job_type=job_type,
+        status='queued',
+        payload=payload,
+        progress_total=total,
+        created_by=created_by
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+def save_checkpoint(job, checkpoint, done=None, total=None):
+    """Grubun yazımlarını checkpoint ve ilerleme ile birlikte commit eder
+    
+    claimed_at da yenilenir; böylece uzun süren bir iş çökmüş sanılmaz.
+    """
+    job.checkpoint = checkpoint
+    flag_modified(job, 'checkpoint')
+    if done is not None:
+        job.progress_done = done
+    if total is not None:
+        job.progress_total = total
+    job.claimed_at = datetime.now()
+    db.session.commit()
+
+def add_job_items(job, results):
+    """Grubun satır sonuçlarını ({'created': [...], 'errors': [...], ...}) işe ekler, commit etmez
+    
+    Sonuçlar checkpoint'e yazılmaz (her checkpoint tüm listeyi yeniden yazardı).
+    'password' alanları data'ya değil secret kolonuna ayrılır.
+    """
+    rows = []
+    for kind, items in results.items():
+        for item in items:
+            data = dict(item)
+            secret = data.pop('password', None)
+            rows.append({'job_id': job.id, 'kind': kind, 'row': data.get('row'), 'data': data, 'secret': secret})
+    
+    if rows:
+        db.session.execute(BackgroundJobItem.__table__.insert(), rows)
+
+def load_job_items(job):
+    """İşin satır sonuçları türlerine göre, satır sırasında: {'created': [...], ...}
+    
+    Okuma yan etkisizdir: şifreler purge_job_secrets çağrılana (sonuçlar
+    onaylanana) veya JOB_SECRET_TTL dolana kadar her okumada döner.
+    """
+    results = {}
+    items = db.session.query(
+        BackgroundJobItem.kind, BackgroundJobItem.data, BackgroundJobItem.secret
+    ).filter(
+        BackgroundJobItem.job_id == job.id
+    ).order_by(BackgroundJobItem.row, BackgroundJobItem.id)
+    
+    # Süresi dolduğu halde henüz temizlenmemiş şifreler döndürülmez
+    expired = job.finished_at is not None and job.finished_at < datetime.now() - JOB_SECRET_TTL
+    
+    for kind, data, secret in items:
+        item = dict(data)
+        if secret is not None and not expired:
+            item['password'] = secret
+        results.setdefault(kind, []).append(item)
+    
+    return results
+
+def purge_job_secrets(job_id):
+    """İşin satır sonuçlarındaki şifreleri siler, silinen satır sayısını döndürür (commit çağırana aittir)"""
+    result = db.session.execute(
+        update(BackgroundJobItem).where(
+            BackgroundJobItem.job_id == job_id,
+            BackgroundJobItem.secret.isnot(None)
+        ).values(secret=None),
+        execution_options={'synchronize_session': False}
+    )
+    return result.rowcount
+
+def purge_expired_job_secrets():
+    """JOB_SECRET_TTL'den önce bitmiş işlerin şifrelerini siler ve commit eder"""
+    expired_jobs = db.session.query(BackgroundJob.id).filter(
+        BackgroundJob.finished_at < datetime.now() - JOB_SECRET_TTL
+    )
+    result = db.session.execute(
+        update(BackgroundJobItem).where(
+            BackgroundJobItem.job_id.in_(expired_jobs.scalar_subquery()),
+            BackgroundJobItem.secret.isnot(None)
+        ).values(secret=None),
+        execution_options={'synchronize_session': False}
+    )
+    db.session.commit()
+    return result.rowcount
+
+def _claim_job():
+    """Sıradaki işi 'running' olarak işaretleyip döndürür"""
+    now = datetime.now()
+    stale = BackgroundJob.claimed_at < now - JOB_CLAIM_TIMEOUT
+    if _claim_timeouts:
+        stale = or_(
+            and_(BackgroundJob.job_type.notin_(list(_claim_timeouts)), stale),
+            *[
+                and_(BackgroundJob.job_type == job_type, BackgroundJob.claimed_at < now - timeout)
+                for job_type, timeout in _claim_timeouts.items()
+            ]
+        )
+    
+    with _claim_lock:
+        job = BackgroundJob.query.filter(
+            or_(
+                BackgroundJob.status == 'queued',
+                and_(BackgroundJob.status == 'running', stale)
+            )
+        ).order_by(BackgroundJob.id).limit(1).with_for_update(skip_locked=True).first()
+        
+        if job:
+            job.status = 'running'
+            job.claimed_at = datetime.now()
+            job.attempts += 1
+        db.session.commit()
+    
+    return job
+
+def _finish(job, status, result=None, error=None):
+    job.status = status
+    job.result = result
+    job.error = error
+    job.finished_at = datetime.now()
+    if status == 'succeeded':
+        job.progress_done = job.progress_total
+    db.session.commit()
+    
+    on_failed = _failure_handlers.get(job.job_type)
+    if status == 'failed' and on_failed is not None:
+        try:
+            on_failed(job)
+        except Exception as e:
+            print(f"❌ Arka plan işi #{job.id} temizleme hatası: {e}")
+
+def run_next_job():
+    """Kuyruktaki bir işi çalıştırır, iş yoksa False döndürür"""
+    job = _claim_job()
+    if not job:
+        return False
+    
+    handler = _handlers.get(job.job_type)
+    if handler is None:
+        _finish(job, 'failed', error=f"Unknown job type: {job.job_type}")
+        return True
+    
+    try:
+        result = handler(job)
+        _finish(job, 'succeeded', result=result)
+    except Exception as e:
+        # Son checkpoint'ten sonraki yazımlar geri alınır
+        db.session.rollback()
+        job = db.session.get(BackgroundJob, job.id)
+        if isinstance(e, JobError) or job.attempts >= MAX_JOB_ATTEMPTS:
+            _finish(job, 'failed', error=str(e))
+        else:
+            # Tekrar kuyruğa: sonraki deneme checkpoint'ten devam eder
+            job.status = 'queued'
+            job.error = str(e)
+            db.session.commit()
+        print(f"❌ Arka plan işi #{job.id} hatası: {e}")
+    
+    return True
+
+def _worker_loop(app, poll_interval, stop_event):
+    last_sweep = 0
+    while not stop_event.is_set():
+        ran = False
+        with app.app_context():
+            try:
+                ran = run_next_job()
+                if not ran and time.monotonic() - last_sweep >= JOB_SECRET_SWEEP_INTERVAL:
+                    last_sweep = time.monotonic()
+                    purge_expired_job_secrets()
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ İş worker hatası: {e}")
+            finally:
+                db.session.remove()
+        
+        if not ran:
+            stop_event.wait(poll_interval)
+
+def start_job_workers(app, count=None, poll_interval=None):
+    """İş worker thread'lerini başlatır, durdurmak için kullanılacak Event'i döndürür"""
+    count = count if count is not None else app.config.get('JOB_WORKERS', 1)
+    poll_interval = poll_interval or app.config.get('JOB_POLL_INTERVAL', 1.0)
+    
+    stop_event = threading.Event()
+    for i in range(count):
+        thread = threading.Thread(
+            target=_worker_loop,
+            args=(app, poll_interval, stop_event),
+            name=f'job-worker-{i}',
+            daemon=True
+        )
+        thread.start()
+    
+    return stop_event
+
+if __name__ == '__main__':
+    from app import create_app
+    # İşleyiciler 'jobs' modülüne kaydedilir (bu dosya __main__ olarak çalışıyor)
+    from jobs import start_job_workers
+    
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    
+    stop_event = start_job_workers(app, count=max(1, app.config.get('JOB_WORKERS', 1)))
+    print("✅ İş worker'ları çalışıyor (Ctrl+C ile durdurun)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stop_event.set()
@@ -0,0 +1,100 @@
+"""
+Toplu ders içe aktarma (upsert)
+
+Excel'den gelen satırlar ders koduna göre eklenir veya (kod kayıtlıysa)
+adı güncellenir. Her grup için:
+- gruptaki kodlardan kayıtlı olanlar tek sorguda önceden yüklenir
+  (rapordaki created/updated ayrımı için),
+- satırlar tek bir INSERT ... ON CONFLICT (code) DO UPDATE ile, grup kendi
+  savepoint'inde olacak şekilde yazılır (lessons.code unique kısıtı).
+
+Grup hata verirse (ör. çok uzun kod) satır satır savepoint ile tekrar denenir;
+sadece hatalı satırlar raporlanır.
+"""
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from database import db, Lesson
+
+def _upsert_statement():
+    """Dialekte göre INSERT ... ON CONFLICT (code) DO UPDATE SET name = excluded.name"""
+    dialect = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+    statement = dialect.insert(Lesson.__table__)
+    return statement.on_conflict_do_update(
+        index_elements=['code'],
+        set_={'name': statement.excluded.name}
+    )
+
+def _existing_codes(codes):
+    return {code for code, in db.session.query(Lesson.code).filter(Lesson.code.in_(codes))}
+
+def _row_error(row, message, lesson):
+    return {'row': row, 'error': message, 'data': lesson}
+
+def _validate(rows, results):
+    """Boş ad/kod satırlarını hata olarak raporlar, geçerli satırları döndürür"""
+    candidates = []
+    for idx, lesson in rows:
+        name = str(lesson.get('name', '')).strip()
+        code = str(lesson.get('code', '')).strip()
+        
+        if not name:
+            results['errors'].append(_row_error(idx, 'Ders adı boş olamaz', lesson))
+            continue
+        
+        if not code:
+            results['errors'].append(_row_error(idx, 'Ders kodu boş olamaz', lesson))
+            continue
+        
+        candidates.append({'row': idx, 'code': code, 'name': name, 'data': lesson})
+    return candidates
+
+def _upsert_rows(candidates, results):
+    """Satırları tek tek savepoint ile yazar; hatalı satırlar raporlanır, yazılanlar döndürülür"""
+    statement = _upsert_statement()
+    written = []
+    for candidate in candidates:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(statement, [{'code': candidate['code'], 'name': candidate['name']}])
+            written.append(candidate)
+        except SQLAlchemyError as e:
+            results['errors'].append(_row_error(candidate['row'], str(e), candidate['data']))
+    return written
+
+def import_lessons(rows, results):
+    """Grubu yazar ve results['created'] / ['updated'] / ['errors'] listelerini doldurur, commit etmez
+    
+    rows: (dosyadaki satır numarası, {'name', 'code'}) çiftleri.
+    """
+    candidates = _validate(rows, results)
+    if not candidates:
+        return
+    
+    # Aynı kod grupta tekrar ederse tek satır yazılır (son satırın adıyla);
+    # ON CONFLICT aynı satırı bir komutta iki kez güncelleyemez
+    values = {}
+    for candidate in candidates:
+        values[candidate['code']] = candidate['name']
+    
+    known_codes = _existing_codes(list(values))
+    
+    try:
+        with db.session.begin_nested():
+            db.session.execute(_upsert_statement(), [
+                {'code': code, 'name': name} for code, name in values.items()
+            ])
+        written = candidates
+    except SQLAlchemyError:
+        written = _upsert_rows(candidates, results)
+    
+    for candidate in written:
+        # Dosyada ilk kez görülen yeni kod 'created', sonrakiler 'updated'
+        results_key = 'updated' if candidate['code'] in known_codes else 'created'
+        known_codes.add(candidate['code'])
+        results[results_key].append({
+            'row': candidate['row'],
+            'code': candidate['code'],
+            'name': candidate['name']
+        })
+    
+    results['errors'].sort(key=lambda error: error['row'])
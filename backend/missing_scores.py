@@ -0,0 +1,273 @@
+"""
+Süresi dolmuş sınavlara girmeyen öğrenciler için 0 notu (eksik not tamamlama)
+
+Öğrenci başına sorgu yerine iki küme işlemi kullanılır:
+- kayıtlı olup denemesi olmayan öğrenciler için INSERT ... SELECT (NOT EXISTS anti-join),
+- tamamlanmamış denemeler için tek UPDATE (kuyrukta puanlanmayı veya tekrar
+  denenmeyi bekleyen gönderimler hariç; kesin başarısız olanlar kapatılır).
+
+Sadece bitiş zamanı son çalıştırmadan (maintenance_marks'taki high-water mark)
+sonra olan sınavlar işlenir. Bekleyen gönderimi olan en erken sınav mark'ın
+önünde kalır; sonraki çalıştırma o sınavı tekrar işler. Etkilenen Grade satırları, ders istatistikleri,
+test özetleri ve yeni high-water mark aynı transaction'da yazılır; iş yarıda
+kalırsa hiçbiri kaydedilmez ve sonraki çalıştırma aynı aralığı tekrar işler.
+
+Test.end_time ve mark yerel saattir; karşılaştırmalar ve yazılan zaman
+damgaları da datetime.now() ile alınır.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, update, literal, and_, exists, func
+from sqlalchemy.exc import IntegrityError
+from database import (
+    db, Test, Lesson, User, StudentLesson, TestAttempt, SubmissionReceipt, Grade, MaintenanceMark
+)
+from grade_stats import rebuild_lesson_stats, rebuild_test_summaries
+from grading_queue import pending_receipts
+
+MARK_NAME = 'missing_scores'
+
+def _lock_mark():
+    """High-water mark satırını (yoksa oluşturup) kilitler; eşzamanlı çalıştırmalar sıraya girer"""
+    mark = db.session.query(MaintenanceMark).filter_by(name=MARK_NAME).with_for_update().first()
+    if mark:
+        return mark
+    
+    try:
+        with db.session.begin_nested():
+            db.session.add(MaintenanceMark(name=MARK_NAME))
+    except IntegrityError:
+        # Eşzamanlı başka bir çalıştırma satırı oluşturdu
+        pass
+    return db.session.query(MaintenanceMark).filter_by(name=MARK_NAME).with_for_update().one()
+
+def _insert_missing_attempts(test_filter, now):
+    """Kayıtlı olup denemesi olmayan öğrenciler için 0 puanlı gönderilmiş deneme ekler, eklenen id'leri döndürür"""
+    missing = select(
+        Test.id,
+        StudentLesson.student_id,
+        Test.end_time,
+        Test.end_time,
+        literal('submitted'),
+        literal(0),
+        literal(now)
+    ).join(
+        StudentLesson, StudentLesson.lesson_id == Test.lesson_id
+    ).where(
+        *test_filter,
+        ~exists().where(and_(
+            TestAttempt.test_id == Test.id,
+            TestAttempt.student_id == StudentLesson.student_id
+        ))
+    )
+    
+    statement = insert(TestAttempt).from_select(
+        ['test_id', 'student_id', 'started_at', 'submitted_at', 'status', 'score', 'created_at'],
+        missing
+    ).returning(TestAttempt.id)
+    return [attempt_id for attempt_id, in db.session.execute(statement)]
+
+def _close_stale_attempts(test_filter, now):
+    """Tamamlanmamış denemeleri 0 puanla kapatır (bekleyen gönderimler hariç), güncellenen id'leri döndürür"""
+    ended_tests = select(Test.id).where(*test_filter)
+    end_time = select(Test.end_time).where(Test.id == TestAttempt.test_id).scalar_subquery()
+    
+    statement = update(TestAttempt).where(
+        TestAttempt.test_id.in_(ended_tests),
+        TestAttempt.status != 'submitted',
+        ~exists().where(SubmissionReceipt.attempt_id == TestAttempt.id, pending_receipts(now))
+    ).values(
+        status='submitted',
+        score=0,
+        submitted_at=end_time
+    ).returning(TestAttempt.id).execution_options(synchronize_session=False)
+    return [attempt_id for attempt_id, in db.session.execute(statement)]
+
+def _earliest_pending_end(test_filter, now):
+    """Bekleyen gönderimi olan tamamlanmamış denemelerin en erken sınav bitiş zamanı (yoksa None)"""
+    return db.session.query(func.min(Test.end_time)).join(
+        TestAttempt, TestAttempt.test_id == Test.id
+    ).join(
+        SubmissionReceipt, SubmissionReceipt.attempt_id == TestAttempt.id
+    ).filter(
+        *test_filter,
+        TestAttempt.status != 'submitted',
+        pending_receipts(now)
+    ).scalar()
+
+def _updated_rows(attempt_ids):
+    """Güncellenen denemeler: (deneme id, test id, öğrenci id, ders id, öğrenci adı, ders adı, sınav türü)"""
+    if not attempt_ids:
+        return []
+    
+    return db.session.query(
+        TestAttempt.id,
+        TestAttempt.test_id,
+        TestAttempt.student_id,
+        Test.lesson_id,
+        User.full_name,
+        Lesson.name,
+        Test.test_type
+    ).join(
+        Test, TestAttempt.test_id == Test.id
+    ).join(
+        Lesson, Test.lesson_id == Lesson.id
+    ).join(
+        User, TestAttempt.student_id == User.id
+    ).filter(
+        TestAttempt.id.in_(attempt_ids)
+    ).order_by(Lesson.name, Test.id, User.full_name).all()
+
+def _grade_total(vize_score, final_score, current_total, vize_weight, final_weight):
+    """Toplam not (update_grade ile aynı kural): vize/final yoksa mevcut toplam korunur"""
+    if vize_score is not None and final_score is not None:
+        return (float(vize_score) * float(vize_weight) / 100.0) + (float(final_score) * float(final_weight) / 100.0)
+    if vize_score is not None:
+        return float(vize_score)
+    if final_score is not None:
+        return float(final_score)
+    return current_total
+
+def recompute_grades(affected):
+    """Etkilenen (öğrenci, ders) notlarını gönderilmiş denemelerden yeniden hesaplar, commit etmez
+    
+    affected: {(öğrenci id, ders id): {etkilenen sınav türleri}}. update_grade'deki gibi
+    vize/final notu en son gönderilen sınavın puanı, quiz notu tüm quizlerin ortalamasıdır;
+    sadece etkilenen türlerin kolonları ve toplam güncellenir.
+    """
+    if not affected:
+        return
+    
+    student_ids = {student_id for student_id, _ in affected}
+    lesson_ids = {lesson_id for _, lesson_id in affected}
+    
+    attempts = db.session.query(
+        TestAttempt.student_id,
+        Test.lesson_id,
+        Test.test_type,
+        TestAttempt.score,
+        Test.vize_weight,
+        Test.final_weight
+    ).join(
+        Test, TestAttempt.test_id == Test.id
+    ).filter(
+        TestAttempt.student_id.in_(student_ids),
+        Test.lesson_id.in_(lesson_ids),
+        TestAttempt.status == 'submitted'
+    ).order_by(TestAttempt.submitted_at, TestAttempt.id)
+    
+    # (öğrenci, ders) -> {'vize': son puan, 'final': son puan, 'quiz': [puanlar], 'weights': son ağırlıklar}
+    scores = {}
+    for student_id, lesson_id, test_type, score, vize_weight, final_weight in attempts:
+        key = (student_id, lesson_id)
+        if key not in affected:
+            continue
+        entry = scores.setdefault(key, {'quiz': []})
+        if test_type == 'quiz':
+            entry['quiz'].append(score or 0)
+        else:
+            entry[test_type] = score
+            entry['weights'] = (vize_weight, final_weight)
+    
+    # Vize/final denemesi olmayan notlar için dersin ağırlıkları kullanılır
+    lesson_weights = {
+        lesson_id: (vize_weight, final_weight)
+        for lesson_id, vize_weight, final_weight in db.session.query(
+            Lesson.id, Lesson.vize_weight, Lesson.final_weight
+        ).filter(Lesson.id.in_(lesson_ids))
+    }
+    
+    grades = {
+        (grade.student_id, grade.lesson_id): grade
+        for grade in Grade.query.filter(
+            Grade.student_id.in_(student_ids),
+            Grade.lesson_id.in_(lesson_ids)
+        )
+    }
+    
+    now = datetime.now()
+    updates, inserts = [], []
+    for key, test_types in affected.items():
+        entry = scores.get(key, {'quiz': []})
+        grade = grades.get(key)
+        values = {
+            'vize_score': grade.vize_score if grade else None,
+            'final_score': grade.final_score if grade else None,
+            'quiz_score': grade.quiz_score if grade else None
+        }
+        
+        for test_type in ('vize', 'final'):
+            if test_type in test_types and test_type in entry:
+                values[f'{test_type}_score'] = entry[test_type]
+        if 'quiz' in test_types and entry['quiz']:
+            values['quiz_score'] = sum(entry['quiz']) / len(entry['quiz'])
+        
+        vize_weight, final_weight = entry.get('weights') or lesson_weights[key[1]]
+        values['total_score'] = _grade_total(
+            values['vize_score'], values['final_score'],
+            grade.total_score if grade else None,
+            vize_weight, final_weight
+        )
+        values['updated_at'] = now
+        
+        if grade:
+            updates.append({'id': grade.id, **values})
+        else:
+            inserts.append({'student_id': key[0], 'lesson_id': key[1], 'created_at': now, **values})
+    
+    if updates:
+        db.session.execute(update(Grade), updates)
+    if inserts:
+        db.session.execute(Grade.__table__.insert(), inserts)
+
+def backfill_missing_scores(now=None):
+    """Son çalıştırmadan bu yana biten sınavlar için eksik notları tamamlar, commit çağırana aittir
+    
+    Dönen değer: {'updated_count', 'updated_students', 'test_ids', 'lesson_ids', 'since', 'until'}
+    """
+    now = now or datetime.now()
+    mark = _lock_mark()
+    since = mark.marked_at
+    
+    test_filter = [Test.end_time <= now]
+    if since is not None:
+        test_filter.append(Test.end_time > since)
+    
+    # Gönderimlerin bekleyip beklemediği (tekrar deneme süresi) gerçek saate göre belirlenir
+    checked_at = datetime.now()
+    
+    inserted_ids = set(_insert_missing_attempts(test_filter, checked_at))
+    closed_ids = set(_close_stale_attempts(test_filter, checked_at))
+    rows = _updated_rows(inserted_ids | closed_ids)
+    
+    affected = {}
+    test_ids, lesson_ids = set(), set()
+    updated_students = []
+    for attempt_id, test_id, student_id, lesson_id, student_name, lesson_name, test_type in rows:
+        affected.setdefault((student_id, lesson_id), set()).add(test_type)
+        test_ids.add(test_id)
+        lesson_ids.add(lesson_id)
+        updated_students.append({
+            'student_name': student_name,
+            'lesson_name': lesson_name,
+            'test_type': test_type.upper(),
+            'score': 0,
+            'reason': 'Sınava girmedi' if attempt_id in inserted_ids else 'Sınavı tamamlamadı'
+        })
+    
+    recompute_grades(affected)
+    rebuild_lesson_stats(lesson_ids)
+    rebuild_test_summaries(test_ids)
+    
+    # Bekleyen gönderimi olan sınav bir sonraki çalıştırmada tekrar işlenir (end_time > mark)
+    pending_end = _earliest_pending_end(test_filter, checked_at)
+    until = pending_end - timedelta(microseconds=1) if pending_end else now
+    mark.marked_at = until
+    
+    return {
+        'updated_count': len(rows),
+        'updated_students': updated_students,
+        'test_ids': sorted(test_ids),
+        'lesson_ids': sorted(lesson_ids),
+        'since': since.isoformat() if since else None,
+        'until': until.isoformat()
+    }
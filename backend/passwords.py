@@ -0,0 +1,115 @@
+"""
+Şifre hash'leme servisi
+
+Algoritma ve maliyet ayarlanabilir (create_app içinde configure_passwords):
+- PASSWORD_HASH_METHOD: 'bcrypt' (varsayılan) veya werkzeug yöntemleri ('scrypt', 'pbkdf2:sha256')
+- PASSWORD_BCRYPT_ROUNDS: bcrypt maliyeti (varsayılan 12)
+- PASSWORD_HASH_WORKERS: toplu hash'leme için süreç sayısı (varsayılan CPU sayısı)
+
+Hash'leme bilerek yavaştır; toplu içe aktarmada hash_passwords şifreleri bir
+süreç havuzuna dağıtır, böylece süre çekirdek sayısıyla ölçeklenir.
+verify_password hem bcrypt hem de eski werkzeug hash'lerini doğrular;
+needs_rehash ayarlar değiştiyse True döner ve giriş sırasında hash yenilenir.
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import bcrypt
+from werkzeug.security import generate_password_hash, check_password_hash
+
+BCRYPT_PREFIXES = ('$2a$', '$2b$', '$2y$')
+
+_settings = {
+    'method': 'bcrypt',
+    'bcrypt_rounds': 12,
+    'workers': os.cpu_count() or 1
+}
+
+# werkzeug yöntemlerinin hash önekleri (ör. 'scrypt' -> 'scrypt:32768:8:1')
+_werkzeug_prefixes = {}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def configure_passwords(method='bcrypt', bcrypt_rounds=12, workers=None):
+    """Hash ayarlarını belirler (create_app içinden çağrılır)"""
+    _settings['method'] = method
+    _settings['bcrypt_rounds'] = bcrypt_rounds
+    _settings['workers'] = workers or os.cpu_count() or 1
+
+def _hash(password, method, bcrypt_rounds):
+    """Tek şifreyi hash'ler (süreç havuzunda da çalışır, modül ayarlarına bakmaz)"""
+    if method == 'bcrypt':
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=bcrypt_rounds)).decode('utf-8')
+    return generate_password_hash(password, method=method)
+
+def hash_password(password):
+    """Şifreyi güncel ayarlarla hash'ler"""
+    return _hash(password, _settings['method'], _settings['bcrypt_rounds'])
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: worker'lar uygulamanın bağlantılarını/thread'lerini devralmaz
+            _pool = ProcessPoolExecutor(
+                max_workers=_settings['workers'],
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pool
+
+def _shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+atexit.register(_shutdown_pool)
+
+def hash_passwords(passwords):
+    """Şifreleri süreç havuzunda paralel hash'ler, aynı sırada döndürür"""
+    passwords = list(passwords)
+    method, rounds, workers = _settings['method'], _settings['bcrypt_rounds'], _settings['workers']
+    
+    if workers <= 1 or len(passwords) <= 1:
+        return [_hash(password, method, rounds) for password in passwords]
+    
+    chunksize = max(1, len(passwords) // (workers * 4))
+    count = len(passwords)
+    return list(_get_pool().map(
+        _hash, passwords, [method] * count, [rounds] * count, chunksize=chunksize
+    ))
+
+def verify_password(password_hash, password):
+    """Şifre hash ile eşleşiyor mu (bcrypt veya werkzeug hash'i)"""
+    if not password_hash or password is None:
+        return False
+    
+    if password_hash.startswith(BCRYPT_PREFIXES):
+        try:
+            return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+        except ValueError:
+            return False
+    
+    return check_password_hash(password_hash, password)
+
+def _werkzeug_prefix(method):
+    """werkzeug yönteminin hash öneki (bir kez hesaplanır)"""
+    if method not in _werkzeug_prefixes:
+        _werkzeug_prefixes[method] = generate_password_hash('', method=method).split('$', 1)[0]
+    return _werkzeug_prefixes[method]
+
+def needs_rehash(password_hash):
+    """Hash güncel algoritma/maliyetle üretilmemişse True"""
+    method = _settings['method']
+    
+    if method == 'bcrypt':
+        if not password_hash.startswith(BCRYPT_PREFIXES):
+            return True
+        # $2b$12$... -> maliyet 3. alanda
+        return int(password_hash.split('$')[2]) != _settings['bcrypt_rounds']
+    
+    return password_hash.split('$', 1)[0] != _werkzeug_prefix(method)
@@ -0,0 +1,243 @@
+"""
+Raporlama sorguları (bölüm başkanı analizleri)
+
+Bölüm bazında ortalamalar her bölüm ve öğrenci için ayrı sorgu atmak yerine
+users JOIN student_lesson LEFT JOIN grades üzerinde tek bir
+GROUP BY User.department sorgusu ile hesaplanır. Fakülte özeti (ders kayıt
+sayıları, not ortalamaları, öğretim görevlisi yükü) de sayfalı ve
+toplamlara göre sıralanabilir tek aggregate sorgular ile döndürülür.
+"""
+from sqlalchemy import func, and_, case, cast
+from database import db, User, Role, StudentLesson, TeacherLesson, Grade, Lesson, LessonGradeStats
+from serializers import lesson_brief, user_brief
+
+SORT_ORDERS = ('asc', 'desc')
+
+def _department_rows(lesson_ids=None):
+    """(lesson_id, department, student_count, graded_count, avg, min, max) satırları
+    
+    student_count derse kayıtlı öğrenci sayısı, graded_count toplam notu olanların
+    sayısıdır. Notu olan öğrencisi bulunmayan bölümler döndürülmez.
+    """
+    total_score = Grade.total_score
+    query = db.session.query(
+        StudentLesson.lesson_id,
+        User.department,
+        func.count(func.distinct(User.id)),
+        func.count(total_score),
+        func.avg(total_score),
+        func.min(total_score),
+        func.max(total_score)
+    ).join(
+        User, StudentLesson.student_id == User.id
+    ).join(
+        Role, and_(User.role_id == Role.id, Role.name == 'student')
+    ).outerjoin(
+        Grade, and_(Grade.student_id == User.id, Grade.lesson_id == StudentLesson.lesson_id)
+    ).filter(
+        User.department.isnot(None),
+        User.department != ''
+    )
+    
+    if lesson_ids is not None:
+        query = query.filter(StudentLesson.lesson_id.in_(lesson_ids))
+    
+    return query.group_by(
+        StudentLesson.lesson_id, User.department
+    ).having(
+        func.count(total_score) > 0
+    ).order_by(User.department).all()
+
+def _summary(student_count, graded_count, average, min_score, max_score):
+    return {
+        'student_count': student_count,
+        'graded_count': graded_count,
+        'average_score': float(average) if average is not None else None,
+        'min_score': float(min_score) if min_score is not None else None,
+        'max_score': float(max_score) if max_score is not None else None
+    }
+
+def lesson_department_averages(lesson_id):
+    """Dersin bölüm bazında not özetleri: {bölüm: özet}"""
+    return {
+        department: _summary(*values)
+        for _, department, *values in _department_rows([lesson_id])
+    }
+
+def department_lesson_matrix():
+    """Tüm dersler için bölüm x ders not özetleri (tek sorgu + ders listesi)
+    
+    Dönen yapı: {'departments': [...], 'lessons': [...], 'cells': [...]}
+    Her hücre bir (bölüm, ders) çiftinin özetidir; notu olmayan çiftler yer almaz.
+    """
+    rows = _department_rows()
+    
+    lessons = Lesson.query.order_by(Lesson.code).all()
+    cells = []
+    departments = []
+    for lesson_id, department, *values in rows:
+        if department not in departments:
+            departments.append(department)
+        cell = {'department': department, 'lesson_id': lesson_id}
+        cell.update(_summary(*values))
+        cells.append(cell)
+    
+    return {
+        'departments': departments,
+        'lessons': [lesson_brief(lesson) for lesson in lessons],
+        'cells': cells
+    }
+
+def _enrollment_counts():
+    """Ders başına kayıtlı öğrenci sayısı alt sorgusu (lesson_id, student_count)"""
+    return db.session.query(
+        StudentLesson.lesson_id.label('lesson_id'),
+        func.count(StudentLesson.id).label('student_count')
+    ).group_by(StudentLesson.lesson_id).subquery()
+
+def _paginate(query, total, page, per_page, sort_column, order, tiebreaker):
+    """Sıralama + LIMIT/OFFSET uygular: (satırlar, sayfalama bilgisi)"""
+    ordering = sort_column.desc() if order == 'desc' else sort_column.asc()
+    rows = query.order_by(ordering.nulls_last(), tiebreaker).limit(per_page).offset((page - 1) * per_page).all()
+    return rows, {
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': (total + per_page - 1) // per_page
+    }
+
+LESSON_SORTS = ('name', 'code', 'student_count', 'average_score', 'teacher_name')
+
+def lesson_overview(page=1, per_page=50, sort='name', order='asc'):
+    """Derslerin kayıt sayısı, not ortalaması ve öğretim görevlisi özeti (sayfalı)
+    
+    Kayıt sayıları tek GROUP BY alt sorgusundan, ortalamalar lesson_grade_stats
+    tablosundan (bkz. grade_stats.py) okunur; sayfa tek sorguda gelir.
+    """
+    enrollment = _enrollment_counts()
+    first_assignment = db.session.query(
+        TeacherLesson.lesson_id.label('lesson_id'),
+        func.min(TeacherLesson.id).label('assignment_id')
+    ).group_by(TeacherLesson.lesson_id).subquery()
+    
+    student_count = func.coalesce(enrollment.c.student_count, 0)
+    average_score = case(
+        (LessonGradeStats.count > 0, cast(LessonGradeStats.total, db.Float) / LessonGradeStats.count),
+        else_=None
+    )
+    
+    query = db.session.query(
+        Lesson,
+        student_count,
+        func.coalesce(LessonGradeStats.count, 0),
+        average_score,
+        User
+    ).outerjoin(
+        enrollment, enrollment.c.lesson_id == Lesson.id
+    ).outerjoin(
+        LessonGradeStats,
+        and_(LessonGradeStats.lesson_id == Lesson.id, LessonGradeStats.score_column == 'total_score')
+    ).outerjoin(
+        first_assignment, first_assignment.c.lesson_id == Lesson.id
+    ).outerjoin(
+        TeacherLesson, TeacherLesson.id == first_assignment.c.assignment_id
+    ).outerjoin(
+        User, User.id == TeacherLesson.teacher_id
+    )
+    
+    sort_columns = {
+        'name': Lesson.name,
+        'code': Lesson.code,
+        'student_count': student_count,
+        'average_score': average_score,
+        'teacher_name': User.full_name
+    }
+    rows, pagination = _paginate(
+        query, Lesson.query.count(), page, per_page, sort_columns[sort], order, Lesson.id
+    )
+    
+    lessons = []
+    for lesson, enrolled, graded, average, teacher in rows:
+        data = lesson_brief(lesson)
+        data['student_count'] = enrolled
+        data['graded_count'] = graded
+        data['average_score'] = float(average) if average is not None else None
+        data['teacher'] = user_brief(teacher)
+        lessons.append(data)
+    
+    return lessons, pagination
+
+TEACHER_SORTS = ('full_name', 'email', 'lesson_count', 'student_count')
+
+def teacher_overview(page=1, per_page=50, sort='full_name', order='asc'):
+    """Öğretim görevlilerinin ders ve öğrenci yükü (sayfalı, tek GROUP BY sorgusu)"""
+    enrollment = _enrollment_counts()
+    
+    lesson_count = func.count(TeacherLesson.id)
+    student_count = func.coalesce(func.sum(enrollment.c.student_count), 0)
+    
+    teachers = db.session.query(User).join(
+        Role, and_(User.role_id == Role.id, Role.name == 'teacher')
+    )
+    query = db.session.query(
+        User, lesson_count, student_count
+    ).join(
+        Role, and_(User.role_id == Role.id, Role.name == 'teacher')
+    ).outerjoin(
+        TeacherLesson, TeacherLesson.teacher_id == User.id
+    ).outerjoin(
+        enrollment, enrollment.c.lesson_id == TeacherLesson.lesson_id
+    ).group_by(User.id)
+    
+    sort_columns = {
+        'full_name': User.full_name,
+        'email': User.email,
+        'lesson_count': lesson_count,
+        'student_count': student_count
+    }
+    rows, pagination = _paginate(
+        query, teachers.count(), page, per_page, sort_columns[sort], order, User.id
+    )
+    
+    results = []
+    for teacher, lessons, students in rows:
+        data = user_brief(teacher)
+        data['department'] = teacher.department
+        data['lesson_count'] = lessons
+        data['student_count'] = int(students)
+        results.append(data)
+    
+    return results, pagination
+
+def teacher_lesson_loads(teacher_ids):
+    """Öğretim görevlilerinin dersleri ve ders başına öğrenci sayıları (tek sorgu)
+    
+    {teacher_id: [{'id', 'name', 'student_count'}, ...]}
+    """
+    teacher_ids = set(teacher_ids)
+    loads = {teacher_id: [] for teacher_id in teacher_ids}
+    if not teacher_ids:
+        return loads
+    
+    enrollment = _enrollment_counts()
+    rows = db.session.query(
+        TeacherLesson.teacher_id,
+        Lesson.id,
+        Lesson.name,
+        func.coalesce(enrollment.c.student_count, 0)
+    ).join(
+        Lesson, TeacherLesson.lesson_id == Lesson.id
+    ).outerjoin(
+        enrollment, enrollment.c.lesson_id == Lesson.id
+    ).filter(
+        TeacherLesson.teacher_id.in_(teacher_ids)
+    ).order_by(TeacherLesson.id).all()
+    
+    for teacher_id, lesson_id, name, student_count in rows:
+        loads[teacher_id].append({
+            'id': lesson_id,
+            'name': name,
+            'student_count': student_count
+        })
+    
+    return loads
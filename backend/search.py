@@ -0,0 +1,130 @@
+"""
+Admin paneli arama sorguları (kullanıcılar ve dersler)
+
+Arama terimi ad, email, öğrenci numarası (kullanıcılar) veya ders kodu/adı
+(dersler) üzerinde ILIKE ile eşlenir. PostgreSQL'de bu kolonlar için pg_trgm
+GIN indeksleri oluşturulur (bkz. ensure_search_indexes), böylece hem önek
+hem de içerik aramaları tablo taraması yapmadan indeksten cevaplanır.
+
+Sonuçlar sıralıdır: tam eşleşme, önek eşleşmesi, içerik eşleşmesi;
+PostgreSQL'de aynı grupta trigram benzerliği (similarity) yüksek olan önce gelir.
+"""
+from sqlalchemy import text, case, func, or_, and_, exists, literal
+from database import db, User, Role, Lesson, StudentLesson, TeacherLesson
+from serializers import user_full, lesson_brief
+
+SEARCH_INDEXES = (
+    ('ix_users_full_name_trgm', 'users', 'full_name'),
+    ('ix_users_email_trgm', 'users', 'email'),
+    ('ix_users_student_number_trgm', 'users', 'student_number'),
+    ('ix_lessons_name_trgm', 'lessons', 'name'),
+    ('ix_lessons_code_trgm', 'lessons', 'code'),
+)
+
+def ensure_search_indexes():
+    """pg_trgm eklentisini ve arama indekslerini oluşturur (sadece PostgreSQL, commit etmez)"""
+    if db.engine.dialect.name != 'postgresql':
+        return False
+    
+    db.session.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    for name, table, column in SEARCH_INDEXES:
+        db.session.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)"
+        ))
+    return True
+
+def _rank(term, columns):
+    """Eşleşme sırası: 0 tam eşleşme, 1 önek, 2 içerik"""
+    lowered = term.lower()
+    return case(
+        (or_(*[func.lower(column) == lowered for column in columns]), 0),
+        (or_(*[column.istartswith(term, autoescape=True) for column in columns]), 1),
+        else_=2
+    )
+
+def _similarity(term, columns):
+    """PostgreSQL'de en yüksek trigram benzerliği, diğer veritabanlarında sabit"""
+    if db.engine.dialect.name != 'postgresql':
+        return literal(0)
+    return func.greatest(*[func.similarity(func.coalesce(column, ''), term) for column in columns])
+
+def _matches(term, columns):
+    return or_(*[column.icontains(term, autoescape=True) for column in columns])
+
+def _page(query, page, per_page):
+    """LIMIT/OFFSET uygular; sonraki sayfa var mı anlamak için bir fazla satır okunur"""
+    rows = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+    return rows[:per_page], {
+        'page': page,
+        'per_page': per_page,
+        'has_more': len(rows) > per_page
+    }
+
+def user_rows_query():
+    """Kullanıcı kolonları + rol adı (tek JOIN); satırlar user_full ile aynı alanlara sahiptir"""
+    return db.session.query(
+        User.id,
+        User.email,
+        User.full_name,
+        User.role_id,
+        Role.name.label('role_name'),
+        User.department,
+        User.student_number,
+        User.created_at
+    ).join(Role, User.role_id == Role.id)
+
+def not_in_lesson(lesson_id):
+    """Derse kayıtlı (öğrenci) veya atanmış (öğretmen) olmayan kullanıcılar için anti-join koşulu"""
+    enrolled = exists().where(and_(
+        StudentLesson.student_id == User.id,
+        StudentLesson.lesson_id == lesson_id
+    ))
+    assigned = exists().where(and_(
+        TeacherLesson.teacher_id == User.id,
+        TeacherLesson.lesson_id == lesson_id
+    ))
+    return and_(~enrolled, ~assigned)
+
+def search_users(term, role=None, excluded_lesson_id=None, page=1, per_page=20, department=None):
+    """Kullanıcı araması: (kullanıcılar, sayfalama bilgisi)
+    
+    excluded_lesson_id verilirse o derse kayıtlı (öğrenci) veya atanmış (öğretmen)
+    kullanıcılar NOT EXISTS ile dışlanır. Boş terim tüm eşleşenleri ada göre döndürür.
+    """
+    columns = (User.full_name, User.email, User.student_number)
+    
+    query = user_rows_query()
+    
+    if role:
+        query = query.filter(Role.name == role)
+    
+    if department:
+        query = query.filter(User.department == department)
+    
+    if excluded_lesson_id is not None:
+        query = query.filter(not_in_lesson(excluded_lesson_id))
+    
+    if term:
+        query = query.filter(_matches(term, columns)).order_by(
+            _rank(term, columns), _similarity(term, columns).desc(), User.full_name, User.id
+        )
+    else:
+        query = query.order_by(User.full_name, User.id)
+    
+    rows, pagination = _page(query, page, per_page)
+    return [user_full(row, row.role_name) for row in rows], pagination
+
+def search_lessons(term, page=1, per_page=20):
+    """Ders araması (kod ve ad üzerinde): (dersler, sayfalama bilgisi)"""
+    columns = (Lesson.code, Lesson.name)
+    
+    query = Lesson.query
+    if term:
+        query = query.filter(_matches(term, columns)).order_by(
+            _rank(term, columns), _similarity(term, columns).desc(), Lesson.code, Lesson.id
+        )
+    else:
+        query = query.order_by(Lesson.code, Lesson.id)
+    
+    rows, pagination = _page(query, page, per_page)
+    return [lesson_brief(lesson) for lesson in rows], pagination
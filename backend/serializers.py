@@ -0,0 +1,339 @@
+"""
+Model serileştirme katmanı
+
+Model'lerin to_dict() metotları ilişkileri tek tek (lazy) yükleyip iç içe
+serileştirir. Buradaki fonksiyonlar ise bir kayıt listesini alır, gereken
+ilişkileri projeksiyon başına tek bir toplu (IN) sorgu ile yükler ve
+endpoint'in açıkça seçtiği projeksiyonu döndürür:
+
+- summary: kaydın kendi alanları + ilişkilerin kısa özeti (id, ad)
+- detail:  summary + ilişkili kayıtların tam hali (koleksiyonlar hariç)
+- roster:  detail + dersin kayıtlı öğrenci listesi
+"""
+from sqlalchemy import func
+from database import db, User, Role, Lesson, TeacherLesson, StudentLesson, Test, Question
+
+PROJECTIONS = ('summary', 'detail', 'roster')
+
+def _check_projection(projection):
+    """Projeksiyon adını doğrular"""
+    if projection not in PROJECTIONS:
+        raise ValueError(f"Unknown projection: {projection}")
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+# Toplu yükleyiciler (her biri tek sorgu)
+def load_users(user_ids):
+    """Kullanıcıları rol adlarıyla birlikte tek sorguda yükler: {id: (user, role_name)}"""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+    
+    rows = db.session.query(User, Role.name).outerjoin(
+        Role, User.role_id == Role.id
+    ).filter(User.id.in_(user_ids)).all()
+    
+    return {user.id: (user, role_name) for user, role_name in rows}
+
+def load_lessons(lesson_ids):
+    """Dersleri tek sorguda yükler: {id: lesson}"""
+    lesson_ids = set(lesson_ids)
+    if not lesson_ids:
+        return {}
+    
+    return {lesson.id: lesson for lesson in Lesson.query.filter(Lesson.id.in_(lesson_ids)).all()}
+
+def load_lesson_teachers(lesson_ids):
+    """Her dersin (ilk) öğretmenini tek sorguda yükler: {lesson_id: user}"""
+    lesson_ids = set(lesson_ids)
+    if not lesson_ids:
+        return {}
+    
+    rows = db.session.query(TeacherLesson.lesson_id, User).join(
+        User, TeacherLesson.teacher_id == User.id
+    ).filter(TeacherLesson.lesson_id.in_(lesson_ids)).order_by(TeacherLesson.id).all()
+    
+    teachers = {}
+    for lesson_id, user in rows:
+        teachers.setdefault(lesson_id, user)
+    return teachers
+
+def load_lesson_teacher_lists(lesson_ids):
+    """Derslerin tüm öğretmenlerini rol adlarıyla tek sorguda yükler: {lesson_id: [(user, role_name), ...]}"""
+    lesson_ids = set(lesson_ids)
+    if not lesson_ids:
+        return {}
+    
+    rows = db.session.query(TeacherLesson.lesson_id, User, Role.name).join(
+        User, TeacherLesson.teacher_id == User.id
+    ).outerjoin(
+        Role, User.role_id == Role.id
+    ).filter(TeacherLesson.lesson_id.in_(lesson_ids)).order_by(TeacherLesson.id).all()
+    
+    teachers = {lesson_id: [] for lesson_id in lesson_ids}
+    for lesson_id, user, role_name in rows:
+        teachers[lesson_id].append((user, role_name))
+    return teachers
+
+def load_lesson_rosters(lesson_ids):
+    """Derslerin öğrenci listelerini tek sorguda yükler: {lesson_id: [user, ...]}"""
+    lesson_ids = set(lesson_ids)
+    if not lesson_ids:
+        return {}
+    
+    rows = db.session.query(StudentLesson.lesson_id, User).join(
+        User, StudentLesson.student_id == User.id
+    ).filter(StudentLesson.lesson_id.in_(lesson_ids)).order_by(StudentLesson.id).all()
+    
+    rosters = {lesson_id: [] for lesson_id in lesson_ids}
+    for lesson_id, user in rows:
+        rosters[lesson_id].append(user)
+    return rosters
+
+def load_question_counts(test_ids):
+    """Testlerin soru sayılarını tek GROUP BY sorgusu ile yükler: {test_id: count}"""
+    test_ids = set(test_ids)
+    if not test_ids:
+        return {}
+    
+    rows = db.session.query(Question.test_id, func.count(Question.id)).filter(
+        Question.test_id.in_(test_ids)
+    ).group_by(Question.test_id).all()
+    
+    return dict(rows)
+
+def load_questions(question_ids):
+    """Soruları tek sorguda yükler: {id: question}"""
+    question_ids = set(question_ids)
+    if not question_ids:
+        return {}
+    
+    return {q.id: q for q in Question.query.filter(Question.id.in_(question_ids)).all()}
+
+# Tekil kayıt sözlükleri (sorgu atmaz)
+def user_brief(user):
+    """Kullanıcının kısa hali (id, ad, email)"""
+    if not user:
+        return None
+    return {
+        'id': user.id,
+        'full_name': user.full_name,
+        'email': user.email
+    }
+
+def student_brief(user):
+    """Öğrencinin kısa hali (öğrenci numarası dahil)"""
+    if not user:
+        return None
+    data = user_brief(user)
+    data['student_number'] = user.student_number
+    return data
+
+def user_full(user, role_name):
+    """User.to_dict() ile aynı şekil, rol adı önceden yüklenmiş olarak"""
+    if not user:
+        return None
+    return {
+        'id': user.id,
+        'email': user.email,
+        'full_name': user.full_name,
+        'role_id': user.role_id,
+        'role_name': role_name,
+        'department': user.department,
+        'student_number': user.student_number,
+        'created_at': _iso(user.created_at)
+    }
+
+def lesson_brief(lesson):
+    """Dersin kısa hali (id, kod, ad)"""
+    if not lesson:
+        return None
+    return {
+        'id': lesson.id,
+        'code': lesson.code,
+        'name': lesson.name
+    }
+
+def lesson_full(lesson, teacher=None, students=None):
+    """Lesson.to_dict() ile aynı şekil; students=None ise öğrenci listesi eklenmez"""
+    if not lesson:
+        return None
+    data = {
+        'id': lesson.id,
+        'code': lesson.code,
+        'name': lesson.name,
+        'vize_weight': float(lesson.vize_weight) if lesson.vize_weight else 40.00,
+        'final_weight': float(lesson.final_weight) if lesson.final_weight else 60.00,
+        'teacher': user_brief(teacher),
+        'created_at': _iso(lesson.created_at)
+    }
+    if students is not None:
+        data['students'] = [student_brief(s) for s in students]
+    return data
+
+def serialize_lessons(lessons, projection='roster'):
+    """Ders listesini serileştirir (ders kataloğu)
+    
+    Ders sayısından bağımsız olarak sabit sayıda sorgu atar: öğretmenler için
+    bir, öğrenci listeleri için bir sorgu. 'roster' Lesson.to_dict() ile aynı
+    şekli döndürür; 'detail' öğrenci listesini, 'summary' öğretmeni de atlar.
+    """
+    _check_projection(projection)
+    lessons = list(lessons)
+    if not lessons:
+        return []
+    
+    if projection == 'summary':
+        return [lesson_brief(lesson) for lesson in lessons]
+    
+    lesson_ids = {lesson.id for lesson in lessons}
+    teachers = load_lesson_teachers(lesson_ids)
+    rosters = load_lesson_rosters(lesson_ids) if projection == 'roster' else {}
+    
+    return [
+        lesson_full(
+            lesson,
+            teacher=teachers.get(lesson.id),
+            students=rosters.get(lesson.id, []) if projection == 'roster' else None
+        )
+        for lesson in lessons
+    ]
+
+def serialize_lesson(lesson, projection='roster'):
+    """Tek bir dersi serileştirir"""
+    return serialize_lessons([lesson], projection)[0]
+
+def test_fields(test):
+    """Testin kendi kolonları (ilişkisiz)"""
+    return {
+        'id': test.id,
+        'lesson_id': test.lesson_id,
+        'teacher_id': test.teacher_id,
+        'test_type': test.test_type,
+        'start_time': _iso(test.start_time),
+        'end_time': _iso(test.end_time),
+        'duration': test.duration,
+        'min_questions': test.min_questions,
+        'vize_weight': float(test.vize_weight) if test.vize_weight else None,
+        'final_weight': float(test.final_weight) if test.final_weight else None,
+        'created_at': _iso(test.created_at)
+    }
+
+def attempt_fields(attempt):
+    """Denemenin kendi kolonları (ilişkisiz)"""
+    return {
+        'id': attempt.id,
+        'test_id': attempt.test_id,
+        'student_id': attempt.student_id,
+        'started_at': _iso(attempt.started_at),
+        'submitted_at': _iso(attempt.submitted_at),
+        'status': attempt.status,
+        'score': float(attempt.score) if attempt.score else 0.00,
+        'created_at': _iso(attempt.created_at)
+    }
+
+# Liste serileştiricileri
+def serialize_tests(tests, projection='summary'):
+    """Test listesini seçilen projeksiyonda serileştirir"""
+    _check_projection(projection)
+    tests = list(tests)
+    if not tests:
+        return []
+    
+    lesson_ids = {t.lesson_id for t in tests}
+    lessons = load_lessons(lesson_ids)
+    users = load_users(t.teacher_id for t in tests)
+    question_counts = load_question_counts(t.id for t in tests)
+    
+    lesson_teachers = {}
+    rosters = {}
+    if projection != 'summary':
+        lesson_teachers = load_lesson_teachers(lesson_ids)
+    if projection == 'roster':
+        rosters = load_lesson_rosters(lesson_ids)
+    
+    results = []
+    for test in tests:
+        data = test_fields(test)
+        lesson = lessons.get(test.lesson_id)
+        teacher, role_name = users.get(test.teacher_id, (None, None))
+        
+        if projection == 'summary':
+            data['lesson'] = lesson_brief(lesson)
+            data['teacher'] = user_brief(teacher)
+        else:
+            data['lesson'] = lesson_full(
+                lesson,
+                teacher=lesson_teachers.get(test.lesson_id),
+                students=rosters.get(test.lesson_id) if projection == 'roster' else None
+            )
+            data['teacher'] = user_full(teacher, role_name)
+        
+        data['question_count'] = question_counts.get(test.id, 0)
+        results.append(data)
+    
+    return results
+
+def serialize_test(test, projection='summary'):
+    """Tek bir testi serileştirir"""
+    return serialize_tests([test], projection)[0]
+
+def serialize_attempts(attempts, projection='summary', tests=None):
+    """Deneme listesini serileştirir
+    
+    summary: deneme alanları + öğrencinin kısa hali
+    detail/roster: + öğrencinin tam hali ve aynı projeksiyonda test
+    tests: önceden serileştirilmiş testler ({test_id: dict}); verilirse tekrar yüklenmez
+    """
+    _check_projection(projection)
+    attempts = list(attempts)
+    if not attempts:
+        return []
+    
+    users = load_users(a.student_id for a in attempts)
+    
+    if projection != 'summary' and tests is None:
+        test_ids = {a.test_id for a in attempts}
+        test_rows = Test.query.filter(Test.id.in_(test_ids)).all()
+        tests = {t['id']: t for t in serialize_tests(test_rows, projection)}
+    
+    results = []
+    for attempt in attempts:
+        data = attempt_fields(attempt)
+        student, role_name = users.get(attempt.student_id, (None, None))
+        
+        if projection == 'summary':
+            data['student'] = student_brief(student)
+        else:
+            data['student'] = user_full(student, role_name)
+            data['test'] = tests.get(attempt.test_id)
+        
+        results.append(data)
+    
+    return results
+
+def serialize_attempt(attempt, projection='summary'):
+    """Tek bir denemeyi serileştirir"""
+    return serialize_attempts([attempt], projection)[0]
+
+def serialize_answers(answers, include_correct=True):
+    """Cevapları soruları tek sorguda yükleyerek serileştirir (Answer.to_dict() şekli)"""
+    answers = list(answers)
+    questions = load_questions(a.question_id for a in answers)
+    
+    results = []
+    for answer in answers:
+        question = questions.get(answer.question_id)
+        results.append({
+            'id': answer.id,
+            'attempt_id': answer.attempt_id,
+            'question_id': answer.question_id,
+            'selected_answer': answer.selected_answer,
+            'is_correct': answer.is_correct,
+            'points_earned': float(answer.points_earned) if answer.points_earned else 0.00,
+            'question': question.to_dict(include_correct=include_correct) if question else None,
+            'created_at': _iso(answer.created_at)
+        })
+    
+    return results
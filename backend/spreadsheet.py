@@ -0,0 +1,121 @@
+"""
+Toplu yükleme dosyalarını (CSV / XLSX) satır satır okuma
+
+Yüklenen dosya diske kaydedilir (UPLOAD_DIR) ve arka plan işi onu baştan
+sona akış halinde okur; dosyanın tamamı hiçbir zaman belleğe alınmaz.
+- CSV: csv modülü (UTF-8, BOM'lu olabilir; UTF-8 değilse Türkçe Windows
+  kodlaması cp1254 varsayılır; ayraç ',' veya ';' otomatik seçilir)
+- XLSX: openpyxl read-only modu (opsiyonel, 'openpyxl' paketi gerekir)
+
+İlk satır başlıktır; ilk hücresi boş olan satırlar atlanır. Satır numaraları
+dosyadaki gerçek satır numaralarıdır (hata raporları için).
+"""
+import codecs
+import csv
+import os
+import uuid
+
+UPLOAD_FORMATS = {'.csv': 'csv', '.xlsx': 'xlsx'}
+
+def upload_format(filename):
+    """Dosya uzantısına göre 'csv' / 'xlsx', desteklenmiyorsa None"""
+    return UPLOAD_FORMATS.get(os.path.splitext(filename or '')[1].lower())
+
+def xlsx_supported():
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def save_upload(file_storage, upload_dir, file_format):
+    """Yüklenen dosyayı benzersiz bir adla diske yazar (parça parça), yolunu döndürür"""
+    os.makedirs(upload_dir, exist_ok=True)
+    path = os.path.join(upload_dir, f'{uuid.uuid4().hex}.{file_format}')
+    file_storage.save(path)
+    return path
+
+def remove_upload(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _cell_text(value):
+    """Hücre değerini metne çevirir (Excel sayıları: 20240001.0 -> '20240001')"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+def _csv_encoding(path):
+    """Dosya baştan sona geçerli UTF-8 ise 'utf-8-sig', değilse 'cp1254'
+    
+    Türkçe Excel "CSV (virgülle ayrılmış)" kaydı cp1254 kullanır; kodlama satır
+    okunurken değil önceden belirlenir, böylece hata dosyanın ortasında çıkmaz.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    with open(path, 'rb') as f:
+        try:
+            for block in iter(lambda: f.read(65536), b''):
+                decoder.decode(block)
+            decoder.decode(b'', final=True)
+        except UnicodeDecodeError:
+            return 'cp1254'
+    return 'utf-8-sig'
+
+def _csv_rows(path):
+    with open(path, newline='', encoding=_csv_encoding(path)) as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(f, dialect)
+
+def _xlsx_rows(path):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RuntimeError("XLSX dosyaları için 'openpyxl' paketi gerekli: pip install openpyxl")
+    
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        # read-only modda dosya açık kalır
+        workbook.close()
+
+def iter_records(path, file_format, columns):
+    """Veri satırlarını (satır numarası, {kolon: metin}) olarak sırayla üretir
+    
+    columns: dosyadaki kolon sırasına göre alan adları, ör. ('name', 'code').
+    """
+    rows = _xlsx_rows(path) if file_format == 'xlsx' else _csv_rows(path)
+    for row_number, row in enumerate(rows, start=1):
+        if row_number == 1:
+            continue
+        cells = [_cell_text(value) for value in row[:len(columns)]]
+        if not cells or not cells[0]:
+            continue
+        cells += [''] * (len(columns) - len(cells))
+        yield row_number, dict(zip(columns, cells))
+
+def estimate_rows(path, file_format):
+    """İlerleme için yaklaşık veri satırı sayısı (başlık hariç, boş satırlar dahil)"""
+    if file_format == 'xlsx':
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            return 0
+        workbook = load_workbook(path, read_only=True)
+        try:
+            max_row = workbook.worksheets[0].max_row
+        finally:
+            workbook.close()
+        return max(0, (max_row or 1) - 1)
+    
+    with open(path, 'rb') as f:
+        return max(0, sum(1 for _ in f) - 1)
@@ -1,7 +1,13 @@
-from flask import Blueprint, request, jsonify
-from database import db, User, Lesson, Test, TestAttempt, Question, Answer, StudentLesson, Grade
-from utils import role_required, get_current_user, start_exam, submit_exam, check_exam_expired
+from flask import Blueprint, request, jsonify, current_app
+from database import db, User, Lesson, Test, TestAttempt, Question, Answer, StudentLesson, Grade, SubmissionReceipt
+from utils import role_required, get_current_user, start_exam, submit_exam, check_exam_expired, validate_answer
+from autosave import get_autosave_window, forget_autosave_window, save_answers
+from grading_queue import enqueue_submission
+from serializers import serialize_lessons, serialize_test, serialize_attempt, load_questions, test_fields, lesson_brief
+from grade_stats import load_lesson_stats
+from student_cache import student_view_key, get_student_view, store_student_view, etag_matches
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import select, and_
 from datetime import datetime
 
 student_bp = Blueprint('student', __name__)
@@ -10,18 +16,27 @@ student_bp = Blueprint('student', __name__)
 @jwt_required()
 @role_required('student')
 def get_student_lessons():
-    """Öğrencinin derslerini listele"""
+    """Öğrencinin derslerini listele (not ve sınıf ortalamasıyla, önbellekli)"""
     current_user_id = int(get_jwt_identity())
-    
+    return _cached_view_response('lessons', current_user_id, _build_student_lessons)
+
+def _build_student_lessons(current_user_id):
     student_lessons = StudentLesson.query.filter_by(student_id=current_user_id).all()
+    lesson_rows = Lesson.query.filter(
+        Lesson.id.in_([sl.lesson_id for sl in student_lessons])
+    ).all() if student_lessons else []
+    lessons_by_id = {l['id']: l for l in serialize_lessons(lesson_rows, 'roster')}
+    
+    grades = {
+        grade.lesson_id: grade
+        for grade in Grade.query.filter_by(student_id=current_user_id).all()
+    }
+    lesson_stats = load_lesson_stats(lessons_by_id)
     
     lessons = []
     for sl in student_lessons:
-        lesson_data = sl.lesson.to_dict()
-        grade = Grade.query.filter_by(
-            student_id=current_user_id,
-            lesson_id=sl.lesson_id
-        ).first()
+        lesson_data = lessons_by_id[sl.lesson_id]
+        grade = grades.get(sl.lesson_id)
         
         if grade:
             lesson_data['grade'] = {
@@ -32,49 +47,47 @@ def get_student_lessons():
         else:
             lesson_data['grade'] = None
         
-        # Dersin sınıf ortalamasını hesapla
-        all_grades = Grade.query.filter_by(lesson_id=sl.lesson_id).all()
-        total_scores = [float(g.total_score) for g in all_grades if g.total_score is not None]
-        if total_scores:
-            lesson_data['class_average'] = sum(total_scores) / len(total_scores)
-        else:
-            lesson_data['class_average'] = None
+        # Dersin sınıf ortalaması (bkz. grade_stats.py)
+        lesson_data['class_average'] = lesson_stats[sl.lesson_id]['total_score']['average']
         
         lessons.append(lesson_data)
     
-    return jsonify({
+    return {
         'lessons': lessons
-    }), 200
+    }
 
 @student_bp.route('/tests/available', methods=['GET'])
 @jwt_required()
 @role_required('student')
 def get_available_tests():
-    """Tüm testleri listele (gelecek, aktif, geçmiş)"""
-    current_user_id = int(get_jwt_identity())
-    now = datetime.now()
+    """Tüm testleri listele (gelecek, aktif, geçmiş)
     
-    student_lessons = StudentLesson.query.filter_by(student_id=current_user_id).all()
-    lesson_ids = [sl.lesson_id for sl in student_lessons]
-    
-    if not lesson_ids:
-        return jsonify({
-            'tests': []
-        }), 200
+    Cevap öğrenci başına önbellekte tutulur (bkz. student_cache.py). Önbellekte
+    yoksa öğrencinin derslerindeki testler ve kendi denemesi tek LEFT JOIN
+    sorgusu ile okunur. If-None-Match eşleşirse 304 döndürülür.
+    """
+    current_user_id = int(get_jwt_identity())
+    return _cached_view_response('available_tests', current_user_id, _build_available_tests)
+
+def _build_available_tests(current_user_id):
+    enrolled_lesson_ids = select(StudentLesson.lesson_id).where(
+        StudentLesson.student_id == current_user_id
+    )
     
     # Tüm sınavları getir (gelecek, aktif, geçmiş), start_time'a göre sırala
-    available_tests = Test.query.filter(
-        Test.lesson_id.in_(lesson_ids)
+    rows = db.session.query(Test, Lesson, TestAttempt).join(
+        Lesson, Test.lesson_id == Lesson.id
+    ).outerjoin(
+        TestAttempt,
+        and_(TestAttempt.test_id == Test.id, TestAttempt.student_id == current_user_id)
+    ).filter(
+        Test.lesson_id.in_(enrolled_lesson_ids)
     ).order_by(Test.start_time.desc()).all()
     
     tests_data = []
-    for test in available_tests:
-        test_data = test.to_dict()
-        
-        attempt = TestAttempt.query.filter_by(
-            test_id=test.id,
-            student_id=current_user_id
-        ).first()
+    for test, lesson, attempt in rows:
+        test_data = test_fields(test)
+        test_data['lesson'] = lesson_brief(lesson)
         
         if attempt:
             test_data['attempt_status'] = attempt.status
@@ -88,9 +101,37 @@ def get_available_tests():
         
         tests_data.append(test_data)
     
-    return jsonify({
+    return {
         'tests': tests_data
-    }), 200
+    }
+
+def _cached_view_response(view, student_id, build):
+    """Öğrenci görünümünü önbellekten (yoksa build ile hazırlayıp) ETag ile döndürür"""
+    key = student_view_key(view, student_id)
+    cached = get_student_view(key)
+    
+    if cached:
+        etag, payload = cached
+    else:
+        payload = build(student_id)
+        etag = store_student_view(key, payload)
+    
+    if etag_matches(request.headers.get('If-None-Match'), etag):
+        return _not_modified(etag)
+    
+    response = jsonify(payload)
+    _set_etag(response, etag)
+    return response, 200
+
+def _set_etag(response, etag):
+    """Tarayıcının her istekte If-None-Match ile doğrulama yapmasını sağlar"""
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers['Vary'] = 'Authorization'
+    return response
+
+def _not_modified(etag):
+    return _set_etag(current_app.response_class(status=304), etag)
 
 @student_bp.route('/tests/<int:test_id>/start', methods=['POST'])
 @jwt_required()
@@ -110,7 +151,7 @@ def start_test(test_id):
     
     return jsonify({
         'message': 'Test started successfully',
-        'attempt': attempt.to_dict(),
+        'attempt': serialize_attempt(attempt, 'summary'),
         'questions': questions_data,
         'remaining_time_seconds': max(0, int(remaining_time)),
         'duration_seconds': test.duration,
@@ -158,7 +199,7 @@ def get_test_attempt(test_id):
     duration_expired = elapsed > test.duration
     
     return jsonify({
-        'attempt': attempt.to_dict(),
+        'attempt': serialize_attempt(attempt, 'summary'),
         'questions': questions_data,
         'remaining_time_seconds': max(0, int(remaining_time)),
         'duration_seconds': test.duration,
@@ -168,6 +209,59 @@ def get_test_attempt(test_id):
         'can_continue': attempt.status == 'started' and not time_window_expired and not duration_expired
     }), 200
 
+@student_bp.route('/tests/<int:test_id>/answers', methods=['PATCH'])
+@jwt_required()
+@role_required('student')
+def autosave_answers(test_id):
+    """Cevapları otomatik kaydet (sadece değişen cevaplar, tek UPDATE ile yazılır)"""
+    current_user_id = int(get_jwt_identity())
+    data = request.get_json()
+    
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+    
+    answers_data = data.get('answers', [])
+    
+    if not answers_data:
+        return jsonify({'error': 'Answers are required'}), 400
+    
+    changes = {}
+    for answer_data in answers_data:
+        try:
+            question_id = int(answer_data.get('question_id'))
+        except (AttributeError, TypeError, ValueError):
+            return jsonify({'error': 'Invalid question_id'}), 400
+        
+        selected_answer = answer_data.get('selected_answer')
+        if not validate_answer(selected_answer):
+            return jsonify({'error': 'Invalid answer. Must be a, b, c or d'}), 400
+        
+        changes[question_id] = selected_answer
+    
+    window = get_autosave_window(test_id, current_user_id)
+    
+    if not window:
+        return jsonify({'error': 'You have not started this test'}), 404
+    
+    if window.status != 'started':
+        return jsonify({'error': 'Sınav zaten gönderildi'}), 400
+    
+    if not window.is_open():
+        return jsonify({'error': 'Sınav süresi doldu'}), 400
+    
+    saved, error = save_answers(window.attempt_id, changes)
+    db.session.commit()
+    
+    if error:
+        # Önbellekteki deneme durumu eskimiş (ör. gönderim başka bir worker'da yapıldı)
+        forget_autosave_window(test_id, current_user_id)
+        return jsonify({'error': error}), 400
+    
+    return jsonify({
+        'message': 'Answers saved',
+        'saved': saved
+    }), 200
+
 @student_bp.route('/tests/<int:test_id>/submit', methods=['POST'])
 @jwt_required()
 @role_required('student')
@@ -179,10 +273,11 @@ def submit_test(test_id):
     if not data:
         return jsonify({'error': 'No data provided'}), 400
     
+    # Boş liste geçerlidir: autosave ile kaydedilmiş cevaplar puanlanır
     answers_data = data.get('answers', [])
     
-    if not answers_data:
-        return jsonify({'error': 'Answers are required'}), 400
+    if not isinstance(answers_data, list):
+        return jsonify({'error': 'Answers must be a list'}), 400
     
     attempt = TestAttempt.query.filter_by(
         test_id=test_id,
@@ -192,6 +287,18 @@ def submit_test(test_id):
     if not attempt:
         return jsonify({'error': 'You have not started this test'}), 404
     
+    # Asenkron mod: cevaplar kuyruğa yazılır, puanlamayı worker'lar yapar
+    if current_app.config.get('ASYNC_GRADING'):
+        receipt, error = enqueue_submission(attempt, answers_data)
+        
+        if error:
+            return jsonify({'error': error}), 400
+        
+        return jsonify({
+            'message': 'Test received, grading in progress',
+            'receipt': receipt.to_dict()
+        }), 202
+    
     submitted_attempt, error = submit_exam(attempt.id, answers_data)
     
     if error:
@@ -199,10 +306,29 @@ def submit_test(test_id):
     
     return jsonify({
         'message': 'Test submitted successfully',
-        'attempt': submitted_attempt.to_dict(),
+        'attempt': serialize_attempt(submitted_attempt, 'summary'),
         'score': float(submitted_attempt.score) if submitted_attempt.score else 0.00
     }), 200
 
+@student_bp.route('/submissions/<int:receipt_id>', methods=['GET'])
+@jwt_required()
+@role_required('student')
+def get_submission_status(receipt_id):
+    """Kuyruğa alınan gönderimin puanlama durumunu getir"""
+    current_user_id = int(get_jwt_identity())
+    
+    receipt = SubmissionReceipt.query.join(TestAttempt).filter(
+        SubmissionReceipt.id == receipt_id,
+        TestAttempt.student_id == current_user_id
+    ).first()
+    
+    if not receipt:
+        return jsonify({'error': 'Submission not found'}), 404
+    
+    return jsonify({
+        'receipt': receipt.to_dict()
+    }), 200
+
 @student_bp.route('/tests/<int:test_id>/result', methods=['GET'])
 @jwt_required()
 @role_required('student')
@@ -221,10 +347,11 @@ def get_test_result(test_id):
     test = Test.query.get_or_404(test_id)
     
     answers = Answer.query.filter_by(attempt_id=attempt.id).all()
+    questions = load_questions(a.question_id for a in answers)
     
     results = []
     for answer in answers:
-        question = Question.query.get(answer.question_id)
+        question = questions.get(answer.question_id)
         if question:
             result_item = {
                 'question': question.to_dict(include_correct=True),
@@ -251,8 +378,8 @@ def get_test_result(test_id):
         }
     
     return jsonify({
-        'attempt': attempt.to_dict(),
-        'test': test.to_dict(),
+        'attempt': serialize_attempt(attempt, 'summary'),
+        'test': serialize_test(test, 'detail'),
         'results': results,
         'total_score': float(attempt.score) if attempt.score else 0.00,
         'grade': grade_data
@@ -0,0 +1,102 @@
+"""
+Öğrenci paneli cevap önbelleği
+
+StudentDashboard /student/tests/available endpoint'ini her dakika,
+StudentLessons /student/lessons endpoint'ini her açılışta çağırır; sınavlar
+arasında bu cevaplar çoğu zaman değişmez. Cevaplar öğrenci başına ETag'leri
+ile birlikte önbellekte tutulur: sabit durumda bir istek bir sözlük
+okumasına, If-None-Match eşleşirse veritabanına gitmeyen bir 304'e iner.
+
+Önbellek varsayılan olarak süreç içi LRU'dur; STUDENT_CACHE_URL=redis://...
+ile worker'lar arasında paylaşılan Redis kullanılabilir (bkz. cache.create_cache).
+Süreç içi önbellekte geçersiz kılma sadece yazmayı yapan worker'ı temizler;
+diğer worker'lar (ve onlardan 304 alan istemciler) TTL dolana kadar eski
+cevabı görür. Bu yüzden süreç içi önbelleğin TTL'i kısadır
+(MEMORY_CACHE_TTL); birden fazla worker ile çalışan kurulumlarda Redis
+kullanılmalıdır.
+
+Cevabı değiştiren yazma işlemleri önbelleği açıkça geçersiz kılmalıdır:
+- invalidate_student_views: öğrencinin kendi verisi (deneme, not, ders kaydı)
+- invalidate_view: bir görünümü tüm öğrenciler için (ör. sınıf ortalaması)
+- invalidate_all_student_views: birden fazla öğrenciyi etkileyen değişiklikler (test, ders)
+
+Görünüm bazında geçersiz kılma için anahtarlar görünümün nesil (generation)
+değerini içerir; nesil değişince eski kayıtlar okunmaz ve LRU/TTL ile silinir.
+"""
+import hashlib
+import json
+import uuid
+from cache import LRUCache, MISSING, create_cache
+
+VIEWS = ('available_tests', 'lessons')
+
+# Süreç içi önbellekte diğer worker'ların eski cevap gösterebileceği en uzun süre (saniye)
+MEMORY_CACHE_TTL = 10
+SHARED_CACHE_TTL = 300
+
+_backend = LRUCache(ttl=MEMORY_CACHE_TTL, maxsize=10000)
+
+def is_shared_cache_url(url):
+    return bool(url) and url != 'memory'
+
+def configure_student_cache(url='memory', ttl=None, maxsize=10000, workers=1):
+    """Önbellek arka ucunu ayarlar (create_app içinden çağrılır)
+    
+    ttl verilmezse süreç içi önbellek için MEMORY_CACHE_TTL, Redis için SHARED_CACHE_TTL kullanılır.
+    """
+    global _backend
+    shared = is_shared_cache_url(url)
+    if ttl is None:
+        ttl = SHARED_CACHE_TTL if shared else MEMORY_CACHE_TTL
+    if not shared and workers > 1:
+        print(f"⚠️ STUDENT_CACHE_URL=memory ile {workers} worker: öğrenci panelleri {ttl} sn'ye kadar eski kalabilir, Redis kullanın")
+    _backend = create_cache(url, ttl=ttl, maxsize=maxsize, prefix='sinav:student:')
+
+def make_etag(payload):
+    """JSON'a çevrilebilir cevaptan zayıf (weak) ETag üretir"""
+    body = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return f'W/"{hashlib.sha1(body).hexdigest()}"'
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match başlığı ETag ile eşleşiyor mu"""
+    if not if_none_match or not etag:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(',')]
+    return '*' in candidates or etag in candidates
+
+def _generation(view):
+    """Görünümün güncel nesli; yoksa (veya önbellekten düştüyse) yenisi oluşturulur"""
+    generation = _backend.get(f'gen:{view}')
+    if generation is MISSING:
+        generation = uuid.uuid4().hex[:12]
+        _backend.set(f'gen:{view}', generation)
+    return generation
+
+def student_view_key(view, student_id):
+    """Öğrencinin bu görünümdeki kaydının anahtarı (cevap hazırlanmadan önce alınmalı)"""
+    return f'{view}:{_generation(view)}:{student_id}'
+
+def get_student_view(key):
+    """Önbellekteki cevap: (etag, payload), yoksa None"""
+    entry = _backend.get(key)
+    return None if entry is MISSING else tuple(entry)
+
+def store_student_view(key, payload):
+    """Cevabı önbelleğe yazar, ETag'ini döndürür"""
+    etag = make_etag(payload)
+    _backend.set(key, [etag, payload])
+    return etag
+
+def invalidate_student_views(student_id):
+    """Öğrencinin kendi verisi değiştiğinde çağrılmalı (deneme, not, ders kaydı)"""
+    for view in VIEWS:
+        _backend.invalidate(student_view_key(view, student_id))
+
+def invalidate_view(view):
+    """Görünümü tüm öğrenciler için geçersiz kılar"""
+    _backend.set(f'gen:{view}', uuid.uuid4().hex[:12])
+
+def invalidate_all_student_views():
+    """Birden fazla öğrenciyi etkileyen değişikliklerde çağrılmalı (test, ders)"""
+    for view in VIEWS:
+        invalidate_view(view)
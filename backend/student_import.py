@@ -0,0 +1,129 @@
+"""
+Toplu öğrenci içe aktarma motoru
+
+Excel'den gelen satırlar admin.bulk_upload_students içinde bellekte
+doğrulanır; buraya sadece geçerli adaylar gelir. Motor:
+- kayıtlı öğrenci numaralarını ve email'leri tek sorguda önceden yükler,
+- tekrar eden kayıtları (veritabanında veya dosyanın içinde) bellekte ayıklar,
+- şifreleri süreç havuzunda paralel hash'ler (bkz. passwords.py),
+- kullanıcıları IMPORT_CHUNK_SIZE'lık çok satırlı INSERT'lerle, her grup
+  kendi savepoint'inde olacak şekilde tek transaction'da yazar.
+
+Bir grup eşzamanlı bir kayıtla çakışırsa (IntegrityError) o grup satır satır
+tekrar denenir; sadece çakışan satırlar hata olarak raporlanır.
+"""
+from datetime import datetime
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from database import db, User
+from passwords import hash_passwords
+
+IMPORT_CHUNK_SIZE = 500
+
+def _existing_users(candidates):
+    """Adayların numarası veya email'i ile kayıtlı kullanıcılar: ({numara: ad}, {email})"""
+    numbers = {c['student_number'] for c in candidates}
+    emails = {c['email'] for c in candidates}
+    
+    rows = db.session.query(User.student_number, User.email, User.full_name).filter(
+        or_(User.student_number.in_(numbers), User.email.in_(emails))
+    ).all()
+    
+    return (
+        {number: full_name for number, _, full_name in rows if number},
+        {email for _, email, _ in rows}
+    )
+
+def _row_error(candidate, message):
+    return {'row': candidate['row'], 'error': message, 'data': candidate['data']}
+
+def _conflict_message(candidate, error):
+    """Satırın hangi kayıtla çakıştığını (öğrenci numarası veya email) bulup hata mesajını döndürür"""
+    existing = db.session.query(User.student_number, User.email, User.full_name).filter(
+        or_(User.student_number == candidate['student_number'], User.email == candidate['email'])
+    ).first()
+    
+    if existing is None:
+        # Çakışan kayıt bu arada silinmiş olabilir; veritabanı hatası olduğu gibi raporlanır
+        return f'Kayıt eklenemedi: {error.orig}'
+    
+    number, _, full_name = existing
+    if number == candidate['student_number']:
+        return f"Bu öğrenci numarası ({number}) zaten kayıtlı: {full_name}"
+    return f"Bu email ({candidate['email']}) zaten kullanımda"
+
+def _insert_chunk(chunk, results):
+    """Grubu tek INSERT ile yazar; çakışmada satır satır savepoint ile tekrar dener"""
+    try:
+        with db.session.begin_nested():
+            db.session.execute(User.__table__.insert(), [c['values'] for c in chunk])
+        return chunk
+    except IntegrityError:
+        pass
+    
+    inserted = []
+    for candidate in chunk:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(User.__table__.insert(), [candidate['values']])
+            inserted.append(candidate)
+        except IntegrityError as e:
+            results['errors'].append(_row_error(candidate, _conflict_message(candidate, e)))
+    return inserted
+
+def import_students(candidates, role_id, results):
+    """Doğrulanmış adayları yazar ve results['created'] / results['errors'] listelerini doldurur
+    
+    Her aday: row, data, student_number, full_name, email, password, department.
+    Commit çağırana aittir.
+    """
+    if not candidates:
+        return
+    
+    existing_numbers, existing_emails = _existing_users(candidates)
+    
+    accepted = []
+    for candidate in candidates:
+        student_number = candidate['student_number']
+        if student_number in existing_numbers:
+            results['errors'].append(_row_error(
+                candidate,
+                f'Bu öğrenci numarası ({student_number}) zaten kayıtlı: {existing_numbers[student_number]}'
+            ))
+            continue
+        
+        if candidate['email'] in existing_emails:
+            results['errors'].append(_row_error(
+                candidate, f"Bu email ({candidate['email']}) zaten kullanımda"
+            ))
+            continue
+        
+        # Dosyada aynı öğrenci tekrar ederse ilk satır kaydedilir
+        existing_numbers[student_number] = candidate['full_name']
+        existing_emails.add(candidate['email'])
+        accepted.append(candidate)
+    
+    now = datetime.utcnow()
+    hashes = hash_passwords([c['password'] for c in accepted])
+    for candidate, password_hash in zip(accepted, hashes):
+        candidate['values'] = {
+            'email': candidate['email'],
+            'password_hash': password_hash,
+            'full_name': candidate['full_name'],
+            'role_id': role_id,
+            'department': candidate['department'],
+            'student_number': candidate['student_number'],
+            'created_at': now,
+            'updated_at': now
+        }
+    
+    for start in range(0, len(accepted), IMPORT_CHUNK_SIZE):
+        for candidate in _insert_chunk(accepted[start:start + IMPORT_CHUNK_SIZE], results):
+            results['created'].append({
+                'row': candidate['row'],
+                'student_number': candidate['student_number'],
+                'full_name': candidate['full_name'],
+                'email': candidate['email'],
+                'password': candidate['password'],
+                'department': candidate['department']
+            })
@@ -1,6 +1,11 @@
 from flask import Blueprint, request, jsonify
-from database import db, User, Lesson, Test, Question, TeacherLesson, TestAttempt, Answer, Grade, StudentLesson
+from database import db, User, Lesson, Test, Question, TeacherLesson, TestAttempt, Answer, Grade
 from utils import role_required, get_current_user, validate_test_time_window, validate_test_type, validate_test_duration
+from exam_papers import invalidate_exam_paper, touch_question_pool
+from student_cache import invalidate_all_student_views
+from grade_stats import load_lesson_stats, load_test_summaries
+from deletion import delete_test as delete_test_rows, delete_question_pool
+from serializers import serialize_lessons, serialize_lesson, load_lesson_rosters, serialize_tests, serialize_test, serialize_attempts, serialize_answers
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 
@@ -13,8 +18,10 @@ def get_teacher_lessons():
     """Öğretmenin derslerini listele"""
     current_user_id = int(get_jwt_identity())
     
-    teacher_lessons = TeacherLesson.query.filter_by(teacher_id=current_user_id).all()
-    lessons = [tl.lesson.to_dict() for tl in teacher_lessons]
+    lessons = Lesson.query.join(TeacherLesson).filter(
+        TeacherLesson.teacher_id == current_user_id
+    ).order_by(TeacherLesson.id).all()
+    lessons = serialize_lessons(lessons, 'roster')
     
     return jsonify({
         'lessons': lessons
@@ -42,19 +49,15 @@ def get_lesson_detail(lesson_id):
     vize_weight = float(lesson.vize_weight) if lesson.vize_weight else 40.00
     final_weight = float(lesson.final_weight) if lesson.final_weight else 60.00
     
-    tests_data = []
-    for test in tests:
-        test_data = test.to_dict()
-        test_data['question_count'] = Question.query.filter_by(test_id=test.id).count()
-        tests_data.append(test_data)
+    tests_data = serialize_tests(tests, 'summary')
     
-    # Öğrencileri ve notlarını getir
-    student_lessons = StudentLesson.query.filter_by(lesson_id=lesson_id).all()
+    # Öğrencileri ve notlarını getir (öğrenciler tek sorguda, notlar student_id'ye göre tek sorguda)
+    students = load_lesson_rosters([lesson_id])[lesson_id]
+    grades = {grade.student_id: grade for grade in Grade.query.filter_by(lesson_id=lesson_id).all()}
     students_with_grades = []
     
-    for sl in student_lessons:
-        student = sl.student
-        grade = Grade.query.filter_by(student_id=student.id, lesson_id=lesson_id).first()
+    for student in students:
+        grade = grades.get(student.id)
         
         student_data = {
             'id': student.id,
@@ -68,12 +71,13 @@ def get_lesson_detail(lesson_id):
         students_with_grades.append(student_data)
     
     return jsonify({
-        'lesson': lesson.to_dict(),
+        'lesson': serialize_lesson(lesson, 'detail'),
         'vize_weight': vize_weight,
         'final_weight': final_weight,
         'tests': tests_data,
         'test_count': len(tests_data),
-        'students': students_with_grades
+        'students': students_with_grades,
+        'grade_stats': load_lesson_stats([lesson_id])[lesson_id]
     }), 200
 
 @teacher_bp.route('/lessons/<int:lesson_id>/tests', methods=['GET'])
@@ -93,11 +97,7 @@ def get_lesson_tests(lesson_id):
     
     tests = Test.query.filter_by(lesson_id=lesson_id, teacher_id=current_user_id).all()
     
-    tests_data = []
-    for test in tests:
-        test_data = test.to_dict()
-        test_data['question_count'] = Question.query.filter_by(test_id=test.id).count()
-        tests_data.append(test_data)
+    tests_data = serialize_tests(tests, 'summary')
     
     return jsonify({
         'tests': tests_data,
@@ -186,10 +186,11 @@ def create_test():
     
     db.session.add(test)
     db.session.commit()
+    invalidate_all_student_views()
     
     return jsonify({
         'message': 'Test created successfully',
-        'test': test.to_dict()
+        'test': serialize_test(test, 'detail')
     }), 201
 
 @teacher_bp.route('/tests/<int:test_id>', methods=['DELETE'])
@@ -204,18 +205,11 @@ def delete_test(test_id):
     if test.teacher_id != current_user_id:
         return jsonify({'error': 'You are not authorized to delete this test'}), 403
     
-    # Test'e ait soruları ve cevapları da sil
-    questions = Question.query.filter_by(test_id=test_id).all()
-    for question in questions:
-        Answer.query.filter_by(question_id=question.id).delete()
-        db.session.delete(question)
-    
-    # Test attempt'leri sil
-    TestAttempt.query.filter_by(test_id=test_id).delete()
-    
-    # Test'i sil
-    db.session.delete(test)
+    # Test'i soruları, cevapları, kuyruktaki gönderimleri ve attempt'leriyle birlikte sil (tablo başına tek DELETE)
+    delete_test_rows(test_id)
     db.session.commit()
+    invalidate_exam_paper(test_id)
+    invalidate_all_student_views()
     
     return jsonify({'message': 'Test deleted successfully'}), 200
 
@@ -236,8 +230,9 @@ def get_test(test_id):
     questions_data = [q.to_dict(include_correct=True) for q in questions]
     
     return jsonify({
-        'test': test.to_dict(),
-        'questions': questions_data
+        'test': serialize_test(test, 'detail'),
+        'questions': questions_data,
+        'score_summary': load_test_summaries([test_id])[test_id]
     }), 200
 
 @teacher_bp.route('/tests/<int:test_id>/questions', methods=['DELETE'])
@@ -253,12 +248,10 @@ def delete_all_questions(test_id):
         return jsonify({'error': 'You are not authorized to delete questions from this test'}), 403
     
     # Tüm soruları ve ilgili cevapları sil
-    questions = Question.query.filter_by(test_id=test_id).all()
-    for question in questions:
-        Answer.query.filter_by(question_id=question.id).delete()
-        db.session.delete(question)
-    
+    delete_question_pool(test_id)
+    touch_question_pool(test_id)
     db.session.commit()
+    invalidate_exam_paper(test_id)
     
     return jsonify({'message': 'All questions deleted successfully'}), 200
 
@@ -313,7 +306,9 @@ def add_question(test_id):
     for q in all_questions:
         q.points = int(round(points_per_question))
     
+    touch_question_pool(test_id)
     db.session.commit()
+    invalidate_exam_paper(test_id)
     
     return jsonify({
         'message': 'Question added successfully',
@@ -450,7 +445,9 @@ def bulk_add_questions(test_id):
         all_questions = Question.query.filter_by(test_id=test_id).all()
         for q in all_questions:
             q.points = int(round(points_per_question))
+        touch_question_pool(test_id)
         db.session.commit()
+        invalidate_exam_paper(test_id)
         
         # Yükleme sonrası toplam soru sayısını kontrol et
         total_questions = Question.query.filter_by(test_id=test_id).count()
@@ -478,7 +475,7 @@ def bulk_add_questions(test_id):
             },
             'results': results
         }), 200
-        
+    
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -499,17 +496,25 @@ def get_test_results(test_id):
     
     attempts = TestAttempt.query.filter_by(test_id=test_id).all()
     
+    # Tüm denemelerin cevapları tek sorguda, test bir kez (en üstte) serileştirilir
+    answers_by_attempt = {}
+    if attempts:
+        answers = Answer.query.filter(
+            Answer.attempt_id.in_([a.id for a in attempts])
+        ).order_by(Answer.id).all()
+        for answer_data in serialize_answers(answers):
+            answers_by_attempt.setdefault(answer_data['attempt_id'], []).append(answer_data)
+    
     results = []
-    for attempt in attempts:
-        attempt_data = attempt.to_dict()
-        answers = Answer.query.filter_by(attempt_id=attempt.id).all()
-        attempt_data['answers'] = [answer.to_dict() for answer in answers]
+    for attempt_data in serialize_attempts(attempts, 'summary'):
+        attempt_data['answers'] = answers_by_attempt.get(attempt_data['id'], [])
         results.append(attempt_data)
     
     return jsonify({
-        'test': test.to_dict(),
+        'test': serialize_test(test, 'detail'),
         'results': results,
-        'total_attempts': len(results)
+        'total_attempts': len(results),
+        'score_summary': load_test_summaries([test_id])[test_id]
     }), 200
 
 @teacher_bp.route('/lessons/<int:lesson_id>/weights', methods=['PUT'])
@@ -553,6 +558,7 @@ def update_lesson_weights(lesson_id):
         test.final_weight = final_weight
     
     db.session.commit()
+    invalidate_all_student_views()
     
     return jsonify({
         'message': 'Lesson weights updated successfully',
@@ -590,9 +596,10 @@ def update_test_weights(test_id):
     test.final_weight = final_weight
     
     db.session.commit()
+    invalidate_all_student_views()
     
     return jsonify({
         'message': 'Test weights updated successfully',
-        'test': test.to_dict()
+        'test': serialize_test(test, 'detail')
     }), 200
 
@@ -0,0 +1,156 @@
+"""
+Test ortamı: geçici SQLite veritabanı, arka plan thread'leri kapalı
+"""
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DB_URL', f"sqlite:///{tmp_path / 'test.sqlite'}")
+    monkeypatch.setenv('JWT_SECRET', 'test-secret-key-with-at-least-32-bytes')
+    monkeypatch.setenv('JOB_WORKERS', '0')
+    monkeypatch.setenv('ASYNC_GRADING', 'false')
+    monkeypatch.setenv('PASSWORD_BCRYPT_ROUNDS', '4')
+    monkeypatch.setenv('UPLOAD_DIR', str(tmp_path / 'uploads'))
+    
+    from app import create_app
+    from database import db, Role
+    from utils import user_role_cache
+    import autosave
+    import exam_papers
+    
+    # Önbellekler süreç genelinde; her testin veritabanı yeni olduğu için kullanıcı/test id'leri tekrar eder
+    user_role_cache.clear()
+    exam_papers._papers.clear()
+    autosave._windows.clear()
+    
+    app = create_app()
+    app.config['TESTING'] = True
+    
+    with app.app_context():
+        db.create_all()
+        for role_name in ('admin', 'teacher', 'student', 'department_head'):
+            db.session.add(Role(name=role_name))
+        db.session.commit()
+    
+    yield app
+    
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def count_queries(app):
+    """with count_queries() as queries: ... bloğunda çalışan SQL komutlarını toplar"""
+    from database import db
+    
+    @contextmanager
+    def counter():
+        statements = []
+        
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+        
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    
+    return counter
+
+def create_user(role_name, email, full_name, password='pw1234', **fields):
+    """Kullanıcı ekler (uygulama bağlamında çağrılmalı), id'sini döndürür"""
+    from database import db, Role, User
+    
+    role = Role.query.filter_by(name=role_name).one()
+    user = User(email=email, full_name=full_name, role_id=role.id, **fields)
+    user.set_password(password)
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+def auth_headers(client, email, password='pw1234'):
+    response = client.post('/api/auth/login', json={'email': email, 'password': password})
+    assert response.status_code == 200, response.get_json()
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+def create_exam(test_type='vize', students=1, questions=5, points=20, lesson_id=None):
+    """Öğretmen, ders, şu an açık bir test ve derse kayıtlı öğrenciler ekler (uygulama bağlamında çağrılmalı)
+    
+    Bütün soruların doğru cevabı 'a'dır; min_questions soru sayısına eşittir (tüm sorular seçilir).
+    lesson_id verilirse test o derse eklenir (derse kayıtlı öğrencilere ek olarak students kadar öğrenci kaydedilir).
+    Döndürür: {'teacher_id', 'lesson_id', 'test_id', 'student_ids', 'student_emails'}
+    """
+    from datetime import datetime, timedelta
+    from database import db, Lesson, TeacherLesson, StudentLesson, Test, Question, User
+    
+    teacher = User.query.filter_by(email='teacher@test.com').first()
+    teacher_id = teacher.id if teacher else create_user('teacher', 'teacher@test.com', 'Ali Veli')
+    
+    if lesson_id is None:
+        lesson = Lesson(code=f'DRS{Lesson.query.count() + 1:03d}', name='Ders')
+        db.session.add(lesson)
+        db.session.flush()
+        db.session.add(TeacherLesson(teacher_id=teacher_id, lesson_id=lesson.id))
+        lesson_id = lesson.id
+    
+    now = datetime.now()
+    test = Test(
+        lesson_id=lesson_id, teacher_id=teacher_id, test_type=test_type,
+        start_time=now - timedelta(hours=1), end_time=now + timedelta(hours=1),
+        duration=3600, min_questions=questions
+    )
+    db.session.add(test)
+    db.session.flush()
+    for i in range(questions):
+        db.session.add(Question(
+            test_id=test.id, question_text=f'Soru {i}', option_a='a', option_b='b',
+            option_c='c', option_d='d', correct_answer='a', points=points
+        ))
+    test_id = test.id
+    db.session.commit()
+    
+    start = User.query.filter(User.student_number.isnot(None)).count()
+    student_emails = [f'{2024000 + i}@kocaelisaglik.edu.tr' for i in range(start, start + students)]
+    student_ids = [
+        create_user('student', email, f'Öğrenci {i}', department='Psikoloji', student_number=str(2024000 + i))
+        for i, email in zip(range(start, start + students), student_emails)
+    ]
+    for student_id in student_ids:
+        db.session.add(StudentLesson(student_id=student_id, lesson_id=lesson_id))
+    db.session.commit()
+    
+    return {
+        'teacher_id': teacher_id,
+        'lesson_id': lesson_id,
+        'test_id': test_id,
+        'student_ids': student_ids,
+        'student_emails': student_emails
+    }
+
+def run_upload(app, client, headers, url, **request_kwargs):
+    """Toplu yüklemeyi kuyruğa alır ve işi çalıştırır, GET /api/admin/jobs/<id> cevabındaki işi döndürür"""
+    from jobs import run_next_job
+    
+    response = client.post(url, headers=headers, **request_kwargs)
+    assert response.status_code == 202, response.get_json()
+    job_id = response.get_json()['job']['id']
+    with app.app_context():
+        assert run_next_job()
+    
+    response = client.get(f'/api/admin/jobs/{job_id}', headers=headers)
+    assert response.status_code == 200
+    return response.get_json()['job']
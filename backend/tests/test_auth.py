@@ -0,0 +1,53 @@
+"""
+Rol claim'i ile yetkilendirme ve rol önbelleğinin geçersiz kılınması
+"""
+import pytest
+
+from conftest import create_user, auth_headers
+
+@pytest.fixture
+def users(app):
+    with app.app_context():
+        return {
+            'admin': create_user('admin', 'admin@test.com', 'Admin User'),
+            'teacher': create_user('teacher', 'teacher@test.com', 'Ali Veli'),
+        }
+
+def test_token_carries_the_role_claim(client, users):
+    headers = auth_headers(client, 'teacher@test.com')
+    assert client.get('/api/teacher/lessons', headers=headers).status_code == 200
+    assert client.get('/api/admin/lessons', headers=headers).status_code == 403
+
+def test_token_without_role_claim_is_rejected(app, client, users):
+    from flask_jwt_extended import create_access_token
+    
+    with app.app_context():
+        token = create_access_token(identity=str(users['teacher']))
+    response = client.get('/api/teacher/lessons', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 401
+
+def test_role_change_invalidates_issued_tokens(app, client, users):
+    from database import db, Role, User
+    from utils import invalidate_user_cache
+    
+    headers = auth_headers(client, 'teacher@test.com')
+    assert client.get('/api/teacher/lessons', headers=headers).status_code == 200
+    
+    with app.app_context():
+        user = db.session.get(User, users['teacher'])
+        user.role_id = Role.query.filter_by(name='department_head').one().id
+        db.session.commit()
+        invalidate_user_cache(users['teacher'])
+    
+    assert client.get('/api/teacher/lessons', headers=headers).status_code == 401
+    # Yeni giriş yeni rolü taşır
+    headers = auth_headers(client, 'teacher@test.com')
+    assert client.get('/api/department-head/lessons', headers=headers).status_code == 200
+
+def test_deleted_user_token_stops_working(client, users):
+    admin = auth_headers(client, 'admin@test.com')
+    teacher = auth_headers(client, 'teacher@test.com')
+    assert client.get('/api/teacher/lessons', headers=teacher).status_code == 200
+    
+    assert client.delete(f"/api/admin/users/{users['teacher']}", headers=admin).status_code == 200
+    assert client.get('/api/teacher/lessons', headers=teacher).status_code == 404
@@ -0,0 +1,68 @@
+"""
+Autosave: kaydedilen cevaplar gönderimde puanlanır, gönderimden sonra yazılmaz
+"""
+import pytest
+
+from conftest import create_exam, auth_headers
+
+@pytest.fixture
+def exam(app, client):
+    with app.app_context():
+        exam = create_exam(questions=5, points=20)
+    headers = auth_headers(client, exam['student_emails'][0])
+    response = client.post(f"/api/student/tests/{exam['test_id']}/start", headers=headers)
+    assert response.status_code == 200, response.get_json()
+    exam['headers'] = headers
+    exam['question_ids'] = [q['id'] for q in response.get_json()['questions']]
+    return exam
+
+def _patch(client, exam, answers):
+    return client.patch(
+        f"/api/student/tests/{exam['test_id']}/answers",
+        json={'answers': [{'question_id': qid, 'selected_answer': answer} for qid, answer in answers]},
+        headers=exam['headers']
+    )
+
+def _submit(client, exam, answers=()):
+    return client.post(
+        f"/api/student/tests/{exam['test_id']}/submit",
+        json={'answers': list(answers)},
+        headers=exam['headers']
+    )
+
+def test_autosaved_answers_are_graded_on_empty_submit(client, exam):
+    first, second, third = exam['question_ids'][:3]
+    response = _patch(client, exam, [(first, 'a'), (second, 'a'), (third, 'b')])
+    assert response.status_code == 200
+    assert response.get_json()['saved'] == 3
+    
+    response = _submit(client, exam)
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['score'] == 40.0
+
+def test_autosave_counts_only_questions_on_the_attempt(client, exam):
+    response = _patch(client, exam, [(exam['question_ids'][0], 'a'), (999999, 'a')])
+    assert response.status_code == 200
+    assert response.get_json()['saved'] == 1
+
+def test_autosave_after_submit_is_rejected(app, client, exam):
+    import autosave
+    from database import Answer, TestAttempt
+    
+    first = exam['question_ids'][0]
+    # Pencere önbelleğe alınır, gönderim "başka bir worker'da" yapılmış gibi önbellek eski kalır
+    assert _patch(client, exam, [(first, 'a')]).status_code == 200
+    key = (exam['test_id'], exam['student_ids'][0])
+    stale_window = autosave._windows.get(key)
+    assert _submit(client, exam).status_code == 200
+    autosave._windows.set(key, stale_window)
+    
+    response = _patch(client, exam, [(first, 'b')])
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Sınav zaten gönderildi'
+    
+    with app.app_context():
+        attempt = TestAttempt.query.filter_by(test_id=exam['test_id']).one()
+        answer = Answer.query.filter_by(attempt_id=attempt.id, question_id=first).one()
+        assert answer.selected_answer == 'a'
+        assert float(attempt.score) == 20.0
@@ -0,0 +1,189 @@
+"""
+Ders kayıtları ve silme: kayıt listeleri fark olarak uygulanır, toplu kayıt tekrar çalıştırılabilir,
+test/ders/kullanıcı silme bağlı satırları temizler
+"""
+from datetime import datetime
+
+import pytest
+
+from conftest import create_user, create_exam, auth_headers
+
+@pytest.fixture
+def admin_headers(app, client):
+    with app.app_context():
+        create_user('admin', 'admin@test.com', 'Admin User')
+    return auth_headers(client, 'admin@test.com')
+
+def add_student(number, department='Psikoloji'):
+    return create_user(
+        'student', f'{number}@kocaelisaglik.edu.tr', f'Öğrenci {number}',
+        department=department, student_number=number
+    )
+
+def test_lesson_update_applies_only_the_enrollment_diff(app, client, admin_headers):
+    from database import db, Lesson, StudentLesson
+    
+    old_created_at = datetime(2024, 9, 1)
+    with app.app_context():
+        lesson = Lesson(code='PSK101', name='Psikolojiye Giriş')
+        db.session.add(lesson)
+        db.session.commit()
+        lesson_id = lesson.id
+        kept, removed, added = (add_student(number) for number in ('2024001', '2024002', '2024003'))
+        teacher_id = create_user('teacher', 'teacher@test.com', 'Ali Veli')
+        for student_id in (kept, removed):
+            db.session.add(StudentLesson(student_id=student_id, lesson_id=lesson_id, created_at=old_created_at))
+        db.session.commit()
+    
+    # Öğrenci olmayan ve geçersiz id'ler atlanır
+    response = client.put(
+        f'/api/admin/lessons/{lesson_id}',
+        json={'student_ids': [kept, added, teacher_id, 'x', 999]},
+        headers=admin_headers
+    )
+    assert response.status_code == 200, response.get_json()
+    assert [s['id'] for s in response.get_json()['lesson']['students']] == [kept, added]
+    
+    with app.app_context():
+        enrollments = {sl.student_id: sl.created_at for sl in StudentLesson.query.filter_by(lesson_id=lesson_id)}
+    assert set(enrollments) == {kept, added}
+    assert enrollments[kept] == old_created_at
+    assert enrollments[added] != old_created_at
+
+def test_student_update_replaces_lessons(app, client, admin_headers):
+    from database import db, Lesson, StudentLesson
+    
+    with app.app_context():
+        lessons = [Lesson(code=f'DRS{i}', name=f'Ders {i}') for i in range(3)]
+        db.session.add_all(lessons)
+        db.session.commit()
+        lesson_ids = [lesson.id for lesson in lessons]
+        student_id = add_student('2024001')
+        db.session.add(StudentLesson(student_id=student_id, lesson_id=lesson_ids[0]))
+        db.session.commit()
+    
+    response = client.put(
+        f'/api/admin/users/{student_id}',
+        json={'lesson_ids': [lesson_ids[1], lesson_ids[2], 999]},
+        headers=admin_headers
+    )
+    assert response.status_code == 200, response.get_json()
+    
+    with app.app_context():
+        assert sorted(sl.lesson_id for sl in StudentLesson.query.filter_by(student_id=student_id)) == lesson_ids[1:]
+
+def test_cohort_enrollment_is_idempotent(app, client, admin_headers):
+    from database import db, Lesson, StudentLesson
+    
+    with app.app_context():
+        lessons = [Lesson(code='PSK101', name='Psikolojiye Giriş'), Lesson(code='PSK102', name='Gelişim')]
+        db.session.add_all(lessons)
+        db.session.commit()
+        psychology = [add_student('2024001'), add_student('2024002')]
+        pharmacy = add_student('2024003', department='Eczacılık')
+        add_student('2024004', department='Eczacılık')
+        db.session.add(StudentLesson(student_id=psychology[0], lesson_id=lessons[0].id))
+        db.session.commit()
+    
+    body = {
+        'lesson_codes': ['PSK101', 'PSK102', 'YOK999'],
+        'department': 'psikoloji',
+        'student_numbers': ['2024003', '2099999']
+    }
+    response = client.post('/api/admin/enrollments/bulk', json=body, headers=admin_headers)
+    assert response.status_code == 200, response.get_json()
+    result = response.get_json()
+    assert (result['lesson_count'], result['student_count']) == (2, 3)
+    assert (result['enrolled_count'], result['already_enrolled_count']) == (5, 1)
+    assert result['unknown_lesson_codes'] == ['YOK999']
+    assert result['unknown_student_numbers'] == ['2099999']
+    
+    response = client.post('/api/admin/enrollments/bulk', json=body, headers=admin_headers)
+    assert (response.get_json()['enrolled_count'], response.get_json()['already_enrolled_count']) == (0, 6)
+    
+    with app.app_context():
+        enrolled = {student_id for student_id, in db.session.query(StudentLesson.student_id)}
+    assert enrolled == {*psychology, pharmacy}
+    
+    response = client.post('/api/admin/enrollments/bulk', json={**body, 'department': 'Tarih'}, headers=admin_headers)
+    assert response.status_code == 400
+
+@pytest.fixture
+def graded_exam(app, client):
+    """İki öğrencili bir sınav: ilk öğrenci göndermiş, ikincisi başlatmış"""
+    with app.app_context():
+        exam = create_exam(students=2, questions=3)
+    for email, submit in zip(exam['student_emails'], (True, False)):
+        headers = auth_headers(client, email)
+        response = client.post(f"/api/student/tests/{exam['test_id']}/start", headers=headers)
+        assert response.status_code == 200
+        if submit:
+            answers = [{'question_id': q['id'], 'selected_answer': 'a'} for q in response.get_json()['questions']]
+            response = client.post(f"/api/student/tests/{exam['test_id']}/submit", json={'answers': answers}, headers=headers)
+            assert response.status_code == 200
+    return exam
+
+def count_rows(test_ids=(), lesson_ids=(), student_ids=()):
+    from database import (
+        Question, TestAttempt, Answer, TestScoreSummary, TestScoreBucket,
+        StudentLesson, TeacherLesson, Grade, LessonGradeStats, Test
+    )
+    
+    attempts = TestAttempt.query.filter(TestAttempt.test_id.in_(test_ids)).with_entities(TestAttempt.id)
+    return {
+        'tests': Test.query.filter(Test.id.in_(test_ids)).count(),
+        'questions': Question.query.filter(Question.test_id.in_(test_ids)).count(),
+        'attempts': attempts.count(),
+        'answers': Answer.query.filter(Answer.attempt_id.in_(attempts.scalar_subquery())).count(),
+        'summaries': TestScoreSummary.query.filter(TestScoreSummary.test_id.in_(test_ids)).count(),
+        'buckets': TestScoreBucket.query.filter(TestScoreBucket.test_id.in_(test_ids)).count(),
+        'enrollments': StudentLesson.query.filter(StudentLesson.lesson_id.in_(lesson_ids)).count(),
+        'assignments': TeacherLesson.query.filter(TeacherLesson.lesson_id.in_(lesson_ids)).count(),
+        'grades': Grade.query.filter(
+            Grade.lesson_id.in_(lesson_ids) | Grade.student_id.in_(student_ids)
+        ).count(),
+        'lesson_stats': LessonGradeStats.query.filter(LessonGradeStats.lesson_id.in_(lesson_ids)).count(),
+    }
+
+def test_delete_test_removes_dependent_rows(app, client, graded_exam):
+    with app.app_context():
+        other = create_exam(students=0, lesson_id=graded_exam['lesson_id'])
+        before = count_rows([graded_exam['test_id']])
+    assert before['questions'] == 3 and before['attempts'] == 2 and before['answers'] == 6
+    
+    headers = auth_headers(client, 'teacher@test.com')
+    response = client.delete(f"/api/teacher/tests/{graded_exam['test_id']}", headers=headers)
+    assert response.status_code == 200
+    
+    with app.app_context():
+        assert not any(count_rows([graded_exam['test_id']]).values())
+        assert count_rows([other['test_id']])['questions'] == 5
+
+def test_delete_lesson_removes_dependent_rows(app, client, admin_headers, graded_exam):
+    from database import Lesson
+    
+    response = client.delete(f"/api/admin/lessons/{graded_exam['lesson_id']}", headers=admin_headers)
+    assert response.status_code == 200
+    
+    with app.app_context():
+        assert Lesson.query.get(graded_exam['lesson_id']) is None
+        assert not any(count_rows([graded_exam['test_id']], [graded_exam['lesson_id']]).values())
+
+def test_delete_student_updates_stats(app, client, admin_headers, graded_exam):
+    from database import TestAttempt
+    from grade_stats import load_lesson_stats, load_test_summaries
+    
+    student_id = graded_exam['student_ids'][0]
+    response = client.delete(f'/api/admin/users/{student_id}', headers=admin_headers)
+    assert response.status_code == 200
+    
+    with app.app_context():
+        assert TestAttempt.query.filter_by(student_id=student_id).count() == 0
+        assert count_rows(student_ids=[student_id])['grades'] == 0
+        assert load_lesson_stats([graded_exam['lesson_id']])[graded_exam['lesson_id']]['vize_score']['count'] == 0
+        summary = load_test_summaries([graded_exam['test_id']])[graded_exam['test_id']]
+    assert (summary['attempt_count'], summary['submitted_count']) == (1, 0)
+    
+    # Sınavı olan öğretmen silinemez
+    response = client.delete(f"/api/admin/users/{graded_exam['teacher_id']}", headers=admin_headers)
+    assert response.status_code == 400
@@ -0,0 +1,58 @@
+"""
+Sınav kağıdı önbelleği: başka bir worker'daki havuz değişikliği, tekrar başlatma
+"""
+from conftest import create_exam, auth_headers
+
+def _start(client, exam, index=0):
+    headers = auth_headers(client, exam['student_emails'][index])
+    return client.post(f"/api/student/tests/{exam['test_id']}/start", headers=headers)
+
+def test_pool_edit_on_another_worker_rebuilds_the_paper(app, client):
+    import exam_papers
+    from database import db, Question
+    
+    with app.app_context():
+        exam = create_exam(students=2, questions=5)
+    
+    assert _start(client, exam, 0).status_code == 200
+    
+    # Başka bir worker: soru yerinde düzenlenir (sayı ve id'ler aynı kalır), bu süreçte invalidate çağrılmaz
+    with app.app_context():
+        question = Question.query.filter_by(test_id=exam['test_id']).first()
+        question.question_text = 'Düzenlenmiş soru'
+        exam_papers.touch_question_pool(exam['test_id'])
+        db.session.commit()
+    
+    response = _start(client, exam, 1)
+    assert response.status_code == 200
+    texts = {q['question_text'] for q in response.get_json()['questions']}
+    assert 'Düzenlenmiş soru' in texts
+
+def test_teacher_question_write_bumps_the_pool_version(app, client):
+    import exam_papers
+    
+    with app.app_context():
+        exam = create_exam(students=1, questions=5)
+        before = exam_papers.pool_version(exam['test_id'])
+    
+    response = client.post(
+        f"/api/teacher/tests/{exam['test_id']}/questions",
+        json={
+            'question_text': 'Yeni soru', 'option_a': 'a', 'option_b': 'b',
+            'option_c': 'c', 'option_d': 'd', 'correct_answer': 'b'
+        },
+        headers=auth_headers(client, 'teacher@test.com')
+    )
+    assert response.status_code in (200, 201), response.get_json()
+    
+    with app.app_context():
+        assert exam_papers.pool_version(exam['test_id']) == before + 1
+
+def test_second_start_is_rejected(app, client):
+    with app.app_context():
+        exam = create_exam(students=1, questions=5)
+    
+    assert _start(client, exam).status_code == 200
+    response = _start(client, exam)
+    assert response.status_code == 400
+    assert 'zaten' in response.get_json()['error']
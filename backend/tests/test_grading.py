@@ -0,0 +1,131 @@
+"""
+Puanlama ve not istatistikleri: toplu puanlama satır satır puanlamayla aynı sonucu verir,
+ders istatistikleri ve test özetleri gönderim ve not değişikliklerinde güncel kalır
+"""
+import pytest
+
+from conftest import create_user, create_exam, auth_headers
+
+def take_exam(client, test_id, email, correct):
+    """Sınavı başlatıp ilk `correct` soruyu doğru, kalanları yanlış cevaplayarak gönderir"""
+    headers = auth_headers(client, email)
+    response = client.post(f'/api/student/tests/{test_id}/start', headers=headers)
+    assert response.status_code == 200, response.get_json()
+    question_ids = [q['id'] for q in response.get_json()['questions']]
+    
+    answers = [
+        {'question_id': qid, 'selected_answer': 'a' if i < correct else 'b'}
+        for i, qid in enumerate(question_ids)
+    ]
+    response = client.post(f'/api/student/tests/{test_id}/submit', json={'answers': answers}, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['score']
+
+def test_bulk_grading_matches_per_row_grading(app, client):
+    from database import db, Question, Answer, TestAttempt
+    
+    with app.app_context():
+        exam = create_exam(questions=5)
+        points = {}
+        for value, question in zip((10, 15, 20, 25, 30), Question.query.filter_by(test_id=exam['test_id']).order_by(Question.id)):
+            question.points = points[question.id] = value
+        db.session.commit()
+    
+    headers = auth_headers(client, exam['student_emails'][0])
+    response = client.post(f"/api/student/tests/{exam['test_id']}/start", headers=headers)
+    question_ids = [q['id'] for q in response.get_json()['questions']]
+    
+    # Bir cevap sadece autosave ile kaydedilir, biri hiç cevaplanmaz; geçersiz ve denemede olmayan sorular atlanır
+    autosaved, unanswered = question_ids[3], question_ids[4]
+    response = client.patch(
+        f"/api/student/tests/{exam['test_id']}/answers",
+        json={'answers': [{'question_id': autosaved, 'selected_answer': 'a'}]},
+        headers=headers
+    )
+    assert response.status_code == 200
+    
+    answers = [
+        {'question_id': question_ids[0], 'selected_answer': 'a'},
+        {'question_id': question_ids[1], 'selected_answer': 'c'},
+        {'question_id': question_ids[2], 'selected_answer': 'a'},
+        {'question_id': 'x', 'selected_answer': 'a'},
+        {'question_id': 999999, 'selected_answer': 'a'},
+    ]
+    response = client.post(f"/api/student/tests/{exam['test_id']}/submit", json={'answers': answers}, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    
+    with app.app_context():
+        attempt = TestAttempt.query.filter_by(test_id=exam['test_id']).one()
+        expected_score = 0
+        for answer in Answer.query.filter_by(attempt_id=attempt.id):
+            # Eski satır satır puanlama: her cevap için sorusu ayrı okunur
+            question = db.session.get(Question, answer.question_id)
+            is_correct = bool(answer.selected_answer) and answer.selected_answer == question.correct_answer
+            assert answer.is_correct == is_correct
+            assert float(answer.points_earned or 0) == (question.points if is_correct else 0)
+            expected_score += question.points if is_correct else 0
+            if answer.question_id == unanswered:
+                assert answer.selected_answer is None
+        
+        assert float(attempt.score) == expected_score
+    correct = (question_ids[0], question_ids[2], autosaved)
+    assert response.get_json()['score'] == expected_score == sum(points[qid] for qid in correct)
+
+@pytest.fixture
+def lesson_exam(app):
+    with app.app_context():
+        create_user('department_head', 'head@test.com', 'Ayşe Başkan')
+        return create_exam(students=2, questions=5, points=20)
+
+def test_stats_follow_submissions_and_grade_changes(app, client, lesson_exam):
+    from database import db
+    from grade_stats import load_lesson_stats, load_test_summaries, rebuild_lesson_stats
+    
+    first, second = lesson_exam['student_emails']
+    assert take_exam(client, lesson_exam['test_id'], first, correct=5) == 100
+    assert take_exam(client, lesson_exam['test_id'], second, correct=2) == 40
+    
+    with app.app_context():
+        vize = load_lesson_stats([lesson_exam['lesson_id']])[lesson_exam['lesson_id']]['vize_score']
+        summary = load_test_summaries([lesson_exam['test_id']])[lesson_exam['test_id']]
+    assert (vize['count'], vize['average'], vize['min'], vize['max']) == (2, 70.0, 40.0, 100.0)
+    assert (summary['attempt_count'], summary['submitted_count'], summary['average']) == (2, 2, 70.0)
+    assert [bucket['count'] for bucket in summary['histogram']] == [0, 0, 0, 0, 1, 0, 0, 0, 0, 1]
+    
+    # Aynı derste ikinci vize: öğrencinin vize notu yeni puanla değişir, eski puan istatistikten çıkar
+    with app.app_context():
+        retake = create_exam(students=0, lesson_id=lesson_exam['lesson_id'])
+    assert take_exam(client, retake['test_id'], second, correct=5) == 100
+    
+    with app.app_context():
+        incremental = load_lesson_stats([lesson_exam['lesson_id']])[lesson_exam['lesson_id']]
+        rebuild_lesson_stats([lesson_exam['lesson_id']])
+        db.session.commit()
+        rebuilt = load_lesson_stats([lesson_exam['lesson_id']])[lesson_exam['lesson_id']]
+    assert (incremental['vize_score']['count'], incremental['vize_score']['average']) == (2, 100.0)
+    assert incremental['vize_score']['min'] == 100.0
+    assert incremental == rebuilt
+
+def test_quiz_average_combines_all_quiz_submissions(app, client, lesson_exam):
+    from database import Grade
+    
+    first, second = lesson_exam['student_emails']
+    with app.app_context():
+        quizzes = [create_exam('quiz', students=0, lesson_id=lesson_exam['lesson_id']) for _ in range(2)]
+    
+    take_exam(client, quizzes[0]['test_id'], first, correct=5)
+    take_exam(client, quizzes[0]['test_id'], second, correct=2)
+    take_exam(client, quizzes[1]['test_id'], first, correct=3)
+    
+    with app.app_context():
+        quiz_score = Grade.query.filter_by(student_id=lesson_exam['student_ids'][0]).one().quiz_score
+    assert float(quiz_score) == 80.0
+    
+    headers = auth_headers(client, 'head@test.com')
+    response = client.get(f"/api/department-head/lessons/{lesson_exam['lesson_id']}", headers=headers)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['averages']['quiz_average'] == pytest.approx((100 + 40 + 60) / 3)
+    summaries = {test['id']: test['score_summary'] for test in data['tests']}
+    assert summaries[quizzes[0]['test_id']]['submitted_count'] == 2
+    assert summaries[quizzes[1]['test_id']]['average'] == 60.0
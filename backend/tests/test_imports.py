@@ -0,0 +1,104 @@
+"""
+Toplu öğrenci/ders yükleme: hatalı, tekrar eden ve kayıtlı satırların raporu, ders upsert'i ve CSV dosyası
+"""
+import io
+
+import pytest
+
+from conftest import create_user, auth_headers, run_upload
+
+@pytest.fixture
+def admin_headers(app, client):
+    with app.app_context():
+        create_user('admin', 'admin@test.com', 'Admin User')
+    return auth_headers(client, 'admin@test.com')
+
+def student(number, first_name='Ayşe', last_name='Yılmaz', department='Psikoloji'):
+    return {'student_number': number, 'first_name': first_name, 'last_name': last_name, 'department': department}
+
+def test_student_upload_reports_bad_and_duplicate_rows(app, client, admin_headers):
+    from database import User
+    
+    with app.app_context():
+        create_user('student', '2024300@kocaelisaglik.edu.tr', 'Kayıtlı Öğrenci', student_number='2024300')
+    
+    rows = [
+        student('2024201', 'ayşe', 'KAYA'),
+        student('2024202', last_name=''),
+        student('2024201', 'Başka', 'Öğrenci'),
+        student('2024300'),
+        student('2024203', department='Tarih'),
+        student('', 'Numarasız'),
+    ]
+    job = run_upload(app, client, admin_headers, '/api/admin/users/bulk-upload', json={'students': rows})
+    result = job['result']
+    
+    assert result['summary'] == {'created_count': 1, 'updated_count': 0, 'error_count': 5}
+    created = result['results']['created']
+    assert [(item['row'], item['full_name'], item['email']) for item in created] == [
+        (2, 'Ayşe Kaya', '2024201@kocaelisaglik.edu.tr')
+    ]
+    errors = {error['row']: error['error'] for error in result['results']['errors']}
+    assert sorted(errors) == [3, 4, 5, 6, 7]
+    assert errors[3] == 'İsim veya soyad boş olamaz'
+    assert 'zaten kayıtlı' in errors[4]
+    assert 'zaten kayıtlı' in errors[5]
+    assert errors[6].startswith('Geçersiz bölüm')
+    assert errors[7] == 'Öğrenci numarası boş olamaz'
+    
+    with app.app_context():
+        assert User.query.filter_by(student_number='2024201').one().check_password(created[0]['password'])
+        assert User.query.filter(User.student_number.isnot(None)).count() == 2
+
+def test_lesson_upload_upserts_by_code(app, client, admin_headers):
+    from database import db, Lesson
+    
+    with app.app_context():
+        db.session.add(Lesson(code='BIL101', name='Eski Ad'))
+        db.session.commit()
+    
+    rows = [
+        {'name': 'Programlamaya Giriş', 'code': 'BIL101'},
+        {'name': 'Fizik', 'code': 'FIZ101'},
+        {'name': '', 'code': 'KIM101'},
+        {'name': 'Fizik I', 'code': 'FIZ101'},
+    ]
+    job = run_upload(app, client, admin_headers, '/api/admin/lessons/bulk-upload', json={'lessons': rows})
+    result = job['result']
+    
+    assert result['summary'] == {'created_count': 1, 'updated_count': 2, 'error_count': 1}
+    assert [(item['row'], item['code']) for item in result['results']['created']] == [(3, 'FIZ101')]
+    assert [(item['row'], item['code']) for item in result['results']['updated']] == [(2, 'BIL101'), (5, 'FIZ101')]
+    assert [(error['row'], error['error']) for error in result['results']['errors']] == [(4, 'Ders adı boş olamaz')]
+    
+    with app.app_context():
+        assert dict(db.session.query(Lesson.code, Lesson.name)) == {
+            'BIL101': 'Programlamaya Giriş',
+            'FIZ101': 'Fizik I'
+        }
+
+def test_csv_upload_is_read_from_the_file(app, client, admin_headers):
+    from database import Lesson
+    
+    # Türkçe Excel'in ';' ayraçlı cp1254 CSV kaydı; boş satırlar atlanır
+    content = 'Ders Adı;Ders Kodu\nİstatistik;IST101\n;\nÇocuk Gelişimi;PSK210\n'.encode('cp1254')
+    job = run_upload(
+        app, client, admin_headers, '/api/admin/lessons/bulk-upload',
+        data={'file': (io.BytesIO(content), 'dersler.csv')},
+        content_type='multipart/form-data'
+    )
+    
+    assert job['status'] == 'succeeded'
+    assert job['result']['summary']['created_count'] == 2
+    assert [(item['row'], item['name']) for item in job['result']['results']['created']] == [
+        (2, 'İstatistik'), (4, 'Çocuk Gelişimi')
+    ]
+    
+    with app.app_context():
+        assert Lesson.query.filter_by(code='PSK210').one().name == 'Çocuk Gelişimi'
+    
+    response = client.post(
+        '/api/admin/lessons/bulk-upload', headers=admin_headers,
+        data={'file': (io.BytesIO(b''), 'dersler.xls')}, content_type='multipart/form-data'
+    )
+    assert response.status_code == 400
@@ -0,0 +1,110 @@
+"""
+Arka plan işleri: toplu yükleme sonuçları ve üretilen şifrelerin saklanması
+"""
+from datetime import datetime, timedelta
+
+from conftest import create_user, auth_headers, run_upload
+
+STUDENT_ROWS = [
+    {'student_number': '2024101', 'first_name': 'Ayşe', 'last_name': 'Yılmaz', 'department': 'Psikoloji'},
+    {'student_number': '2024102', 'first_name': 'Mehmet', 'last_name': 'Demir', 'department': 'Psikoloji'},
+]
+
+def upload_students(app, client, headers, rows=STUDENT_ROWS):
+    """Öğrencileri JSON satırlarıyla yükler, işin id'sini döndürür"""
+    return run_upload(app, client, headers, '/api/admin/users/bulk-upload', json={'students': rows})['id']
+
+def created_passwords(client, headers, job_id):
+    response = client.get(f'/api/admin/jobs/{job_id}', headers=headers)
+    assert response.status_code == 200
+    job = response.get_json()['job']
+    assert job['status'] == 'succeeded'
+    return [item.get('password') for item in job['result']['results']['created']]
+
+def test_job_results_keep_passwords_until_acknowledged(app, client):
+    with app.app_context():
+        create_user('admin', 'admin@test.com', 'Admin User')
+    headers = auth_headers(client, 'admin@test.com')
+    job_id = upload_students(app, client, headers)
+    
+    first = created_passwords(client, headers, job_id)
+    assert len(first) == 2 and all(first)
+    # Tekrar okumak (ör. sayfa yenilemesi) şifreleri silmez
+    assert created_passwords(client, headers, job_id) == first
+    
+    response = client.delete(f'/api/admin/jobs/{job_id}/secrets', headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()['purged'] == 2
+    assert created_passwords(client, headers, job_id) == [None, None]
+    
+    assert client.delete('/api/admin/jobs/999/secrets', headers=headers).status_code == 404
+
+def test_expired_job_secrets_are_hidden_and_purged(app, client):
+    from database import db, BackgroundJob, BackgroundJobItem
+    from jobs import JOB_SECRET_TTL, purge_expired_job_secrets
+    
+    with app.app_context():
+        create_user('admin', 'admin@test.com', 'Admin User')
+    headers = auth_headers(client, 'admin@test.com')
+    old_job_id = upload_students(app, client, headers, STUDENT_ROWS[:1])
+    new_job_id = upload_students(app, client, headers, STUDENT_ROWS[1:])
+    
+    with app.app_context():
+        job = db.session.get(BackgroundJob, old_job_id)
+        job.finished_at = datetime.now() - JOB_SECRET_TTL - timedelta(minutes=1)
+        db.session.commit()
+    
+    assert created_passwords(client, headers, old_job_id) == [None]
+    
+    with app.app_context():
+        assert purge_expired_job_secrets() == 1
+        secrets = dict(db.session.query(BackgroundJobItem.job_id, BackgroundJobItem.secret).filter(
+            BackgroundJobItem.kind == 'created'
+        ).all())
+    assert secrets[old_job_id] is None
+    assert secrets[new_job_id] is not None
+    assert all(created_passwords(client, headers, new_job_id))
+
+def test_failed_upload_resumes_from_checkpoint(app, client, monkeypatch):
+    import admin
+    from database import db, BackgroundJob
+    from jobs import run_next_job
+    
+    with app.app_context():
+        create_user('admin', 'admin@test.com', 'Admin User')
+    headers = auth_headers(client, 'admin@test.com')
+    
+    # Her satır ayrı bir grup; ikinci grup bir kez (ör. worker çökmesi) başarısız olur
+    monkeypatch.setattr(admin, 'JOB_CHUNK_SIZE', 1)
+    import_students = admin.import_students
+    calls = []
+    
+    def flaky_import(candidates, role_id, results):
+        calls.append([c['student_number'] for c in candidates])
+        if len(calls) == 2:
+            raise RuntimeError('worker crashed')
+        return import_students(candidates, role_id, results)
+    
+    monkeypatch.setattr(admin, 'import_students', flaky_import)
+    
+    rows = STUDENT_ROWS + [{'student_number': '2024103', 'first_name': 'Zeynep', 'last_name': 'Kaya', 'department': 'Psikoloji'}]
+    response = client.post('/api/admin/users/bulk-upload', json={'students': rows}, headers=headers)
+    job_id = response.get_json()['job']['id']
+    
+    with app.app_context():
+        assert run_next_job()
+        job = db.session.get(BackgroundJob, job_id)
+        assert job.status == 'queued'
+        assert job.checkpoint['next_index'] == 1
+        assert job.progress_done == 1
+        
+        assert run_next_job()
+    
+    # Tekrar deneme ilk grubu yeniden yazmaz (yazsaydı "zaten kayıtlı" hatası verirdi)
+    assert calls == [['2024101'], ['2024102'], ['2024102'], ['2024103']]
+    response = client.get(f'/api/admin/jobs/{job_id}', headers=headers)
+    job = response.get_json()['job']
+    assert job['status'] == 'succeeded'
+    assert job['attempts'] == 2
+    assert job['result']['summary'] == {'created_count': 3, 'updated_count': 0, 'error_count': 0}
+    assert [item['row'] for item in job['result']['results']['created']] == [2, 3, 4]
@@ -0,0 +1,49 @@
+"""
+Eksik not tamamlama: high-water mark'tan sonra biten sınavlar bir kez işlenir
+"""
+from datetime import datetime, timedelta
+
+from conftest import create_user, create_exam
+
+def test_backfill_processes_each_ended_exam_once(app):
+    from database import db, Test, TestAttempt, StudentLesson, MaintenanceMark
+    from missing_scores import backfill_missing_scores
+    
+    with app.app_context():
+        first_run = datetime.now()
+        ended = create_exam(students=2)
+        later = create_exam(students=1)
+        for exam, end_time in ((ended, first_run - timedelta(hours=1)), (later, first_run + timedelta(minutes=1))):
+            test = db.session.get(Test, exam['test_id'])
+            test.start_time, test.end_time = end_time - timedelta(hours=2), end_time
+        db.session.commit()
+        
+        result = backfill_missing_scores(now=first_run)
+        db.session.commit()
+        assert result['test_ids'] == [ended['test_id']]
+        assert result['updated_count'] == 2
+        assert result['since'] is None
+        assert db.session.query(MaintenanceMark.marked_at).scalar() == first_run
+        
+        # Yeni zaman damgaları Test.end_time ile aynı (yerel) saatte yazılır
+        created_at = db.session.query(TestAttempt.created_at).filter_by(test_id=ended['test_id']).first()[0]
+        assert abs(created_at - datetime.now()) < timedelta(minutes=1)
+        
+        # Mark'tan önce biten sınava sonradan kaydolan öğrenci tekrar işlenmez
+        late_id = create_user(
+            'student', 'late@kocaelisaglik.edu.tr', 'Geç Kayıt',
+            department='Psikoloji', student_number='2025999'
+        )
+        db.session.add(StudentLesson(student_id=late_id, lesson_id=ended['lesson_id']))
+        db.session.commit()
+        
+        result = backfill_missing_scores(now=first_run + timedelta(minutes=2))
+        db.session.commit()
+        assert result['test_ids'] == [later['test_id']]
+        assert result['updated_count'] == 1
+        assert result['since'] == first_run.isoformat()
+        assert not TestAttempt.query.filter_by(test_id=ended['test_id'], student_id=late_id).first()
+        
+        result = backfill_missing_scores(now=first_run + timedelta(minutes=3))
+        db.session.commit()
+        assert result['updated_count'] == 0
@@ -0,0 +1,120 @@
+"""
+Ders kataloğu endpoint'lerinin sorgu sayısı ders sayısından bağımsız olmalı (N+1 yok)
+"""
+import pytest
+
+from conftest import create_user, auth_headers
+
+CATALOG_ENDPOINTS = [
+    ('admin@test.com', '/api/admin/lessons'),
+    ('teacher@test.com', '/api/teacher/lessons'),
+    ('head@test.com', '/api/department-head/lessons'),
+]
+
+@pytest.fixture
+def catalog(app):
+    """Öğretmen, bölüm başkanı, öğrenciler ve ders eklemek için bir fonksiyon"""
+    from database import db, Lesson, TeacherLesson, StudentLesson
+    
+    with app.app_context():
+        create_user('admin', 'admin@test.com', 'Admin User')
+        teacher_id = create_user('teacher', 'teacher@test.com', 'Ali Veli')
+        create_user('department_head', 'head@test.com', 'Ayşe Başkan')
+        student_ids = [
+            create_user(
+                'student', f'{2024000 + i}@kocaelisaglik.edu.tr', f'Öğrenci {i}',
+                department='Psikoloji', student_number=str(2024000 + i)
+            )
+            for i in range(3)
+        ]
+    
+    def add_lessons(count):
+        with app.app_context():
+            start = Lesson.query.count()
+            for i in range(start, start + count):
+                lesson = Lesson(code=f'DRS{i:03d}', name=f'Ders {i}')
+                db.session.add(lesson)
+                db.session.flush()
+                db.session.add(TeacherLesson(teacher_id=teacher_id, lesson_id=lesson.id))
+                for student_id in student_ids:
+                    db.session.add(StudentLesson(student_id=student_id, lesson_id=lesson.id))
+            db.session.commit()
+    
+    return add_lessons
+
+@pytest.mark.parametrize('email, url', CATALOG_ENDPOINTS)
+def test_catalog_query_count_is_constant(client, catalog, count_queries, email, url):
+    headers = auth_headers(client, email)
+    # Yetki önbelleğini (utils.user_role_cache) ölçümden önce doldurur
+    client.get(url, headers=headers)
+    
+    catalog(2)
+    with count_queries() as small:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert len(response.get_json()['lessons']) == 2
+    
+    catalog(10)
+    with count_queries() as large:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert len(response.get_json()['lessons']) == 12
+    
+    assert len(large) == len(small)
+
+DETAIL_ENDPOINTS = [
+    ('head@test.com', '/api/department-head/lessons/{}'),
+    ('teacher@test.com', '/api/teacher/lessons/{}'),
+]
+
+@pytest.mark.parametrize('email, url', DETAIL_ENDPOINTS)
+def test_lesson_detail_query_count_is_constant(app, client, count_queries, email, url):
+    from database import db, Lesson, TeacherLesson, StudentLesson, Grade
+    
+    with app.app_context():
+        teacher_id = create_user('teacher', 'teacher@test.com', 'Ali Veli')
+        create_user('department_head', 'head@test.com', 'Ayşe Başkan')
+        lesson = Lesson(code='DRS001', name='Ders 1')
+        db.session.add(lesson)
+        db.session.flush()
+        lesson_id = lesson.id
+        db.session.add(TeacherLesson(teacher_id=teacher_id, lesson_id=lesson_id))
+        db.session.commit()
+    
+    def enroll(count):
+        with app.app_context():
+            start = StudentLesson.query.count()
+            for i in range(start, start + count):
+                student_id = create_user(
+                    'student', f'{2024000 + i}@kocaelisaglik.edu.tr', f'Öğrenci {i}',
+                    department='Psikoloji', student_number=str(2024000 + i)
+                )
+                db.session.add(StudentLesson(student_id=student_id, lesson_id=lesson_id))
+                db.session.add(Grade(student_id=student_id, lesson_id=lesson_id, vize_score=50 + i))
+            db.session.commit()
+    
+    url = url.format(lesson_id)
+    headers = auth_headers(client, email)
+    client.get(url, headers=headers)
+    
+    enroll(2)
+    with count_queries() as small:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert len(response.get_json()['students']) == 2
+    
+    enroll(10)
+    with count_queries() as large:
+        response = client.get(url, headers=headers)
+    data = response.get_json()
+    assert response.status_code == 200
+    assert len(data['students']) == 12
+    assert 'students' not in data['lesson']
+    if 'teachers' in data:
+        assert all(student['grade']['vize_score'] for student in data['students'])
+        assert [teacher['full_name'] for teacher in data['teachers']] == ['Ali Veli']
+    else:
+        assert all(student['vize_score'] for student in data['students'])
+        assert data['lesson']['teacher']['full_name'] == 'Ali Veli'
+    
+    assert len(large) == len(small)
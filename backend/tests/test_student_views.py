@@ -0,0 +1,55 @@
+"""
+Öğrenci görünümleri: değişmeyen cevap 304 döner, sınav başlatma/gönderme yeni ETag üretir
+"""
+from conftest import create_exam, auth_headers
+
+AVAILABLE_TESTS = '/api/student/tests/available'
+
+def get_view(client, headers, etag=None):
+    if etag:
+        headers = {**headers, 'If-None-Match': etag}
+    return client.get(AVAILABLE_TESTS, headers=headers)
+
+def test_available_tests_etag_changes_with_attempt(app, client, count_queries):
+    with app.app_context():
+        exam = create_exam(questions=2)
+    headers = auth_headers(client, exam['student_emails'][0])
+    
+    response = get_view(client, headers)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert response.get_json()['tests'][0]['attempt_status'] is None
+    
+    # Boştaki yoklama önbellekten cevaplanır, veritabanına gitmez
+    with count_queries() as queries:
+        response = get_view(client, headers, etag)
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert queries == []
+    
+    assert client.post(f"/api/student/tests/{exam['test_id']}/start", headers=headers).status_code == 200
+    response = get_view(client, headers, etag)
+    assert response.status_code == 200
+    started_etag = response.headers['ETag']
+    assert started_etag != etag
+    assert response.get_json()['tests'][0]['attempt_status'] == 'started'
+    
+    response = client.post(f"/api/student/tests/{exam['test_id']}/submit", json={'answers': []}, headers=headers)
+    assert response.status_code == 200
+    response = get_view(client, headers, started_etag)
+    assert response.status_code == 200
+    assert response.headers['ETag'] not in (etag, started_etag)
+    assert response.get_json()['tests'][0]['attempt_status'] == 'submitted'
+
+def test_views_are_cached_per_student(app, client):
+    with app.app_context():
+        exam = create_exam(students=2, questions=2)
+    first, second = (auth_headers(client, email) for email in exam['student_emails'])
+    
+    first_etag = get_view(client, first).headers['ETag']
+    second_etag = get_view(client, second).headers['ETag']
+    
+    # Bir öğrencinin denemesi diğerinin önbelleğini geçersiz kılmaz
+    assert client.post(f"/api/student/tests/{exam['test_id']}/start", headers=first).status_code == 200
+    assert get_view(client, second, second_etag).status_code == 304
+    assert get_view(client, first, first_etag).status_code == 200
@@ -0,0 +1,55 @@
+"""
+Admin kullanıcı listesi: keyset sayfalama, varsayılan sayfa boyutu
+"""
+import pytest
+
+from conftest import create_user, auth_headers
+
+@pytest.fixture
+def students(app):
+    with app.app_context():
+        create_user('admin', 'admin@test.com', 'Admin User')
+        return [
+            create_user(
+                'student', f'{2024000 + i}@kocaelisaglik.edu.tr', f'Öğrenci {i}',
+                department='Psikoloji' if i % 2 else 'Eczacılık', student_number=str(2024000 + i)
+            )
+            for i in range(7)
+        ]
+
+def _pages(client, headers, query):
+    ids, after = [], None
+    while True:
+        url = f'/api/admin/users?{query}' + (f'&after={after}' if after else '')
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200, response.get_json()
+        data = response.get_json()
+        ids.append([user['id'] for user in data['users']])
+        after = data['next_cursor']
+        if after is None:
+            return ids
+
+def test_cursor_pages_cover_every_user_once(client, students):
+    headers = auth_headers(client, 'admin@test.com')
+    
+    pages = _pages(client, headers, 'role=student&limit=3')
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [user_id for page in pages for user_id in page] == students
+    
+    pages = _pages(client, headers, 'role=student&department=Psikoloji&limit=2')
+    assert [user_id for page in pages for user_id in page] == students[1::2]
+
+def test_default_page_size_applies_without_limit(client, students, monkeypatch):
+    import admin
+    monkeypatch.setattr(admin, 'USER_PAGE_SIZE', 4)
+    headers = auth_headers(client, 'admin@test.com')
+    
+    data = client.get('/api/admin/users?role=student', headers=headers).get_json()
+    assert [user['id'] for user in data['users']] == students[:4]
+    assert data['next_cursor'] == students[3]
+
+def test_invalid_limit_is_rejected(client, students):
+    headers = auth_headers(client, 'admin@test.com')
+    assert client.get('/api/admin/users?limit=0', headers=headers).status_code == 400
+    assert client.get('/api/admin/users?limit=100000', headers=headers).status_code == 400
+    assert client.get('/api/admin/users?after=x', headers=headers).status_code == 400
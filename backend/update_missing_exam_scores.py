@@ -1,66 +1,32 @@
 """
 Süresi dolmuş sınavlara girmeyen öğrenciler için otomatik 0 notu ekle
 Bu script düzenli olarak çalıştırılmalı (örn: her gün)
+
+Sadece son çalıştırmadan bu yana biten sınavlar işlenir, bkz. missing_scores.py
 """
 from app import create_app
-from database import db, Test, StudentLesson, TestAttempt, User
-from datetime import datetime
+from database import db
+from missing_scores import backfill_missing_scores
+from student_cache import invalidate_all_student_views
 
 def update_missing_exam_scores():
     """Süresi dolmuş sınavlara girmeyen öğrenciler için 0 notu ekle"""
     app = create_app()
     
     with app.app_context():
-        # Süresi dolmuş sınavları bul
-        now = datetime.now()
-        expired_tests = Test.query.filter(Test.end_time < now).all()
+        result = backfill_missing_scores()
+        db.session.commit()
         
-        updated_count = 0
+        if result['updated_count']:
+            invalidate_all_student_views()
         
-        for test in expired_tests:
-            # Bu derse kayıtlı öğrencileri bul
-            student_lessons = StudentLesson.query.filter_by(lesson_id=test.lesson_id).all()
-            
-            for sl in student_lessons:
-                student_id = sl.student_id
-                
-                # Öğrenci bu sınava girmiş mi kontrol et
-                attempt = TestAttempt.query.filter_by(
-                    student_id=student_id,
-                    test_id=test.id
-                ).first()
-                
-                # Girmediyse veya tamamlamadıysa 0 ver
-                if not attempt:
-                    # Yeni TestAttempt oluştur (0 puan)
-                    new_attempt = TestAttempt(
-                        student_id=student_id,
-                        test_id=test.id,
-                        started_at=test.end_time,  # Sınav bitiş zamanı
-                        submitted_at=test.end_time,
-                        score=0,
-                        status='submitted'
-                    )
-                    db.session.add(new_attempt)
-                    updated_count += 1
-                    
-                    student = User.query.get(student_id)
-                    print(f"✅ {student.full_name} - {test.lesson.name} - {test.test_type.upper()} → 0 puan eklendi")
-                
-                elif attempt.status != 'submitted':
-                    # Başlamış ama tamamlamamış
-                    attempt.status = 'submitted'
-                    attempt.score = 0
-                    attempt.submitted_at = test.end_time
-                    updated_count += 1
-                    
-                    student = User.query.get(student_id)
-                    print(f"✅ {student.full_name} - {test.lesson.name} - {test.test_type.upper()} → Tamamlanmamış, 0 puan verildi")
+        for row in result['updated_students']:
+            print(f"✅ {row['student_name']} - {row['lesson_name']} - {row['test_type']} → {row['reason']}, 0 puan verildi")
         
-        db.session.commit()
-        print(f"\n🎯 Toplam {updated_count} öğrenci için otomatik 0 notu eklendi")
-        print("✅ Trigger ile notlar otomatik güncellenecek")
+        since = result['since'] or 'başlangıç'
+        print(f"\n🎯 {since} - {result['until']} arasında biten sınavlar: "
+              f"toplam {result['updated_count']} öğrenci için otomatik 0 notu eklendi")
+        print("✅ Ders notları ve istatistikler güncellendi")
 
 if __name__ == '__main__':
     update_missing_exam_scores()
-
@@ -1,20 +1,71 @@
 from functools import wraps
-from flask import jsonify
+from flask import jsonify, current_app
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
 from datetime import datetime, timedelta
-from database import db, User, Test, TestAttempt, Question, Answer, Grade, StudentLesson
+from sqlalchemy import insert, update, func
+from sqlalchemy.exc import IntegrityError
+from database import db, User, Role, Test, TestAttempt, Question, Answer, Grade, StudentLesson
+from cache import TTLCache, MISSING
+from exam_papers import get_exam_paper, invalidate_exam_paper
+from autosave import forget_autosave_window
+from student_cache import invalidate_student_views, invalidate_view
+from grade_stats import grade_scores, apply_grade_change, record_submission
 import random
 import re
 
 # JWT Utils
+# Kullanıcı varlığı/rolü için kısa süreli önbellek (silinen veya rolü değişen kullanıcıları yakalamak için)
+# TTL, create_app içinde AUTH_CACHE_TTL ile ayarlanır. Geçersiz kılma süreç içidir: rolü değişen veya
+# silinen kullanıcı, değişikliği yapmayan worker'larda en fazla AUTH_CACHE_TTL saniye eski rolüyle kalır
+user_role_cache = TTLCache(ttl=60)
+
+def get_cached_user_role(user_id):
+    """Kullanıcının rol adını önbellekten (yoksa tek sorguyla) döndürür, kullanıcı yoksa None"""
+    role_name = user_role_cache.get(user_id)
+    if role_name is MISSING:
+        role_name = db.session.query(Role.name).join(
+            User, User.role_id == Role.id
+        ).filter(User.id == user_id).scalar()
+        user_role_cache.set(user_id, role_name)
+    return role_name
+
+def invalidate_user_cache(user_id):
+    """Kullanıcının rolü değiştiğinde veya kullanıcı silindiğinde çağrılmalı"""
+    user_role_cache.invalidate(user_id)
+
 def role_required(*allowed_roles):
-    """JWT token kontrolü ve rol kontrolü yapan decorator"""
+    """JWT token kontrolü ve rol kontrolü yapan decorator
+    
+    AUTH_MODE='claims' (varsayılan): rol, imzalı token'daki 'role' claim'inden okunur ve
+    önbellekteki rolle karşılaştırılır; veritabanına sadece önbellekte olmayan kullanıcılar
+    için gidilir. 'role' claim'i olmayan (eski) token'lar 401 ile reddedilir; istemci
+    refresh ile claim'li yeni token alır.
+    AUTH_MODE='database': her istekte kullanıcı ve rolü veritabanından okunur.
+    """
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
             try:
                 verify_jwt_in_request()
                 current_user_id = int(get_jwt_identity())
+                
+                if current_app.config.get('AUTH_MODE', 'claims') == 'claims':
+                    token_role = get_jwt().get('role')
+                    if token_role is None:
+                        return jsonify({'error': 'Token is no longer valid, please log in again'}), 401
+                    
+                    current_role = get_cached_user_role(current_user_id)
+                    if current_role is None:
+                        return jsonify({'error': 'User not found'}), 404
+                    
+                    if token_role != current_role:
+                        return jsonify({'error': 'Token is no longer valid, please log in again'}), 401
+                    
+                    if token_role not in allowed_roles:
+                        return jsonify({'error': 'Insufficient permissions'}), 403
+                    
+                    return f(*args, **kwargs)
+                
                 user = User.query.get(current_user_id)
                 
                 if not user:
@@ -98,7 +149,7 @@ def validate_test_duration(start_time, end_time, duration_seconds):
         return False, f"Invalid datetime format: {str(e)}"
 
 # Exam Logic
-def can_start_exam(test, student_id):
+def can_start_exam(test, student_id, question_count=None):
     """Öğrencinin sınavı başlatıp başlatamayacağını kontrol eder"""
     now = datetime.now()  # Lokal saat kullan (UTC yerine)
     
@@ -129,7 +180,8 @@ def can_start_exam(test, student_id):
         else:
             return False, "Bu sınavı zaten başlattınız. Çıktıktan sonra tekrar giremezsiniz."
     
-    question_count = Question.query.filter_by(test_id=test.id).count()
+    if question_count is None:
+        question_count = Question.query.filter_by(test_id=test.id).count()
     if question_count < test.min_questions:
         return False, f"Sınav için en az {test.min_questions} soru gereklidir"
     
@@ -151,44 +203,58 @@ def start_exam(test_id, student_id):
         print(f"❌ Zaten attempt var: {existing_attempt.status}")
         return None, "Bu sınavı zaten başlattınız. Çıktıktan sonra tekrar giremezsiniz."
     
-    can_start, error = can_start_exam(test, student_id)
+    # Soru havuzu test başına bir kez yüklenir (bkz. exam_papers.py)
+    paper = get_exam_paper(test_id)
+    print(f"🔍 Sınav kağıdında {len(paper)} soru var")
+    
+    can_start, error = can_start_exam(test, student_id, question_count=len(paper))
     if not can_start:
         print(f"❌ Sınava başlanamıyor: {error}")
         return None, error
     
-    all_questions = Question.query.filter_by(test_id=test_id).all()
-    print(f"🔍 Veritabanında {len(all_questions)} soru bulundu")
-    
-    if len(all_questions) < test.min_questions:
-        print(f"❌ Yetersiz soru: {len(all_questions)} < {test.min_questions}")
-        return None, f"Sınav için en az {test.min_questions} soru gereklidir"
-    
-    random.shuffle(all_questions)
-    selected_questions = all_questions[:test.min_questions] if len(all_questions) > test.min_questions else all_questions
-    print(f"🔍 {len(selected_questions)} soru seçildi")
-    
-    attempt = TestAttempt(
-        test_id=test_id,
-        student_id=student_id,
-        started_at=datetime.now(),
-        status='started'
-    )
-    db.session.add(attempt)
-    db.session.flush()
-    
-    for question in selected_questions:
-        answer = Answer(
-            attempt_id=attempt.id,
-            question_id=question.id,
-            selected_answer=None,
-            is_correct=False,
-            points_earned=0.00
-        )
-        db.session.add(answer)
+    selected_question_ids, questions_data = paper.draw(test.min_questions)
+    print(f"🔍 {len(selected_question_ids)} soru seçildi")
     
-    db.session.commit()
+    # Attempt tek INSERT ... RETURNING ile, cevap iskeleti tek executemany ile yazılır
+    # (PostgreSQL'de SQLAlchemy bunu çok satırlı tek bir INSERT'e çevirir, derlenmiş ifade önbellekte kalır).
+    # Aynı anda gelen ikinci istek unique_test_student kısıtına takılır.
+    try:
+        attempt = db.session.scalars(
+            insert(TestAttempt).returning(TestAttempt),
+            [{
+                'test_id': test_id,
+                'student_id': student_id,
+                'started_at': datetime.now(),
+                'status': 'started'
+            }]
+        ).one()
+        
+        if selected_question_ids:
+            db.session.execute(Answer.__table__.insert(), [
+                {
+                    'attempt_id': attempt.id,
+                    'question_id': question_id,
+                    'selected_answer': None,
+                    'is_correct': False,
+                    'points_earned': 0.00
+                }
+                for question_id in selected_question_ids
+            ])
+        
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        # unique_test_student ihlali: eşzamanlı ikinci istek attempt'i zaten oluşturdu
+        if TestAttempt.query.filter_by(test_id=test_id, student_id=student_id).first():
+            print("❌ Eşzamanlı başlatma: attempt zaten oluşturulmuş")
+            return None, "Bu sınavı zaten başlattınız. Çıktıktan sonra tekrar giremezsiniz."
+        # Yabancı anahtar ihlali: seçilen soru bu arada havuzdan silindi
+        invalidate_exam_paper(test_id)
+        print("❌ Soru havuzu değişti: seçilen sorulardan biri silinmiş")
+        return None, "Sınavın soruları güncellendi, lütfen tekrar deneyin."
+    
+    invalidate_student_views(student_id)
     
-    questions_data = [q.to_dict(include_correct=False) for q in selected_questions]
     print(f"✅ Sorular hazırlandı: {len(questions_data)} soru")
     print(f"✅ İlk soru: {questions_data[0] if questions_data else 'YOK'}")
     
@@ -211,6 +277,8 @@ def check_exam_expired(attempt):
 def submit_exam(attempt_id, answers_data):
     """Sınavı gönderir ve puanı hesaplar"""
     attempt = TestAttempt.query.get_or_404(attempt_id)
+    # Devam eden autosave yazımları beklenir; sonrakiler denemeyi gönderilmiş görür (bkz. autosave.py)
+    db.session.refresh(attempt, with_for_update=True)
     
     if attempt.status == 'submitted':
         return attempt, "Sınav zaten gönderildi"
@@ -220,46 +288,83 @@ def submit_exam(attempt_id, answers_data):
         attempt.status = 'expired'
         attempt.submitted_at = datetime.now()
         db.session.commit()
+        forget_autosave_window(attempt.test_id, attempt.student_id)
+        invalidate_student_views(attempt.student_id)
         return attempt, error
     
-    total_score = 0.00
-    for answer_data in answers_data:
-        question_id = answer_data.get('question_id')
-        selected_answer = answer_data.get('selected_answer')
-        
-        answer = Answer.query.filter_by(
-            attempt_id=attempt_id,
-            question_id=question_id
-        ).first()
-        
-        if answer:
-            question = Question.query.get(question_id)
-            answer.selected_answer = selected_answer
-            
-            if selected_answer and question.correct_answer == selected_answer:
-                answer.is_correct = True
-                answer.points_earned = question.points
-                total_score += question.points
-            else:
-                answer.is_correct = False
-                answer.points_earned = 0.00
-    
-    attempt.score = total_score
+    finalize_attempt(attempt, answers_data)
+    
+    db.session.commit()
+    invalidate_student_views(attempt.student_id)
+    invalidate_view('lessons')  # sınıf ortalaması değişti
+    
+    return attempt, None
+
+def finalize_attempt(attempt, answers_data, submitted_at=None):
+    """Cevapları puanlar, denemeyi 'submitted' yapar ve ders notunu günceller (commit etmez)
+    
+    Süre kontrolü çağırana aittir; kuyruktan puanlamada submitted_at gönderimin alındığı zamandır.
+    """
+    attempt.score = grade_answers(attempt.id, answers_data)
     attempt.status = 'submitted'
-    attempt.submitted_at = datetime.now()
+    attempt.submitted_at = submitted_at or datetime.now()
     
+    record_submission(attempt.test_id, attempt.score)
     update_grade(attempt.test, attempt.student_id, attempt.score)
+    forget_autosave_window(attempt.test_id, attempt.student_id)
+
+def grade_answers(attempt_id, answers_data):
+    """Cevapları puanlar ve toplam puanı döndürür
+    
+    Denemenin tüm cevapları doğru cevap/puan bilgisiyle tek sorguda okunur,
+    puanlama bellekte yapılır ve değişen satırlar tek toplu UPDATE ile yazılır.
+    answers_data içinde olmayan sorular için autosave ile kaydedilmiş cevap puanlanır.
+    """
+    submitted = {}
+    for answer_data in answers_data:
+        try:
+            question_id = int(answer_data.get('question_id'))
+        except (TypeError, ValueError):
+            continue
+        submitted[question_id] = answer_data.get('selected_answer')
+    
+    rows = db.session.query(
+        Answer.id, Answer.question_id, Answer.selected_answer, Question.correct_answer, Question.points
+    ).join(Question, Answer.question_id == Question.id).filter(
+        Answer.attempt_id == attempt_id
+    ).all()
     
-    db.session.commit()
+    total_score = 0.00
+    updates = []
+    for answer_id, question_id, saved_answer, correct_answer, points in rows:
+        if question_id not in submitted and not saved_answer:
+            continue
+        
+        selected_answer = submitted.get(question_id, saved_answer)
+        is_correct = bool(selected_answer) and correct_answer == selected_answer
+        points_earned = points if is_correct else 0.00
+        if is_correct:
+            total_score += points
+        
+        updates.append({
+            'id': answer_id,
+            'selected_answer': selected_answer,
+            'is_correct': is_correct,
+            'points_earned': points_earned
+        })
     
-    return attempt, None
+    if updates:
+        db.session.execute(update(Answer), updates)
+    
+    return total_score
 
 def update_grade(test, student_id, score):
-    """Ders notunu günceller (vize/final ağırlıklarına göre)"""
+    """Ders notunu ve dersin not istatistiklerini günceller (vize/final ağırlıklarına göre), commit çağırana aittir"""
     grade = Grade.query.filter_by(
         student_id=student_id,
         lesson_id=test.lesson_id
     ).first()
+    old_scores = grade_scores(grade)
     
     if not grade:
         grade = Grade(
@@ -273,7 +378,16 @@ def update_grade(test, student_id, score):
     elif test.test_type == 'final':
         grade.final_score = score
     elif test.test_type == 'quiz':
-        grade.quiz_score = score
+        # Derste birden fazla quiz olabilir: quiz notu gönderilmiş tüm quizlerin ortalamasıdır
+        quiz_average = db.session.query(func.avg(TestAttempt.score)).join(
+            Test, TestAttempt.test_id == Test.id
+        ).filter(
+            Test.lesson_id == test.lesson_id,
+            Test.test_type == 'quiz',
+            TestAttempt.student_id == student_id,
+            TestAttempt.status == 'submitted'
+        ).scalar()
+        grade.quiz_score = quiz_average if quiz_average is not None else score
     
     if grade.vize_score is not None and grade.final_score is not None:
         vize_weight = float(test.vize_weight) / 100.0
@@ -284,7 +398,7 @@ def update_grade(test, student_id, score):
     elif grade.final_score is not None:
         grade.total_score = float(grade.final_score)
     
-    db.session.commit()
+    apply_grade_change(test.lesson_id, old_scores, grade_scores(grade))
 
 def get_random_questions(test_id, limit=None):
     """Test için rastgele soruları döndürür"""
@@ -6,6 +6,7 @@ const API_BASE_URL = process.env.REACT_APP_API_BASE_URL || 'http://localhost:500
 function DepartmentHeadDashboard({ user, onLogout }) {
   const [activeMenu, setActiveMenu] = useState('dersler') // 'dersler', 'notlar', 'ogretmenler'
   const [lessons, setLessons] = useState([])
+  const [lessonsPagination, setLessonsPagination] = useState(null)
   const [teachers, setTeachers] = useState([])
   const [selectedLesson, setSelectedLesson] = useState(null)
   const [lessonDetails, setLessonDetails] = useState(null)
@@ -24,17 +25,19 @@ function DepartmentHeadDashboard({ user, onLogout }) {
     return () => clearInterval(timer)
   }, [])
 
-  const fetchLessons = async () => {
-    setLoading(true)
+  // Ders özeti sayfa sayfa yüklenir (kayıt sayısı, ortalama ve öğretim görevlisi tek sorguda gelir)
+  const fetchLessons = async (page = 1) => {
+    if (page === 1) setLoading(true)
     try {
       const token = localStorage.getItem('access_token')
-      const response = await fetch(`${API_BASE_URL}/department-head/lessons`, {
+      const response = await fetch(`${API_BASE_URL}/department-head/overview/lessons?page=${page}&per_page=100&sort=name`, {
         headers: { 'Authorization': `Bearer ${token}` }
       })
       const data = await response.json()
       
       if (response.ok) {
-        setLessons(data.lessons || [])
+        setLessons(prev => page === 1 ? (data.lessons || []) : [...prev, ...(data.lessons || [])])
+        setLessonsPagination(data.pagination || null)
       } else {
         setError(data.error || 'Dersler yüklenirken hata oluştu')
       }
@@ -165,10 +168,10 @@ function DepartmentHeadDashboard({ user, onLogout }) {
                 onClick: () => fetchLessonDetails(lesson.id)
               },
                 React.createElement('h3', { className: 'card-title' }, lesson.name),
-                lesson.teachers && lesson.teachers.length > 0 && React.createElement('div', { className: 'teacher-info' },
+                lesson.teacher && React.createElement('div', { className: 'teacher-info' },
                   React.createElement('span', { style: { color: '#6b7280', fontSize: '13px' } }, 'Öğretim Görevlisi:'),
                   React.createElement('span', { style: { color: '#1f2937', fontSize: '14px', fontWeight: '600', marginTop: '4px' } }, 
-                    lesson.teachers[0].full_name
+                    lesson.teacher.full_name
                   )
                 ),
                 React.createElement('div', { className: 'card-stats' },
@@ -183,7 +186,11 @@ function DepartmentHeadDashboard({ user, onLogout }) {
                 )
               )
             )
-          )
+          ),
+          lessonsPagination && lessonsPagination.page < lessonsPagination.pages && React.createElement('button', {
+            className: 'back-button',
+            onClick: () => fetchLessons(lessonsPagination.page + 1)
+          }, 'Daha fazla ders yükle')
         ) : 
         // Ders detayı
         React.createElement('div', { className: 'lesson-detail-view' },
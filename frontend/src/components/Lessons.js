@@ -1,11 +1,20 @@
 import React, { useState, useEffect } from 'react'
 import './Lessons.css'
-import * as XLSX from 'xlsx'
+import { waitForJob } from '../utils/api'
 
 function Lessons() {
   const [lessons, setLessons] = useState([])
-  const [students, setStudents] = useState([])
-  const [teachers, setTeachers] = useState([])
+  // Seçili dersin öğrencileri (kayıtlı + bu düzenlemede eklenenler)
+  const [lessonStudents, setLessonStudents] = useState([])
+  // Derse eklenebilecek öğrenciler ve öğretmenler sunucuda sayfalı aranır
+  const [studentSearch, setStudentSearch] = useState('')
+  const [studentResults, setStudentResults] = useState([])
+  const [studentPage, setStudentPage] = useState(1)
+  const [studentHasMore, setStudentHasMore] = useState(false)
+  const [teacherSearch, setTeacherSearch] = useState('')
+  const [teacherResults, setTeacherResults] = useState([])
+  const [teacherPage, setTeacherPage] = useState(1)
+  const [teacherHasMore, setTeacherHasMore] = useState(false)
   const [loading, setLoading] = useState(true)
   const [selectedLesson, setSelectedLesson] = useState(null)
   const [isAddingNew, setIsAddingNew] = useState(false)
@@ -22,10 +31,21 @@ function Lessons() {
 
   useEffect(() => {
     fetchLessons()
-    fetchStudents()
-    fetchTeachers()
   }, [])
 
+  // Aramalar yazarken her tuşta istek atmamak için beklenir
+  useEffect(() => {
+    if (!selectedLesson) return
+    const timer = setTimeout(() => fetchUnassignedStudents(1), 300)
+    return () => clearTimeout(timer)
+  }, [selectedLesson, studentSearch, selectedDepartment])
+
+  useEffect(() => {
+    if (!selectedLesson) return
+    const timer = setTimeout(() => fetchTeachers(1), 300)
+    return () => clearTimeout(timer)
+  }, [selectedLesson, teacherSearch])
+
   const fetchLessons = async () => {
     try {
       const token = localStorage.getItem('access_token')
@@ -43,32 +63,41 @@ function Lessons() {
     }
   }
 
-  const fetchStudents = async () => {
+  // Derse kayıtlı olmayan öğrenciler (sayfalı); page > 1 ise sonuçlar listeye eklenir
+  const fetchUnassignedStudents = async (page) => {
     try {
       const token = localStorage.getItem('access_token')
-      const response = await fetch('http://localhost:5000/api/admin/users', {
+      const params = new URLSearchParams({ q: studentSearch.trim(), page, per_page: 20 })
+      if (selectedDepartment !== 'all') {
+        params.append('department', selectedDepartment)
+      }
+      const response = await fetch(`http://localhost:5000/api/admin/lessons/${selectedLesson.id}/unassigned-students?${params}`, {
         headers: { 'Authorization': `Bearer ${token}` }
       })
       const data = await response.json()
       if (response.ok) {
-        const studentList = data.users.filter(u => u.role_name === 'student')
-        setStudents(studentList)
+        setStudentResults(page > 1 ? [...studentResults, ...data.students] : data.students)
+        setStudentPage(page)
+        setStudentHasMore(data.pagination.has_more)
       }
     } catch (err) {
       console.error('Öğrenciler yüklenirken hata:', err)
     }
   }
 
-  const fetchTeachers = async () => {
+  // Öğretmen araması (sayfalı); page > 1 ise sonuçlar listeye eklenir
+  const fetchTeachers = async (page) => {
     try {
       const token = localStorage.getItem('access_token')
-      const response = await fetch('http://localhost:5000/api/admin/users', {
+      const params = new URLSearchParams({ role: 'teacher', q: teacherSearch.trim(), page, per_page: 20 })
+      const response = await fetch(`http://localhost:5000/api/admin/search/users?${params}`, {
         headers: { 'Authorization': `Bearer ${token}` }
       })
       const data = await response.json()
       if (response.ok) {
-        const teacherList = data.users.filter(u => u.role_name === 'teacher')
-        setTeachers(teacherList)
+        setTeacherResults(page > 1 ? [...teacherResults, ...data.users] : data.users)
+        setTeacherPage(page)
+        setTeacherHasMore(data.pagination.has_more)
       }
     } catch (err) {
       console.error('Öğretmenler yüklenirken hata:', err)
@@ -87,6 +116,9 @@ function Lessons() {
     setIsAddingNew(false)
     setSelectedLesson(lesson)
     setSelectedDepartment('all')
+    setLessonStudents(lesson.students || [])
+    setStudentSearch('')
+    setTeacherSearch('')
     setFormData({
       name: lesson.name,
       code: lesson.code,
@@ -97,23 +129,28 @@ function Lessons() {
     setSuccess('')
   }
 
-  const getFilteredStudents = () => {
-    if (selectedDepartment === 'all') {
-      return students
+  // Seçilen dersin mevcut öğretmeni arama sonuçlarında yoksa da seçenek olarak gösterilir
+  const getTeacherOptions = () => {
+    const current = selectedLesson && selectedLesson.teacher
+    if (current && !teacherResults.some(t => t.id === current.id)) {
+      return [current, ...teacherResults]
     }
-    return students.filter(s => s.department === selectedDepartment)
+    return teacherResults
   }
 
   const handleInputChange = (field, value) => {
     setFormData({ ...formData, [field]: value })
   }
 
-  const handleStudentToggle = (studentId) => {
+  const handleStudentToggle = (student) => {
     const currentIds = formData.student_ids || []
-    if (currentIds.includes(studentId)) {
-      setFormData({ ...formData, student_ids: currentIds.filter(id => id !== studentId) })
+    if (currentIds.includes(student.id)) {
+      setFormData({ ...formData, student_ids: currentIds.filter(id => id !== student.id) })
     } else {
-      setFormData({ ...formData, student_ids: [...currentIds, studentId] })
+      setFormData({ ...formData, student_ids: [...currentIds, student.id] })
+      if (!lessonStudents.some(s => s.id === student.id)) {
+        setLessonStudents([...lessonStudents, student])
+      }
     }
   }
 
@@ -198,65 +235,51 @@ function Lessons() {
     }
   }
 
-  const handleExcelUpload = (event) => {
+  const handleExcelUpload = async (event) => {
     const file = event.target.files[0]
     if (!file) return
+    // Input'u temizle (aynı dosyayı tekrar seçebilmek için)
+    event.target.value = ''
 
-    const reader = new FileReader()
-    reader.onload = async (e) => {
-      try {
-        const data = new Uint8Array(e.target.result)
-        const workbook = XLSX.read(data, { type: 'array' })
-        const sheetName = workbook.SheetNames[0]
-        const worksheet = workbook.Sheets[sheetName]
-        const jsonData = XLSX.utils.sheet_to_json(worksheet, { header: 1 })
-
-        // İlk satır başlık, 2. satırdan itibaren veri
-        const lessons = []
-        for (let i = 1; i < jsonData.length; i++) {
-          const row = jsonData[i]
-          if (!row[0]) continue // Boş satırları atla
-
-          lessons.push({
-            name: String(row[0] || '').trim(),
-            code: String(row[1] || '').trim()
-          })
-        }
-
-        if (lessons.length === 0) {
-          setError('Excel dosyasında ders verisi bulunamadı')
-          return
-        }
+    try {
+      // Dosya olduğu gibi gönderilir; satırlar sunucuda akış halinde okunur
+      const formData = new FormData()
+      formData.append('file', file)
 
-        // Backend'e gönder
-        const token = localStorage.getItem('access_token')
-        const response = await fetch('http://localhost:5000/api/admin/lessons/bulk-upload', {
-          method: 'POST',
-          headers: {
-            'Content-Type': 'application/json',
-            'Authorization': `Bearer ${token}`
-          },
-          body: JSON.stringify({ lessons })
-        })
+      const token = localStorage.getItem('access_token')
+      const response = await fetch('http://localhost:5000/api/admin/lessons/bulk-upload', {
+        method: 'POST',
+        headers: {
+          'Authorization': `Bearer ${token}`
+        },
+        body: formData
+      })
 
-        const result = await response.json()
+      const queued = await response.json()
 
-        if (response.ok) {
-          setUploadResults(result)
-          setSuccess(`Toplu yükleme tamamlandı! Oluşturulan: ${result.summary.created_count}, Güncellenen: ${result.summary.updated_count}, Hata: ${result.summary.error_count}`)
-          fetchLessons()
-        } else {
-          setError(result.error || 'Toplu yükleme başarısız')
+      if (response.ok) {
+        // Yükleme arka planda çalışır; bitene kadar ilerleme gösterilir
+        const job = await waitForJob(queued.job.id, (j) => {
+          if (j.progress.percent !== null) {
+            setSuccess(`Toplu yükleme sürüyor... %${j.progress.percent}`)
+          }
+        })
+        if (job.status !== 'succeeded') {
+          setSuccess('')
+          setError(job.error || 'Toplu yükleme başarısız')
+          return
         }
-      } catch (err) {
-        console.error('Excel okuma hatası:', err)
-        setError('Excel dosyası okunurken hata oluştu')
+        const result = job.result
+        setUploadResults(result)
+        setSuccess(`Toplu yükleme tamamlandı! Oluşturulan: ${result.summary.created_count}, Güncellenen: ${result.summary.updated_count}, Hata: ${result.summary.error_count}`)
+        fetchLessons()
+      } else {
+        setError(queued.error || 'Toplu yükleme başarısız')
       }
+    } catch (err) {
+      console.error('Dosya yükleme hatası:', err)
+      setError('Dosya yüklenirken hata oluştu')
     }
-
-    reader.readAsArrayBuffer(file)
-    // Input'u temizle
-    event.target.value = ''
   }
 
   return React.createElement('div', { className: 'lessons-container' },
@@ -272,7 +295,7 @@ function Lessons() {
         React.createElement('input', {
           type: 'file',
           id: 'lesson-excel-upload',
-          accept: '.xlsx, .xls',
+          accept: '.xlsx, .xls, .csv',
           style: { display: 'none' },
           onChange: handleExcelUpload
         }),
@@ -386,16 +409,50 @@ function Lessons() {
               onChange: (e) => handleInputChange('teacher_id', Number(e.target.value))
             },
               React.createElement('option', { value: '' }, 'Öğretmen Seçin'),
-              teachers.map(teacher =>
+              getTeacherOptions().map(teacher =>
                 React.createElement('option', { key: teacher.id, value: teacher.id },
                   teacher.full_name
                 )
               )
-            )
+            ),
+            React.createElement('input', {
+              type: 'text',
+              className: 'picker-search',
+              value: teacherSearch,
+              onChange: (e) => setTeacherSearch(e.target.value),
+              placeholder: 'Öğretmen ara (ad, email)'
+            }),
+            teacherHasMore && React.createElement('button', {
+              type: 'button',
+              className: 'load-more-btn',
+              onClick: () => fetchTeachers(teacherPage + 1)
+            }, 'Daha fazla öğretmen yükle')
           ),
 
           !isAddingNew && React.createElement('div', { className: 'form-group' },
             React.createElement('label', null, 'Öğrenciler'),
+            React.createElement('div', { className: 'students-list' },
+              lessonStudents.length === 0 && React.createElement('p', { className: 'empty-text' }, 'Bu derse kayıtlı öğrenci yok'),
+              lessonStudents.map(student =>
+                React.createElement('label', {
+                  key: student.id,
+                  className: 'student-checkbox-label'
+                },
+                  React.createElement('input', {
+                    type: 'checkbox',
+                    checked: formData.student_ids.includes(student.id),
+                    onChange: () => handleStudentToggle(student)
+                  }),
+                  React.createElement('span', null,
+                    `${student.student_number || 'N/A'} - ${student.full_name}`
+                  )
+                )
+              )
+            )
+          ),
+
+          !isAddingNew && React.createElement('div', { className: 'form-group' },
+            React.createElement('label', null, 'Öğrenci Ekle'),
             React.createElement('div', { className: 'department-filter-wrapper' },
               React.createElement('select', {
                 value: selectedDepartment,
@@ -409,25 +466,35 @@ function Lessons() {
                 React.createElement('option', { value: 'Eczacılık' }, 'Eczacılık')
               )
             ),
+            React.createElement('input', {
+              type: 'text',
+              className: 'picker-search',
+              value: studentSearch,
+              onChange: (e) => setStudentSearch(e.target.value),
+              placeholder: 'Öğrenci ara (ad, numara, email)'
+            }),
             React.createElement('div', { className: 'students-list' },
-              students.length === 0 && React.createElement('p', { className: 'empty-text' }, 'Henüz öğrenci yok'),
-              getFilteredStudents().length === 0 && students.length > 0 && 
-                React.createElement('p', { className: 'empty-text' }, 'Bu bölümde öğrenci yok'),
-              getFilteredStudents().map(student =>
+              studentResults.length === 0 && React.createElement('p', { className: 'empty-text' }, 'Eklenebilecek öğrenci bulunamadı'),
+              studentResults.filter(s => !formData.student_ids.includes(s.id)).map(student =>
                 React.createElement('label', {
                   key: student.id,
                   className: 'student-checkbox-label'
                 },
                   React.createElement('input', {
                     type: 'checkbox',
-                    checked: formData.student_ids.includes(student.id),
-                    onChange: () => handleStudentToggle(student.id)
+                    checked: false,
+                    onChange: () => handleStudentToggle(student)
                   }),
                   React.createElement('span', null,
                     `${student.student_number || 'N/A'} - ${student.full_name}`
                   )
                 )
-              )
+              ),
+              studentHasMore && React.createElement('button', {
+                type: 'button',
+                className: 'load-more-btn',
+                onClick: () => fetchUnassignedStudents(studentPage + 1)
+              }, 'Daha fazla öğrenci yükle')
             )
           ),
 
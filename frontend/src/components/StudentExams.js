@@ -1,5 +1,6 @@
 import React, { useState, useEffect, useCallback, useRef } from 'react'
 import './StudentExams.css'
+import { waitForSubmission } from '../utils/api'
 
 const API_BASE_URL = process.env.REACT_APP_API_BASE_URL || 'http://localhost:5000/api'
 
@@ -15,6 +16,10 @@ function StudentExams({ examMode = false, onEnterExam = null, onExitExam = null,
   const [currentQuestionIndex, setCurrentQuestionIndex] = useState(0) // Aktif soru index'i
   const answersRef = useRef({})
   const activeTestRef = useRef(null)
+  const unsavedAnswersRef = useRef({}) // Henüz autosave ile gönderilmemiş cevaplar
+  const autosaveTimerRef = useRef(null)
+  const submittingRef = useRef(false) // Gönderim sürerken süre dolunca tekrar gönderilmez
+  const [grading, setGrading] = useState(false)
 
   // initialExamData varsa (exam mode'a ilk girildiğinde), state'i set et
   useEffect(() => {
@@ -59,8 +64,32 @@ function StudentExams({ examMode = false, onEnterExam = null, onExitExam = null,
     }
   }, [fetchTests, examMode])
 
+  // ASYNC_GRADING açıkken gönderim 202 + makbuz döner; puanlama bitene kadar makbuz sorgulanır
+  const waitForGrading = useCallback(async (response, data) => {
+    if (response.status !== 202 || !data.receipt) return
+    
+    setGrading(true)
+    try {
+      const receipt = await waitForSubmission(data.receipt.receipt_id)
+      if (receipt.status !== 'graded') {
+        setError('Sınavınız alındı, puanlama devam ediyor. Sonucunuz hazır olduğunda burada görünecek.')
+      }
+    } catch (err) {
+      console.error('Puanlama durumu alınamadı:', err)
+      setError('Sınavınız alındı, puanlama devam ediyor. Sonucunuz hazır olduğunda burada görünecek.')
+    } finally {
+      setGrading(false)
+    }
+  }, [])
+
   const handleAutoSubmit = useCallback(async () => {
-    if (!activeTestRef.current) return
+    if (!activeTestRef.current || submittingRef.current) return
+    submittingRef.current = true
+    
+    // Gönderim tüm cevapları içerir, bekleyen autosave'e gerek yok
+    clearTimeout(autosaveTimerRef.current)
+    autosaveTimerRef.current = null
+    unsavedAnswersRef.current = {}
     
     try {
       const token = localStorage.getItem('access_token')
@@ -81,6 +110,8 @@ function StudentExams({ examMode = false, onEnterExam = null, onExitExam = null,
       const data = await response.json()
       
       if (response.ok) {
+        await waitForGrading(response, data)
+        
         // Alert yok, direkt çık
         setTestStarted(false)
         setActiveTest(null)
@@ -102,8 +133,10 @@ function StudentExams({ examMode = false, onEnterExam = null, onExitExam = null,
     } catch (err) {
       console.error('Sınav gönderme hatası:', err)
       setError('Sınav gönderilemedi')
+    } finally {
+      submittingRef.current = false
     }
-  }, [fetchTests])
+  }, [fetchTests, waitForGrading])
 
   useEffect(() => {
     if (testStarted && timeRemaining !== null && activeTest) {
@@ -185,10 +218,46 @@ function StudentExams({ examMode = false, onEnterExam = null, onExitExam = null,
     }
   }
 
+  // Değişen cevapları kısa aralıklarla toplu olarak kaydet (bağlantı koparsa cevaplar kaybolmaz)
+  const flushAutosave = useCallback(async () => {
+    clearTimeout(autosaveTimerRef.current)
+    autosaveTimerRef.current = null
+    
+    const unsaved = unsavedAnswersRef.current
+    unsavedAnswersRef.current = {}
+    if (!activeTestRef.current || Object.keys(unsaved).length === 0) return
+    
+    try {
+      const token = localStorage.getItem('access_token')
+      await fetch(`${API_BASE_URL}/student/tests/${activeTestRef.current.id}/answers`, {
+        method: 'PATCH',
+        headers: { 
+          'Authorization': `Bearer ${token}`,
+          'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({
+          answers: Object.keys(unsaved).map(questionId => ({
+            question_id: parseInt(questionId),
+            selected_answer: unsaved[questionId]
+          }))
+        })
+      })
+    } catch (err) {
+      // Sonraki değişiklikle tekrar denenir; /submit tüm cevapları zaten gönderir
+      console.error('Otomatik kaydetme hatası:', err)
+      unsavedAnswersRef.current = { ...unsaved, ...unsavedAnswersRef.current }
+    }
+  }, [])
+
   const handleAnswerChange = (questionId, answer) => {
     const newAnswers = { ...answers, [questionId]: answer }
     setAnswers(newAnswers)
     answersRef.current = newAnswers
+    
+    unsavedAnswersRef.current = { ...unsavedAnswersRef.current, [questionId]: answer }
+    if (!autosaveTimerRef.current) {
+      autosaveTimerRef.current = setTimeout(flushAutosave, 2000)
+    }
   }
 
   const handleNextQuestion = () => {
@@ -208,7 +277,12 @@ function StudentExams({ examMode = false, onEnterExam = null, onExitExam = null,
   }
 
   const submitTest = async (isAuto = false) => {
-    if (!activeTest) return
+    if (!activeTest || submittingRef.current) return
+    submittingRef.current = true
+    
+    clearTimeout(autosaveTimerRef.current)
+    autosaveTimerRef.current = null
+    unsavedAnswersRef.current = {}
     
     try {
       const token = localStorage.getItem('access_token')
@@ -229,6 +303,8 @@ function StudentExams({ examMode = false, onEnterExam = null, onExitExam = null,
       const data = await response.json()
       
       if (response.ok) {
+        await waitForGrading(response, data)
+        
         // Alert yok, direkt çık
         setTestStarted(false)
         setActiveTest(null)
@@ -248,6 +324,8 @@ function StudentExams({ examMode = false, onEnterExam = null, onExitExam = null,
     } catch (err) {
       console.error('Sınav gönderme hatası:', err)
       setError('Sınav gönderilemedi')
+    } finally {
+      submittingRef.current = false
     }
   }
 
@@ -451,8 +529,9 @@ function StudentExams({ examMode = false, onEnterExam = null, onExitExam = null,
             
             React.createElement('button', {
               className: 'finish-exam-btn',
-              onClick: handleSubmitTest
-            }, 'Sınavı Bitir'),
+              onClick: handleSubmitTest,
+              disabled: grading
+            }, grading ? 'Puanlanıyor...' : 'Sınavı Bitir'),
 
             React.createElement('button', {
               className: 'nav-btn next-btn',
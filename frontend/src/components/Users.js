@@ -1,15 +1,22 @@
 import React, { useState, useEffect } from 'react'
 import './Users.css'
-import * as XLSX from 'xlsx'
+import { waitForJob, clearJobSecrets } from '../utils/api'
+
+// Liste sunucudan sayfa sayfa (keyset) alınır
+const USERS_PAGE_SIZE = 50
 
 function Users() {
   const [activeRole, setActiveRole] = useState('student')
   const [users, setUsers] = useState([])
   const [lessons, setLessons] = useState([])
   const [loading, setLoading] = useState(true)
+  const [nextCursor, setNextCursor] = useState(null) // Sonraki sayfa yoksa null
+  const [loadingMore, setLoadingMore] = useState(false)
   const [selectedUser, setSelectedUser] = useState(null)
   const [isAddingNew, setIsAddingNew] = useState(false)
   const [departmentFilter, setDepartmentFilter] = useState('all')
+  const [searchTerm, setSearchTerm] = useState('')
+  const [searchResults, setSearchResults] = useState(null) // Arama yokken null
   const [uploadResults, setUploadResults] = useState(null)
   const [formData, setFormData] = useState({
     full_name: '',
@@ -23,32 +30,73 @@ function Users() {
   const [resetPasswordInfo, setResetPasswordInfo] = useState(null)
 
   useEffect(() => {
-    fetchUsers()
     fetchLessons()
   }, [activeRole])
 
-  const fetchUsers = async () => {
-    setLoading(true)
+  // Bölüm filtresi sunucuda uygulanır; filtre değişince liste ilk sayfadan yüklenir
+  useEffect(() => {
+    fetchUsers()
+  }, [activeRole, departmentFilter])
+
+  // Arama sunucuda yapılır (sıralı, ilk 50 eşleşme); yazarken her tuşta istek atmamak için beklenir
+  useEffect(() => {
+    const term = searchTerm.trim()
+    if (!term) {
+      setSearchResults(null)
+      return
+    }
+    const timer = setTimeout(() => searchUsers(term), 300)
+    return () => clearTimeout(timer)
+  }, [searchTerm, activeRole, departmentFilter])
+
+  const searchUsers = async (term) => {
     try {
       const token = localStorage.getItem('access_token')
-      const response = await fetch('http://localhost:5000/api/admin/users', {
+      const params = new URLSearchParams({ role: activeRole, q: term, per_page: 50 })
+      if (activeRole === 'student' && departmentFilter !== 'all') {
+        params.set('department', departmentFilter)
+      }
+      const response = await fetch(`http://localhost:5000/api/admin/search/users?${params}`, {
         headers: { 'Authorization': `Bearer ${token}` }
       })
       const data = await response.json()
       if (response.ok) {
-        const roleMap = {
-          'student': 'student',
-          'teacher': 'teacher',
-          'department_head': 'department_head'
-        }
-        const filteredUsers = data.users.filter(u => u.role_name === roleMap[activeRole])
-        setUsers(filteredUsers)
+        setSearchResults(data.users)
+      }
+    } catch (err) {
+      console.error('Arama sırasında hata:', err)
+    }
+  }
+
+  // after verilmezse liste baştan yüklenir, verilirse sonraki sayfa listeye eklenir
+  const fetchUsers = async (after = null) => {
+    if (after) {
+      setLoadingMore(true)
+    } else {
+      setLoading(true)
+    }
+    try {
+      const token = localStorage.getItem('access_token')
+      const params = new URLSearchParams({ role: activeRole, limit: USERS_PAGE_SIZE })
+      if (activeRole === 'student' && departmentFilter !== 'all') {
+        params.set('department', departmentFilter)
+      }
+      if (after) {
+        params.set('after', after)
+      }
+      const response = await fetch(`http://localhost:5000/api/admin/users?${params}`, {
+        headers: { 'Authorization': `Bearer ${token}` }
+      })
+      const data = await response.json()
+      if (response.ok) {
+        setUsers(prev => after ? [...prev, ...data.users] : data.users)
+        setNextCursor(data.next_cursor)
       }
-      setLoading(false)
     } catch (err) {
       setError('Kullanıcılar yüklenirken hata oluştu')
-      setLoading(false)
     }
+    setLoading(false)
+    setLoadingMore(false)
   }
 
   const fetchLessons = async () => {
@@ -71,15 +119,11 @@ function Users() {
     setSelectedUser(null)
     setIsAddingNew(false)
     setDepartmentFilter('all')
+    setSearchTerm('')
     setGeneratedCredentials(null)
   }
 
-  const getFilteredUsers = () => {
-    if (activeRole !== 'student' || departmentFilter === 'all') {
-      return users
-    }
-    return users.filter(u => u.department === departmentFilter)
-  }
+  const getFilteredUsers = () => searchResults || users
 
   const handleAddNewClick = () => {
     setIsAddingNew(true)
@@ -266,67 +310,64 @@ function Users() {
     }
   }
 
-  const handleExcelUpload = (event) => {
+  const handleExcelUpload = async (event) => {
     const file = event.target.files[0]
     if (!file) return
+    // Input'u temizle (aynı dosyayı tekrar seçebilmek için)
+    event.target.value = ''
 
-    const reader = new FileReader()
-    reader.onload = async (e) => {
-      try {
-        const data = new Uint8Array(e.target.result)
-        const workbook = XLSX.read(data, { type: 'array' })
-        const sheetName = workbook.SheetNames[0]
-        const worksheet = workbook.Sheets[sheetName]
-        const jsonData = XLSX.utils.sheet_to_json(worksheet, { header: 1 })
-
-        // İlk satır başlık, 2. satırdan itibaren veri
-        const students = []
-        for (let i = 1; i < jsonData.length; i++) {
-          const row = jsonData[i]
-          if (!row[0]) continue // Boş satırları atla
-
-          students.push({
-            student_number: String(row[0] || '').trim(),
-            first_name: String(row[1] || '').trim(),
-            last_name: String(row[2] || '').trim(),
-            department: String(row[3] || '').trim()
-          })
-        }
-
-        if (students.length === 0) {
-          setError('Excel dosyasında öğrenci verisi bulunamadı')
-          return
-        }
+    try {
+      // Dosya olduğu gibi gönderilir; satırlar sunucuda akış halinde okunur
+      const formData = new FormData()
+      formData.append('file', file)
 
-        // Backend'e gönder
-        const token = localStorage.getItem('access_token')
-        const response = await fetch('http://localhost:5000/api/admin/users/bulk-upload', {
-          method: 'POST',
-          headers: {
-            'Content-Type': 'application/json',
-            'Authorization': `Bearer ${token}`
-          },
-          body: JSON.stringify({ students })
-        })
+      const token = localStorage.getItem('access_token')
+      const response = await fetch('http://localhost:5000/api/admin/users/bulk-upload', {
+        method: 'POST',
+        headers: {
+          'Authorization': `Bearer ${token}`
+        },
+        body: formData
+      })
 
-        const result = await response.json()
+      const queued = await response.json()
 
-        if (response.ok) {
-          setUploadResults(result)
-          setSuccess(`Toplu yükleme tamamlandı! Oluşturulan: ${result.summary.created_count}, Güncellenen: ${result.summary.updated_count}, Hata: ${result.summary.error_count}`)
-          fetchUsers()
-        } else {
-          setError(result.error || 'Toplu yükleme başarısız')
+      if (response.ok) {
+        // Yükleme arka planda çalışır; bitene kadar ilerleme gösterilir
+        const job = await waitForJob(queued.job.id, (j) => {
+          if (j.progress.percent !== null) {
+            setSuccess(`Toplu yükleme sürüyor... %${j.progress.percent}`)
+          }
+        })
+        if (job.status !== 'succeeded') {
+          setSuccess('')
+          setError(job.error || 'Toplu yükleme başarısız')
+          return
         }
-      } catch (err) {
-        console.error('Excel okuma hatası:', err)
-        setError('Excel dosyası okunurken hata oluştu')
+        const result = job.result
+        setUploadResults({ ...result, jobId: job.id })
+        setSuccess(`Toplu yükleme tamamlandı! Oluşturulan: ${result.summary.created_count}, Güncellenen: ${result.summary.updated_count}, Hata: ${result.summary.error_count}`)
+        fetchUsers()
+      } else {
+        setError(queued.error || 'Toplu yükleme başarısız')
       }
+    } catch (err) {
+      console.error('Dosya yükleme hatası:', err)
+      setError('Dosya yüklenirken hata oluştu')
     }
+  }
 
-    reader.readAsArrayBuffer(file)
-    // Input'u temizle (aynı dosyayı tekrar seçebilmek için)
-    event.target.value = ''
+  // Sonuçlar kapatılınca şifreler sunucudan silinir (kapatılmazsa süre dolunca silinir)
+  const closeUploadResults = async () => {
+    const jobId = uploadResults && uploadResults.jobId
+    setUploadResults(null)
+    if (jobId) {
+      try {
+        await clearJobSecrets(jobId)
+      } catch (err) {
+        console.error('Şifreler silinemedi:', err)
+      }
+    }
   }
 
   const getRoleLabel = (role) => {
@@ -367,7 +408,7 @@ function Users() {
         React.createElement('input', {
           type: 'file',
           id: 'excel-upload',
-          accept: '.xlsx, .xls',
+          accept: '.xlsx, .xls, .csv',
           style: { display: 'none' },
           onChange: handleExcelUpload
         }),
@@ -393,14 +434,23 @@ function Users() {
         )
       ),
 
+      React.createElement('div', { className: 'user-search' },
+        React.createElement('input', {
+          type: 'text',
+          value: searchTerm,
+          onChange: (e) => setSearchTerm(e.target.value),
+          placeholder: 'Ad, e-posta veya numara ile ara',
+          className: 'user-search-input'
+        })
+      ),
+
       React.createElement('h3', { className: 'sidebar-title' }, `${getRoleLabel(activeRole)} Listesi`),
 
       loading && React.createElement('p', { className: 'loading-text' }, 'Yükleniyor...'),
 
-      !loading && users.length === 0 && React.createElement('p', { className: 'empty-text' }, 'Henüz kullanıcı yok'),
-
-      !loading && getFilteredUsers().length === 0 && users.length > 0 && 
-        React.createElement('p', { className: 'empty-text' }, 'Bu bölümde öğrenci yok'),
+      !loading && getFilteredUsers().length === 0 && React.createElement('p', { className: 'empty-text' },
+        searchResults ? 'Aramayla eşleşen kullanıcı yok' : (departmentFilter !== 'all' ? 'Bu bölümde öğrenci yok' : 'Henüz kullanıcı yok')
+      ),
 
       !loading && getFilteredUsers().length > 0 && React.createElement('div', { className: 'user-list' },
         getFilteredUsers().map(user =>
@@ -420,7 +470,13 @@ function Users() {
               onClick: (e) => handleDelete(user.id, e)
             }, '×')
           )
-        )
+        ),
+        !searchResults && nextCursor && React.createElement('button', {
+          type: 'button',
+          className: 'load-more-btn',
+          disabled: loadingMore,
+          onClick: () => fetchUsers(nextCursor)
+        }, loadingMore ? 'Yükleniyor...' : 'Daha fazla yükle')
       )
     ),
 
@@ -453,7 +509,7 @@ function Users() {
             React.createElement('h3', null, 'Excel Yükleme Sonuçları'),
             React.createElement('button', {
               className: 'close-results-btn',
-              onClick: () => setUploadResults(null)
+              onClick: closeUploadResults
             }, '×')
           ),
           React.createElement('div', { className: 'upload-summary' },
@@ -467,7 +523,7 @@ function Users() {
               uploadResults.results.created.map((item, idx) =>
                 React.createElement('div', { key: idx, className: 'upload-item' },
                   React.createElement('p', null, `${item.student_number} - ${item.full_name}`),
-                  React.createElement('small', null, `Email: ${item.email} | Şifre: ${item.password}`)
+                  React.createElement('small', null, `Email: ${item.email} | Şifre: ${item.password || '(şifre silindi)'}`)
                 )
               )
             )
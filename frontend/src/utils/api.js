@@ -135,6 +135,43 @@ export const authAPI = {
   }
 }
 
+// Arka plan işi (toplu yükleme vb.) bitene kadar durumunu sorgular, bitmiş işi döndürür
+async function waitForJob(jobId, onProgress, intervalMs = 1000) {
+  while (true) {
+    const data = await apiRequest(`/admin/jobs/${jobId}`)
+    const job = data.job
+    if (onProgress) {
+      onProgress(job)
+    }
+    if (job.status === 'succeeded' || job.status === 'failed') {
+      return job
+    }
+    await new Promise(resolve => setTimeout(resolve, intervalMs))
+  }
+}
+
+// Toplu yükleme sonucundaki şifreleri sunucudan siler (sonuçlar görüldükten sonra çağrılır)
+async function clearJobSecrets(jobId) {
+  return await apiRequest(`/admin/jobs/${jobId}/secrets`, { method: 'DELETE' })
+}
+
+// Kuyruğa alınan sınav gönderimi (ASYNC_GRADING) puanlanana kadar makbuzu sorgular, son makbuzu döndürür
+// 'failed' makbuzlar sunucuda tekrar denendiği için beklemeye devam edilir; timeoutMs sonunda son durum döner
+async function waitForSubmission(receiptId, onProgress, intervalMs = 1000, timeoutMs = 120000) {
+  const deadline = Date.now() + timeoutMs
+  while (true) {
+    const data = await apiRequest(`/student/submissions/${receiptId}`)
+    const receipt = data.receipt
+    if (onProgress) {
+      onProgress(receipt)
+    }
+    if (receipt.status === 'graded' || Date.now() >= deadline) {
+      return receipt
+    }
+    await new Promise(resolve => setTimeout(resolve, intervalMs))
+  }
+}
+
 // Diğer API fonksiyonları buraya eklenecek (admin, teacher, student, department_head)
 
-export { apiRequest, getAccessToken, clearTokens, API_BASE_URL }
+export { apiRequest, waitForJob, clearJobSecrets, waitForSubmission, getAccessToken, clearTokens, API_BASE_URL }